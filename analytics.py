@@ -0,0 +1,278 @@
+import importlib.util
+import logging
+from threading import Lock
+from typing import Dict, List
+
+from listing_store import normalize_text
+
+# numpy импортируется при первом обращении к статистике, а не при импорте
+# приложения: сам импорт занимает около 75 мс (python -X importtime)
+np = None
+
+logger = logging.getLogger(__name__)
+
+# Уровни группировки: каждый следующий уточняет предыдущий
+GROUP_LEVELS = ("brand", "model", "gen")
+
+# Числовые колонки и их порядок в строках ListingStore.changes_since
+NUMERIC_FIELDS = ("price", "mileage", "year")
+
+# Разделитель частей составного ключа группы
+KEY_SEPARATOR = "\x1f"
+
+
+def is_available() -> bool:
+    """
+    Аналитика доступна при установленном пакете ``numpy``.
+
+    :rtype: bool
+    """
+    return np is not None or importlib.util.find_spec("numpy") is not None
+
+
+def _import_numpy() -> None:
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+def _group_quantiles(values, starts, valid, q: float):
+    """
+    Квантиль ``q`` каждой группы с линейной интерполяцией.
+
+    :param values: Значения, отсортированные по группе и по значению (NaN в конце группы).
+    :param starts: Индекс начала каждой группы.
+    :param valid: Число значений без NaN в каждой группе.
+    :return: Массив квантилей, NaN для групп без значений.
+    """
+    position = starts + q * np.maximum(valid - 1, 0)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    with np.errstate(invalid="ignore"):
+        result = values[low] + (values[high] - values[low]) * (position - low)
+    return np.where(valid > 0, result, np.nan)
+
+
+def _to_list(array, digits: int = 0) -> List:
+    """
+    Переводит массив в список для JSON: NaN -> None, округление до ``digits`` знаков.
+    """
+    rounded = np.round(array, digits)
+    return [None if np.isnan(value) else (int(value) if digits == 0 else float(value)) for value in rounded]
+
+
+class ListingAnalytics:
+    """
+    Статистика по объявлениям локального индекса.
+
+    Объявления хранятся в колонках NumPy (цена, пробег, год, марка, модель,
+    поколение) и догружаются из ``ListingStore`` по времени записи: при
+    каждом обращении читаются только объявления, появившиеся или
+    обновившиеся после предыдущего. Агрегаты по группам считаются
+    векторно за один проход сортировки и кэшируются до прихода новых
+    объявлений.
+
+    :param store: Индекс объявлений.
+    :type store: listing_store.ListingStore
+    :param capacity: Начальный размер колонок.
+    :type capacity: int
+    """
+
+    def __init__(self, store, capacity: int = 1024):
+        if not is_available():
+            raise RuntimeError("numpy is not installed")
+        self.store = store
+        self._size = 0
+        self._positions = {}
+        # Колонки создаются при первом обращении вместе с импортом numpy
+        self._capacity = capacity
+        self._numeric = None
+        self._text = None
+        self._watermark = None
+        self._version = 0
+        self._results = {}
+        self._lock = Lock()
+
+    def _grow(self, size: int) -> None:
+        capacity = self._numeric.shape[1]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        numeric = np.full((len(NUMERIC_FIELDS), capacity), np.nan)
+        numeric[:, :self._size] = self._numeric[:, :self._size]
+        text = np.full((len(GROUP_LEVELS), capacity), "", dtype=object)
+        text[:, :self._size] = self._text[:, :self._size]
+        self._numeric, self._text = numeric, text
+
+    def refresh(self) -> int:
+        """
+        Догружает объявления, записанные после предыдущего обращения.
+
+        :return: Число новых и обновленных объявлений.
+        :rtype: int
+        """
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> int:
+        if self._numeric is None:
+            _import_numpy()
+            self._numeric = np.full((len(NUMERIC_FIELDS), self._capacity), np.nan)
+            self._text = np.full((len(GROUP_LEVELS), self._capacity), "", dtype=object)
+        rows = self.store.changes_since(self._watermark)
+        if not rows:
+            return 0
+
+        positions = np.empty(len(rows), dtype=np.int64)
+        size = self._size
+        for index, row in enumerate(rows):
+            position = self._positions.get(row[0])
+            if position is None:
+                position = self._positions[row[0]] = size
+                size += 1
+            positions[index] = position
+        self._grow(size)
+        self._size = size
+
+        self._numeric[:, positions] = np.array(
+            [row[1:4] for row in rows], dtype=float
+        ).T
+        self._text[:, positions] = np.array(
+            [[value or "" for value in row[4:7]] for row in rows], dtype=object
+        ).T
+        self._watermark = rows[-1][7]
+        self._version += 1
+        self._results.clear()
+        logger.info(f"Analytics updated with {len(rows)} listings, {self._size} total")
+        return len(rows)
+
+    def stats(self, group_by: str = "model", filters: Dict[str, str] | None = None,
+              bins: int = 10, min_count: int = 1) -> Dict:
+        """
+        Агрегаты по группам объявлений.
+
+        :param group_by: Уровень группировки: brand, model или gen.
+        :type group_by: str
+        :param filters: Точные значения марки, модели, поколения.
+        :type filters: dict
+        :param bins: Число интервалов гистограммы цен.
+        :type bins: int
+        :param min_count: Минимум объявлений в группе.
+        :type min_count: int
+        :return: ``{"total": ..., "groups": [...]}``, группы по убыванию числа объявлений.
+        :rtype: dict
+        :raises ValueError: При неизвестном уровне группировки или фильтре.
+        """
+        if group_by not in GROUP_LEVELS:
+            raise ValueError(f"Unknown group: {group_by}")
+        filters = {field: normalize_text(value) for field, value in (filters or {}).items() if value}
+        for field in filters:
+            if field not in GROUP_LEVELS:
+                raise ValueError(f"Unknown field: {field}")
+
+        with self._lock:
+            self._refresh()
+            key = (group_by, tuple(sorted(filters.items())), bins, min_count)
+            result = self._results.get(key)
+            if result is None:
+                result = self._results[key] = self._compute(group_by, filters, bins, min_count)
+            return result
+
+    def _compute(self, group_by: str, filters: Dict[str, str], bins: int, min_count: int) -> Dict:
+        levels = GROUP_LEVELS[:GROUP_LEVELS.index(group_by) + 1]
+        text = self._text[:, :self._size]
+        mask = np.ones(self._size, dtype=bool)
+        for field, value in filters.items():
+            mask &= text[GROUP_LEVELS.index(field)] == value
+        # Объявления без значения уровня группировки не попадают ни в одну группу
+        for level in levels:
+            mask &= text[GROUP_LEVELS.index(level)] != ""
+        if not mask.any():
+            return {"total": 0, "groups": []}
+
+        keys = text[0, mask]
+        for level in levels[1:]:
+            keys = keys + KEY_SEPARATOR + text[GROUP_LEVELS.index(level), mask]
+        names, inverse, counts = np.unique(keys.astype(str), return_inverse=True, return_counts=True)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        price, mileage, year = self._numeric[:, :self._size][:, mask]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price_per_km = np.where(mileage > 0, price / mileage, np.nan)
+
+        summaries = {}
+        for name, values in (("price", price), ("mileage", mileage), ("year", year), ("price_per_km", price_per_km)):
+            # Сортировка по группе, внутри группы по значению; NaN оказываются в конце группы
+            order = np.lexsort((values, inverse))
+            ordered = values[order]
+            valid = np.bincount(inverse, weights=~np.isnan(values), minlength=len(names)).astype(np.int64)
+            total = np.bincount(inverse, weights=np.nan_to_num(values), minlength=len(names))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(valid > 0, total / valid, np.nan)
+            summaries[name] = {
+                "median": _group_quantiles(ordered, starts, valid, 0.5),
+                "mean": mean,
+                "p25": _group_quantiles(ordered, starts, valid, 0.25),
+                "p75": _group_quantiles(ordered, starts, valid, 0.75),
+                "min": _group_quantiles(ordered, starts, valid, 0.0),
+                "max": _group_quantiles(ordered, starts, valid, 1.0),
+            }
+
+        # Распределение по годам: пары (группа, год) с числом объявлений
+        has_year = ~np.isnan(year)
+        year_pairs, year_counts = np.unique(
+            np.stack((inverse[has_year], year[has_year].astype(np.int64))), axis=1, return_counts=True
+        )
+
+        # Гистограммы цен: свои границы для каждой группы от минимума до максимума
+        low, high = summaries["price"]["min"], summaries["price"]["max"]
+        width = np.where(high > low, (high - low) / bins, 1.0)
+        has_price = ~np.isnan(price)
+        bucket = np.clip(
+            ((price[has_price] - low[inverse[has_price]]) / width[inverse[has_price]]).astype(np.int64), 0, bins - 1
+        )
+        histograms = np.bincount(
+            inverse[has_price] * bins + bucket, minlength=len(names) * bins
+        ).reshape(len(names), bins)
+        edges = low[:, None] + width[:, None] * np.arange(bins + 1)
+
+        columns = {
+            name: {stat: _to_list(values, 2 if name == "price_per_km" else 0) for stat, values in summary.items()}
+            for name, summary in summaries.items()
+        }
+        years = [{} for _ in names]
+        for group, value, count in zip(year_pairs[0].tolist(), year_pairs[1].tolist(), year_counts.tolist()):
+            years[group][str(value)] = count
+
+        groups = []
+        for index in np.argsort(-counts, kind="stable").tolist():
+            if counts[index] < min_count:
+                continue
+            group = dict(zip(levels, names[index].split(KEY_SEPARATOR)))
+            group["count"] = int(counts[index])
+            for name in ("price", "mileage", "year"):
+                group[name] = {stat: column[index] for stat, column in columns[name].items()}
+            group["price_per_km"] = {"median": columns["price_per_km"]["median"][index]}
+            group["years"] = years[index]
+            if np.isnan(low[index]):
+                group["price_histogram"] = {"edges": [], "counts": []}
+            elif high[index] == low[index]:
+                # Все цены группы одинаковы: один интервал нулевой ширины
+                group["price_histogram"] = {
+                    "edges": _to_list(np.array([low[index], high[index]])),
+                    "counts": [int(histograms[index].sum())]
+                }
+            else:
+                group["price_histogram"] = {
+                    "edges": _to_list(edges[index]),
+                    "counts": histograms[index].tolist()
+                }
+            groups.append(group)
+
+        return {"total": int(mask.sum()), "groups": groups}
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {"listings": self._size, "version": self._version}
@@ -1,26 +1,63 @@
-from flask import Flask, request, Response
+from time import perf_counter
+BOOT_STARTED = perf_counter() # Начало импорта приложения, для замера времени запуска
+
+# Flask, flask_caching, flask_cors и исключения Selenium импортируются сразу:
+# кэш и CORS регистрируются в приложении до первого запроса, исключения нужны
+# обработчикам. По python -X importtime flask_caching и flask_cors занимают
+# около 15 мс, selenium.common.exceptions около 2 мс из ~230 мс импорта app.
+# Модули Selenium для создания драйверов, numpy и urllib3 импортируются при
+# первом использовании
+from flask import Flask, has_request_context, request, Response
 from flask_caching import Cache
 from flask_cors import CORS
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+from werkzeug.http import generate_etag
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from concurrent.futures import ThreadPoolExecutor
-from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait as wait_futures
+from threading import Event, Lock, current_thread, local, main_thread
+from functools import partial, wraps
 import logging
 import signal
 import sys
+import hmac
 import json
-from time import time
+import pickle
+from time import monotonic, sleep, time
+from random import random
 from scraper import Scraper
+from profile_cache import ProfileCache
+from snapshots import SnapshotStore
+from listing_store import ListingStore, RANGE_FIELDS, TEXT_FIELDS, enclosing_range
+from analytics import GROUP_LEVELS, ListingAnalytics, is_available as analytics_available
+from option_index import TERM_SECTIONS, OptionIndex
+from filter_resolver import FilterResolver, FilterValueError
+from cache_warmer import CacheWarmer
+from prefetch import DetailPrefetcher
+from driver_service import BASE_CHROME_ARGUMENTS, CommandTimings, DriverServicePool, chrome_options
+from driver_memory import DriverMemoryMonitor, chrome_memory_arguments
+from upstream_health import UpstreamHealth, UpstreamUnavailable
+from failures import DEAD_SESSION, RETRYABLE, SELECTOR_MISS, UPSTREAM_ERROR, RetryBudget, classify_failure
+from profiling import Profiler, current_profile
+from loadtest import TrafficRecorder
+from settings import Settings, SettingsHolder
+from startup import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, DrainingExecutor, Startup, child_processes, terminate_processes
+from price_calculator import COMPUTED, SCRAPED, PriceCalculator, engine_inputs
+from compression import available_encodings, compress, compress_all, compress_stream, negotiate, MIN_SIZE
 import atexit
 from dotenv import load_dotenv
 import os
 
+# Настройки производительности из окружения и .env (см. settings.py):
+# размер пула, время жизни кэша, таймауты. Поля с горячей заменой
+# меняются без перезапуска через /api/v1/admin/settings.
+# .env читается при импорте (около 3 мс): константы окружения ниже
+# вычисляются при импорте модуля
+load_dotenv()
+settings = SettingsHolder(Settings.from_env())
+
 # Конфигурация flask
 app = Flask(__name__)
 app.config['CACHE_TYPE'] = 'SimpleCache'  
-app.config['CACHE_DEFAULT_TIMEOUT'] = 3600 # Кэш храним час
+app.config['CACHE_DEFAULT_TIMEOUT'] = settings.cache_default_timeout
 CORS(app)
 cache = Cache(app)
 
@@ -28,18 +65,167 @@ cache = Cache(app)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(funcName)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Настройка воркеров для многопоточности
-MAX_WORKERS = 3 # число ядер * 1.5
-executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+# Настройка воркеров для многопоточности: MAX_WORKERS в settings (число ядер * 1.5)
+executor = DrainingExecutor(max_workers=settings.max_workers)
+background_executor = DrainingExecutor(max_workers=1) # Сжатие ответов для кэша, замена драйверов
 driver_pool = []
 pool_lock = Lock()
+driver_count = 0 # Всего созданных драйверов (в пуле и в работе)
+starting_count = 0 # Драйверы, запускаемые вне блокировки пула
 
 # Настройки URL для скрапинга (загружаются из .env файла)
 # SEARCHPAGE_URL: Базовый URL для поиска автомобилей
 # CARPAGE_URL: Базовый URL для страницы с деталями автомобиля
-load_dotenv()
-SEARCHPAGE_URL = os.getenv("SEARCHPAGE_URL")
-CARPAGE_URL = os.getenv("CARPAGE_URL")
+SEARCHPAGE_URL = settings.searchpage_url
+CARPAGE_URL = settings.carpage_url
+
+# Повторное использование открытой страницы поиска: если драйвер уже на ней,
+# фильтры сбрасываются и применяются без повторной загрузки страницы
+# SEARCHPAGE_REUSE: 1 - включено, 0 - каждый поиск загружает страницу заново
+SEARCHPAGE_REUSE = os.getenv("SEARCHPAGE_REUSE", "1") == "1"
+
+# Общие процессы chromedriver для всех драйверов
+# CHROMEDRIVER_PATH: Путь к chromedriver
+# CHROMEDRIVER_SERVICES: Число процессов chromedriver
+command_timings = CommandTimings()
+driver_services = DriverServicePool(
+    settings.chromedriver_path,
+    size=settings.chromedriver_services,
+    timings=command_timings
+)
+
+# Общий кэш статики сайта для всех драйверов (опционально)
+# CHROME_PROFILE_DIR: Каталог шаблона профиля Chrome с дисковым кэшем
+# CHROME_PROFILE_MAX_SIZE_MB: Ограничение размера кэша
+# CHROME_PROFILE_MAX_AGE: Время жизни шаблона в секундах
+CHROME_PROFILE_DIR = os.getenv("CHROME_PROFILE_DIR")
+profile_cache = ProfileCache(
+    CHROME_PROFILE_DIR,
+    max_size_mb=int(os.getenv("CHROME_PROFILE_MAX_SIZE_MB", "200")),
+    max_age=int(os.getenv("CHROME_PROFILE_MAX_AGE", "86400"))
+) if CHROME_PROFILE_DIR else None
+driver_profiles = {}
+
+# Сохранение снимков страниц для повторного извлечения (опционально)
+# SNAPSHOT_DIR: Каталог снимков, запись включается при его наличии
+# SNAPSHOT_MAX_AGE: Время хранения снимков в секундах
+# SNAPSHOT_MAX_PER_KEY: Число снимков на одну страницу/набор аргументов
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR")
+snapshot_store = SnapshotStore(
+    SNAPSHOT_DIR,
+    max_age=int(os.getenv("SNAPSHOT_MAX_AGE", str(7 * 86400))),
+    max_per_key=int(os.getenv("SNAPSHOT_MAX_PER_KEY", "5"))
+) if SNAPSHOT_DIR else None
+
+# Локальный индекс объявлений для запросов по произвольным диапазонам
+# LISTING_DB: Путь к базе SQLite (по умолчанию в памяти)
+# LISTING_COVERAGE_TTL: Через сколько секунд выборка сайта считается устаревшей
+# LISTING_BACKFILL_PAGES: Сколько страниц выдачи скрапить при дозагрузке индекса
+LISTING_DB = os.getenv("LISTING_DB", ":memory:")
+LISTING_COVERAGE_TTL = int(os.getenv("LISTING_COVERAGE_TTL", "3600"))
+LISTING_BACKFILL_PAGES = int(os.getenv("LISTING_BACKFILL_PAGES", "5"))
+listing_store = ListingStore(LISTING_DB)
+
+# Статистика по объявлениям индекса (при установленном numpy)
+listing_analytics = ListingAnalytics(listing_store) if analytics_available() else None
+
+# Индекс опций, характеристик и проверок из страниц автомобилей для /api/v1/cars/search
+# OPTION_INDEX_DB: Путь к базе SQLite (по умолчанию в памяти)
+option_index = OptionIndex(os.getenv("OPTION_INDEX_DB", ":memory:"))
+
+# Разделы страницы автомобиля, доступные для выбора через ?fields=
+CAR_FIELDS = (
+    "title",
+    "price",
+    "photos",
+    "base_parameters",
+    "tech_parameters",
+    "car_check_parameters",
+    "inspections",
+    "car_body_options",
+)
+
+# Защита сайта-источника: адаптивный лимит одновременных скрапингов и предохранитель
+# UPSTREAM_FAILURE_RATE: Доля ошибок загрузки страниц, при которой запросы к сайту приостанавливаются
+# UPSTREAM_SLOW_SECONDS: Загрузка страницы дольше этого времени уменьшает лимит
+# UPSTREAM_COOLDOWN: Пауза в секундах перед пробной загрузкой
+upstream_health = UpstreamHealth(
+    settings.max_workers,
+    failure_rate=float(os.getenv("UPSTREAM_FAILURE_RATE", "0.5")),
+    slow_seconds=float(os.getenv("UPSTREAM_SLOW_SECONDS", "10")),
+    cooldown=int(os.getenv("UPSTREAM_COOLDOWN", "30"))
+)
+
+# Профилирование скрапинга
+# PROFILE_DIR: Каталог для сохранения профилей (опционально)
+# PROFILE_SAMPLE_RATE: Доля запросов, профилируемых выборочно
+# PROFILE_TOKEN: Значение заголовка X-Profile, включающее профилирование запроса
+# PROFILE_TRACE: Записывать трассу Chrome для запросов с заголовком ("1")
+profiler = Profiler(
+    directory=os.getenv("PROFILE_DIR"),
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+    token=os.getenv("PROFILE_TOKEN"),
+    trace=os.getenv("PROFILE_TRACE") == "1"
+)
+
+# Расчеты стоимости по дате курса валют
+# PRICE_VERIFY_RATE: Доля локальных расчетов, сверяемых со страницей сайта
+# PRICE_BATCH_MAX: Максимум автомобилей в пакетном запросе
+# PRICE_BATCH_SCRAPE_MAX: Максимум расчетов, скрапящихся за один пакетный запрос
+price_calculator = PriceCalculator()
+PRICE_VERIFY_RATE = float(os.getenv("PRICE_VERIFY_RATE", "0.05"))
+PRICE_BATCH_MAX = int(os.getenv("PRICE_BATCH_MAX", "100"))
+PRICE_BATCH_SCRAPE_MAX = int(os.getenv("PRICE_BATCH_SCRAPE_MAX", "5"))
+
+# Журнал обслуженных запросов для нагрузочного тестирования (loadtest.py)
+TRAFFIC_LOG = os.getenv("TRAFFIC_LOG")
+traffic_recorder = TrafficRecorder(TRAFFIC_LOG) if TRAFFIC_LOG else None
+
+# Повторы при сбоях скрапинга (число повторов и сбоев драйвера - в settings)
+# SCRAPE_RETRY_RATIO: Доля повторов от числа задач (бюджет повторов)
+SCRAPE_RETRY_BACKOFF = 0.5
+retry_budget = RetryBudget(ratio=float(os.getenv("SCRAPE_RETRY_RATIO", "0.2")))
+driver_failures = {} # Число сбоев подряд по драйверам
+quarantined_count = 0
+retiring_count = 0 # Драйверы, завершаемые после уменьшения MAX_WORKERS
+driver_script_timeouts = {} # Установленный таймаут скриптов по драйверам
+
+# Фоновый прогрев кэша
+# CACHE_WARM_ENABLED: Включить прогрев ("1")
+# CACHE_WARM_PATHS: Пути через запятую, которые прогреваются всегда
+# CACHE_WARM_TOP_N: Сколько самых популярных запросов прогревать дополнительно
+# CACHE_WARM_AHEAD: За сколько секунд до истечения обновлять запись
+# CACHE_WARM_RATE: Максимум обновлений в минуту
+CACHE_WARM_ENABLED = os.getenv("CACHE_WARM_ENABLED") == "1"
+CACHE_WARM_PATHS = [path for path in os.getenv("CACHE_WARM_PATHS", "/api/v1/cars/filters").split(",") if path]
+
+# Предзагрузка страниц автомобилей из отданной выдачи в кэш
+# CAR_PREFETCH_ENABLED: Включить предзагрузку ("1")
+# CAR_PREFETCH_TOP_K: Сколько первых автомобилей выдачи предзагружать
+# CAR_PREFETCH_RATE: Максимум предзагрузок в минуту
+# CAR_PREFETCH_MAX_PENDING: Максимум предзагрузок в очереди и в работе
+# Предзагрузка использует только воркеры сверх CACHE_WARM_RESERVE
+CAR_PREFETCH_ENABLED = os.getenv("CAR_PREFETCH_ENABLED") == "1"
+
+# Готовность экземпляра к трафику (/readyz)
+# READY_MIN_DRIVERS: Сколько драйверов создать до готовности
+# READY_WARM_FILTERS: Заполнить кэш фильтров до готовности ("1")
+READY_MIN_DRIVERS = min(int(os.getenv("READY_MIN_DRIVERS", "1")), settings.max_workers)
+READY_WARM_FILTERS = os.getenv("READY_WARM_FILTERS", "1") == "1"
+FILTERS_WARM_PATH = "/api/v1/cars/filters"
+
+# Плавное завершение работы
+# SHUTDOWN_GRACE_PERIOD: Сколько секунд ждать завершения принятых скрапингов
+# DRIVER_QUIT_TIMEOUT: Сколько секунд ждать завершения драйверов и их процессов
+# CACHE_STATE_FILE: Файл, в который сохраняется кэш ответов при завершении
+#   и из которого он восстанавливается при запуске (опционально)
+SHUTDOWN_GRACE_PERIOD = float(os.getenv("SHUTDOWN_GRACE_PERIOD", "25"))
+DRIVER_QUIT_TIMEOUT = float(os.getenv("DRIVER_QUIT_TIMEOUT", "10"))
+CACHE_STATE_FILE = os.getenv("CACHE_STATE_FILE")
+draining = Event() # Новые запросы не принимаются
+shutdown_lock = Lock()
+shutdown_done = False
+cache_paths = {} # Пути запросов по ключам кэша, для сохранения кэша на диск
 
 def handle_shutdown(signum, frame):
     """
@@ -50,177 +236,1775 @@ def handle_shutdown(signum, frame):
     :param frame: Текущий стек вызовов.
     :type frame: frame
     """
-    logger.info("Shutting down gracefully...")
+    logger.info(f"Received signal {signum}, draining...")
+    shutdown()
     sys.exit(0)
 
-signal.signal(signal.SIGTERM, handle_shutdown)
-signal.signal(signal.SIGINT, handle_shutdown)
+# Ограничение памяти Chrome
+# CHROME_RENDERER_PROCESS_LIMIT: Максимум процессов рендеринга на браузер (опционально)
+# CHROME_JS_HEAP_MB: Предел кучи V8 в МБ, --max-old-space-size (опционально)
+# DRIVER_MAX_RSS_MB: Драйвер заменяется, если RSS его процессов Chrome больше (0 - без предела)
+# DRIVER_MAX_JS_HEAP_MB: Драйвер заменяется, если занятая JS-куча страницы больше (0 - без предела)
+# DRIVER_MEMORY_CHECK_EVERY: Через сколько использований драйвера проверять память
+CHROME_ARGUMENTS = BASE_CHROME_ARGUMENTS + chrome_memory_arguments(
+    renderer_process_limit=int(os.getenv("CHROME_RENDERER_PROCESS_LIMIT", "0")),
+    js_heap_mb=int(os.getenv("CHROME_JS_HEAP_MB", "0"))
+)
+driver_memory = DriverMemoryMonitor(
+    max_rss_mb=int(os.getenv("DRIVER_MAX_RSS_MB", "1024")),
+    max_js_heap_mb=int(os.getenv("DRIVER_MAX_JS_HEAP_MB", "384")),
+    check_every=int(os.getenv("DRIVER_MEMORY_CHECK_EVERY", "5"))
+)
+recycled_count = 0
 
 def create_driver():
     """
     Создает и настраивает экземпляр Chrome WebDriver.
 ls
+    Сессии открываются на общих процессах chromedriver (``driver_services``).
+
     :return: Настроенный экземпляр WebDriver.
-    :rtype: webdriver.Chrome
-    """
-    chrome_service = Service(executable_path='/usr/bin/chromedriver')
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-infobars")
-    chrome_options.add_argument("--disable-notifications")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_argument("--window-size=1280,720")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option("useAutomationExtension", False)
-    driver = webdriver.Chrome(options=chrome_options, service=chrome_service)
+    :rtype: webdriver.Remote
+    """
+    options = chrome_options(CHROME_ARGUMENTS)
+    profiler.chrome_options(options)
+
+    profile_dir = profile_cache.acquire() if profile_cache else None
+    if profile_dir:
+        for argument in profile_cache.chrome_arguments(profile_dir):
+            options.add_argument(argument)
+
+    try:
+        driver = driver_services.create_driver(options)
+    except Exception:
+        if profile_dir:
+            profile_cache.release(profile_dir)
+        raise
+
+    global driver_count
+    with pool_lock:
+        if profile_dir:
+            driver_profiles[driver] = profile_dir
+        driver_count += 1
     return driver
 
-def cleanup():
-    """
-    Очищает пул драйверов при завершении работы приложения.
+def launch_driver(limit):
+    """
+    Создает драйвер, если созданных и запускаемых драйверов меньше ``limit``.
+    Место резервируется под pool_lock, а Chrome запускается вне блокировки,
+    чтобы acquire_driver и release_driver не ждали запуска.
+
+    :param limit: Предел числа драйверов.
+    :type limit: int
+    :return: Новый драйвер или None, если предел уже достигнут.
+    :rtype: webdriver.Remote
+    """
+    global starting_count
+    with pool_lock:
+        if driver_count + starting_count >= limit:
+            return None
+        starting_count += 1
+    try:
+        return create_driver()
+    finally:
+        with pool_lock:
+            starting_count -= 1
+
+def quit_driver(driver):
+    """
+    Завершает работу драйвера и освобождает его профиль.
+
+    :param driver: Экземпляр WebDriver.
+    :type driver: webdriver.Remote
+    """
+    global driver_count
+    try:
+        driver.quit()
+    finally:
+        with pool_lock:
+            driver_count -= 1
+            driver_script_timeouts.pop(driver, None)
+            profile_dir = driver_profiles.pop(driver, None)
+        driver_memory.forget(driver)
+        if profile_dir:
+            profile_cache.release(profile_dir)
+
+def stop_drivers():
+    """
+    Завершает драйверы пула параллельно, затем процессы chromedriver,
+    и дожидается выхода всех дочерних процессов. Процессы Chrome, не
+    завершившиеся за DRIVER_QUIT_TIMEOUT (например, драйверов, занятых
+    незавершенными задачами), завершаются принудительно.
+    """
+    # Список потомков берется заранее: после остановки chromedriver его
+    # процессы Chrome перестают быть потомками этого процесса
+    children = child_processes()
+    with pool_lock:
+        drivers = list(driver_pool)
+        driver_pool.clear()
+
+    if drivers:
+        pool = ThreadPoolExecutor(max_workers=len(drivers))
+        futures = [pool.submit(quit_driver, driver) for driver in drivers]
+        pool.shutdown(wait=False)
+        _, not_done = wait_futures(futures, timeout=DRIVER_QUIT_TIMEOUT)
+        for future in futures:
+            if future not in not_done and future.exception() is not None:
+                logger.warning(f"Failed to quit driver: {str(future.exception())}")
+        if not_done:
+            logger.warning(f"{len(not_done)} driver(s) did not quit in {DRIVER_QUIT_TIMEOUT}s")
+
+    driver_services.stop()
+    killed = terminate_processes(children, timeout=DRIVER_QUIT_TIMEOUT)
+    if killed:
+        logger.warning(f"Terminated {killed} leftover browser process(es)")
+
+def shutdown(grace_period=None):
+    """
+    Плавное завершение работы: новые запросы отклоняются с 503, принятые
+    скрапинги завершаются в течение SHUTDOWN_GRACE_PERIOD, кэш ответов
+    сохраняется в CACHE_STATE_FILE, затем завершаются драйверы и их
+    процессы. Повторные вызовы ничего не делают.
+
+    :param grace_period: Сколько секунд ждать принятых скрапингов, None - SHUTDOWN_GRACE_PERIOD.
+    :type grace_period: float
+    """
+    global shutdown_done
+    with shutdown_lock:
+        if shutdown_done:
+            return
+        shutdown_done = True
+
+    draining.set()
+    startup.stop()
+    cache_warmer.stop()
+    grace_period = SHUTDOWN_GRACE_PERIOD if grace_period is None else grace_period
+    logger.info(f"Draining {executor.pending()} scrape task(s), grace period {grace_period}s")
+    unfinished = executor.drain(grace_period)
+    if unfinished:
+        logger.warning(f"{unfinished} scrape task(s) did not finish in {grace_period}s")
+    # Фоновые задачи короткие: сжатие ответов для кэша и замена драйверов
+    background_executor.drain(DRIVER_QUIT_TIMEOUT)
+
+    save_cache_state()
+    stop_drivers()
+    logger.info("Shutdown complete")
+
+def cleanup():
+    """
+    Завершает работу при выходе интерпретатора, если плавное завершение
+    не было выполнено раньше (например, выход без сигнала).
+    """
+    shutdown(grace_period=0)
+atexit.register(cleanup)
+
+def save_cache_state():
+    """
+    Сохраняет действующие записи кэша ответов в CACHE_STATE_FILE,
+    чтобы следующий запуск начинался с прогретым кэшем.
+    """
+    if not CACHE_STATE_FILE:
+        return
+    entries = []
+    with app.app_context():
+        for key, path in list(cache_paths.items()):
+            entry = cache.get(key)
+            if entry is not None:
+                entries.append((key, path, entry))
+    try:
+        with open(f"{CACHE_STATE_FILE}.tmp", "wb") as f:
+            pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{CACHE_STATE_FILE}.tmp", CACHE_STATE_FILE)
+        logger.info(f"Saved {len(entries)} cache entries to {CACHE_STATE_FILE}")
+    except OSError as e:
+        logger.error(f"Failed to save cache state: {str(e)}")
+
+def load_cache_state():
+    """
+    Восстанавливает записи кэша, сохраненные при предыдущем завершении.
+    Записи, срок хранения которых истек, пропускаются.
+    """
+    if not CACHE_STATE_FILE or not os.path.exists(CACHE_STATE_FILE):
+        return
+    try:
+        with open(CACHE_STATE_FILE, "rb") as f:
+            entries = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError) as e:
+        logger.warning(f"Failed to load cache state: {str(e)}")
+        return
+
+    restored = 0
+    now = time()
+    with app.app_context():
+        for key, path, entry in entries:
+            remaining = entry["stored_at"] + entry["timeout"] + settings.cache_stale_timeout - now
+            if remaining <= 0:
+                continue
+            cache.set(key, entry, timeout=int(remaining))
+            cache_paths[key] = path
+            if entry["stored_at"] + entry["timeout"] > now:
+                cache_warmer.record_store(path, entry["stored_at"] + entry["timeout"] - now)
+            restored += 1
+    logger.info(f"Restored {restored} cache entries from {CACHE_STATE_FILE}")
+
+def draining_response():
+    """
+    Ответ на запросы, поступившие во время завершения работы.
+
+    :rtype: flask.Response
+    """
+    response = json_response({"success": False, "error": "Сервер завершает работу"}, status=503)
+    response.headers["Retry-After"] = "1"
+    return response
+
+def has_spare_capacity():
+    """
+    Проверяет, есть ли свободные воркеры сверх резерва под живой трафик.
+
+    :rtype: bool
+    """
+    with pool_lock:
+        busy = driver_count - len(driver_pool)
+    return settings.max_workers - busy > settings.cache_warm_reserve
+
+def warm_path(path):
+    """
+    Выполняет внутренний запрос к API с принудительным обновлением кэша.
+
+    :param path: Путь запроса вместе с параметрами.
+    :type path: str
+    """
+    with app.test_client() as client:
+        client.get(path, environ_base={"asapi.cache_refresh": True})
+
+cache_warmer = CacheWarmer(
+    warm_path,
+    has_spare_capacity,
+    paths=CACHE_WARM_PATHS,
+    top_n=int(os.getenv("CACHE_WARM_TOP_N", "20")),
+    ahead=int(os.getenv("CACHE_WARM_AHEAD", "300")),
+    rate=int(os.getenv("CACHE_WARM_RATE", "10"))
+)
+
+def warm_drivers():
+    """
+    Создает READY_MIN_DRIVERS драйверов заранее, чтобы первые запросы
+    после запуска не ждали старта Chrome.
+    """
+    while True:
+        driver = launch_driver(READY_MIN_DRIVERS)
+        if driver is None:
+            return
+        with pool_lock:
+            driver_pool.append(driver)
+
+def filters_cached():
+    """
+    Проверяет, есть ли в кэше ответ /api/v1/cars/filters без параметров.
+
+    :rtype: bool
+    """
+    with app.app_context():
+        return cache.get(f"filters_{frozenset()}") is not None
+
+def warm_filters():
+    """
+    Заполняет кэш фильтров сайта.
+
+    :raises RuntimeError: Если ответ не попал в кэш (сайт недоступен).
+    """
+    if not filters_cached():
+        warm_path(FILTERS_WARM_PATH)
+    if not filters_cached():
+        raise RuntimeError("Filters are not cached")
+
+startup_steps = [("cache_state", load_cache_state), ("drivers", warm_drivers)]
+readiness_checks = {"drivers": lambda: driver_count >= READY_MIN_DRIVERS}
+if READY_WARM_FILTERS:
+    startup_steps.append(("filters", warm_filters))
+    readiness_checks["filters"] = filters_cached
+startup = Startup(startup_steps, readiness_checks, started=BOOT_STARTED)
+
+def start(handle_signals=True):
+    """
+    Запускает экземпляр: фоновый прогрев драйверов и кэша фильтров,
+    прогрев популярных записей кэша и обработчики сигналов. Вызывается
+    при загрузке воркера (``wsgi.py``) или при старте ASGI сервера;
+    повторные вызовы ничего не делают.
+
+    :param handle_signals: Установить обработчики SIGTERM/SIGINT. ASGI
+        сервер устанавливает свои обработчики, поэтому для него False.
+    :type handle_signals: bool
+    """
+    if not startup.begin():
+        return
+    if handle_signals and current_thread() is main_thread():
+        signal.signal(signal.SIGTERM, handle_shutdown)
+        signal.signal(signal.SIGINT, handle_shutdown)
+    if CACHE_WARM_ENABLED:
+        cache_warmer.start()
+
+cache_stats = {"hits": 0, "misses": 0} # Обращения к кэшу эндпоинтов
+
+def cache_lookup(key, path):
+    """
+    Возвращает закэшированный ответ и учитывает обращение для прогрева.
+
+    :param key: Ключ кэша.
+    :type key: str
+    :param path: Путь запроса вместе с параметрами.
+    :type path: str
+    :return: Ответ из кэша или None.
+    :rtype: flask.Response
+    """
+    cache_warmer.record_hit(path)
+    entry = cache.get(key)
+    if entry is None or entry["stored_at"] + entry["timeout"] < time():
+        cache_stats["misses"] += 1
+        return None
+    cache_stats["hits"] += 1
+    car_prefetcher.record_hit(key)
+    response = entry_response(entry)
+    set_max_age(response, entry["stored_at"] + entry["timeout"] - time())
+    return response
+
+def stale_lookup(key):
+    """
+    Возвращает запись кэша, даже если ее время жизни истекло.
+    Используется, пока сайт недоступен.
+
+    :param key: Ключ кэша.
+    :type key: str
+    :return: Ответ из кэша или None.
+    :rtype: flask.Response
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    response = entry_response(entry)
+    response.cache_control.max_age = 0
+    response.headers["Warning"] = '110 - "Response is Stale"'
+    return response
+
+def entry_response(entry):
+    response = Response(entry["body"], status=200, content_type=entry["content_type"])
+    response.set_etag(entry["etag"])
+    response.encoded = entry["encoded"]
+    return response
+
+def cache_store(key, response, timeout, path):
+    """
+    Сохраняет успешный ответ в кэш вместе с моментом записи.
+
+    :param key: Ключ кэша.
+    :type key: str
+    :param response: Ответ эндпоинта.
+    :type response: flask.Response
+    :param timeout: Время жизни записи в секундах или функция, возвращающая
+        его (значение читается из настроек при каждой записи), None - по умолчанию.
+    :type timeout: int
+    :param path: Путь запроса вместе с параметрами.
+    :type path: str
+    """
+    if response.status_code != 200:
+        return
+    ttl = (timeout() if callable(timeout) else timeout) or app.config['CACHE_DEFAULT_TIMEOUT']
+
+    set_max_age(response, ttl)
+
+    def store(body, encoded):
+        etag = generate_etag(body)
+        with app.app_context():
+            cache.set(key, {
+                "body": body,
+                "content_type": response.content_type,
+                "encoded": encoded,
+                "etag": etag,
+                "stored_at": time(),
+                "timeout": ttl
+            }, timeout=ttl + settings.cache_stale_timeout)
+        cache_paths[key] = path
+        cache_warmer.record_store(path, ttl)
+        return etag
+
+    if not response.is_streamed:
+        body = response.get_data()
+        encoded = getattr(response, "encoded", None)
+        if encoded is None:
+            encoded = response.encoded = compress_all(body)
+        response.set_etag(store(body, encoded))
+        return
+
+    # Потоковый ответ сохраняем по мере отправки, не задерживая первый байт,
+    # сжатые варианты для кэша готовятся в фоне
+    def tee(chunks):
+        body = []
+        for chunk in chunks:
+            body.append(chunk)
+            yield chunk
+        body = b"".join(body)
+        # Во время завершения фоновые задачи уже не принимаются
+        if not draining.is_set():
+            background_executor.submit(lambda: store(body, compress_all(body)))
+
+    response.response = tee(response.response)
+
+def set_max_age(response, seconds):
+    """
+    Разрешает клиентам и CDN хранить ответ, пока он жив в кэше сервера.
+
+    :param response: Ответ эндпоинта.
+    :type response: flask.Response
+    :param seconds: Оставшееся время жизни записи в секундах.
+    :type seconds: float
+    """
+    response.cache_control.public = True
+    response.cache_control.max_age = max(int(seconds), 0)
+
+def conditional_response(response, environ):
+    """
+    Добавляет ETag и Cache-Control к ответу и обрабатывает If-None-Match.
+
+    Ответы из кэша приходят с готовым ETag, поэтому проверка не требует
+    повторного хеширования тела. Потоковые ответы без ETag отдаются как
+    есть, чтобы не собирать тело в памяти.
+
+    :param response: Ответ эндпоинта.
+    :type response: flask.Response
+    :param environ: WSGI окружение запроса.
+    :type environ: dict
+    :return: Исходный ответ или 304 Not Modified.
+    :rtype: flask.Response
+    """
+    if response.status_code != 200:
+        response.cache_control.no_store = True
+        return response
+    if "Cache-Control" not in response.headers:
+        response.cache_control.no_cache = True
+    if "ETag" not in response.headers:
+        if response.is_streamed:
+            return response
+        response.add_etag()
+    return response.make_conditional(environ)
+
+def precompressed(task):
+    """
+    Сжимает успешный ответ задачи в потоке воркера, чтобы поток запроса
+    только выбирал готовый вариант. Кодировки передаются задаче параметром
+    ``encodings`` (см. :func:`response_encodings`), по умолчанию ответ
+    сжимается всеми доступными.
+
+    :param task: Задача, возвращающая ответ.
+    :type task: callable
+    """
+    @wraps(task)
+    def wrapper(*args, encodings=None):
+        response = task(*args)
+        if response.status_code == 200 and not response.is_streamed:
+            response.encoded = compress_all(response.get_data(), encodings)
+        return response
+    return wrapper
+
+task_deadline = local() # Срок ответа клиенту для задачи, выполняемой в текущем потоке
+
+def deadline_bound(task):
+    """
+    Передает задаче срок ответа клиенту (параметр ``deadline``, по часам
+    ``monotonic``). После него клиент уже получил 504, поэтому повторы
+    скрапинга (:func:`scrape_with_retries`) не начинаются.
+
+    :param task: Задача, возвращающая ответ.
+    :type task: callable
+    """
+    @wraps(task)
+    def wrapper(*args, deadline=None, **kwargs):
+        task_deadline.value = deadline
+        try:
+            return task(*args, **kwargs)
+        finally:
+            task_deadline.value = None
+    return wrapper
+
+def response_encodings(cached, accept_encoding):
+    """
+    Кодировки, которыми задача заранее сжимает ответ. Ответ, который
+    попадет в кэш, сжимается всеми доступными кодировками для будущих
+    клиентов, остальные - один раз кодировкой, выбранной по
+    ``Accept-Encoding`` клиента.
+
+    :param cached: Ответ будет сохранен в кэш.
+    :type cached: bool
+    :param accept_encoding: Заголовок ``Accept-Encoding`` запроса.
+    :type accept_encoding: str
+    :return: Список кодировок или None - все доступные.
+    :rtype: list
+    """
+    if cached:
+        return None
+    encoding = negotiate(accept_encoding, available_encodings())
+    return [encoding] if encoding else []
+
+def upstream_guarded(task):
+    """
+    Выполняет задачу в слоте скрапинга сайта-источника. Пока сайт
+    восстанавливается или слоты заняты, сразу возвращает 503.
+
+    :param task: Задача, возвращающая ответ.
+    :type task: callable
+    """
+    @wraps(task)
+    def wrapper(*args, **kwargs):
+        try:
+            with upstream_health.slot(settings.upstream_slot_timeout):
+                return task(*args, **kwargs)
+        except UpstreamUnavailable as e:
+            return unavailable_response(e)
+    return wrapper
+
+def unavailable_response(error):
+    """
+    Ответ 503 при недоступности сайта-источника.
+
+    :param error: Причина отказа.
+    :type error: UpstreamUnavailable
+    :rtype: flask.Response
+    """
+    response = json_response({"success": False, "error": "Сайт временно недоступен"}, status=503)
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+def encode_response(response, environ):
+    """
+    Сжимает ответ кодировкой, выбранной по ``Accept-Encoding``.
+
+    Используются заранее сжатые варианты тела (из кэша или задачи),
+    потоковые ответы сжимаются по мере отправки. Остальные тела
+    сжимаются на месте, только если они не меньше ``MIN_SIZE``.
+
+    :param response: Ответ эндпоинта.
+    :type response: flask.Response
+    :param environ: WSGI окружение запроса.
+    :type environ: dict
+    :rtype: flask.Response
+    """
+    if response.status_code != 200 or "Content-Encoding" in response.headers:
+        return response
+    response.vary.add("Accept-Encoding")
+
+    encoded = getattr(response, "encoded", None)
+    if response.is_streamed:
+        encodings = available_encodings()
+    elif encoded is not None:
+        encodings = encoded.keys()
+    elif response.calculate_content_length() >= MIN_SIZE:
+        encodings = available_encodings()
+    else:
+        return response
+    encoding = negotiate(environ.get("HTTP_ACCEPT_ENCODING"), encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        response.set_data(encoded[encoding] if encoded else compress(response.get_data(), encoding))
+    response.headers["Content-Encoding"] = encoding
+
+    # У каждого варианта тела свой ETag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+def prepare_response(response, environ):
+    """
+    Сжатие и условная обработка ответа перед отправкой клиенту.
+
+    :rtype: flask.Response
+    """
+    return conditional_response(encode_response(response, environ), environ)
+
+@app.after_request
+def add_validators(response):
+    return prepare_response(response, request.environ)
+
+@app.before_request
+def start_timer():
+    request.environ["asapi.started"] = perf_counter()
+
+@app.before_request
+def reject_when_draining():
+    # Проверка живости отвечает до конца, чтобы процесс не перезапускали во время завершения
+    if draining.is_set() and request.path != "/healthz":
+        return draining_response()
+
+@app.after_request
+def record_traffic(response):
+    # Внутренние запросы прогревателя в журнал не попадают
+    if traffic_recorder and not request.environ.get("asapi.cache_refresh", False):
+        traffic_recorder.record(
+            request.method,
+            request.full_path.rstrip("?"),
+            response.status_code,
+            perf_counter() - request.environ["asapi.started"]
+        )
+    return response
+
+def cached_endpoint(make_cache_key, timeout=None):
+    """
+    Кэширует успешные ответы эндпоинта и учитывает обращения для прогрева.
+
+    Внутренние запросы прогревателя (``asapi.cache_refresh`` в environ)
+    минуют чтение из кэша и перезаписывают запись. Если сайт недоступен
+    (503, 504), отдается устаревшая запись, когда она еще хранится. Функция ключа и время
+    жизни доступны у эндпоинта как ``cache_key`` и ``cache_timeout``.
+
+    :param make_cache_key: Функция ключа от параметров запроса и аргументов пути,
+        None означает, что ответ на этот запрос не кэшируется.
+    :type make_cache_key: callable
+    :param timeout: Время жизни записи в секундах.
+    :type timeout: int
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = make_cache_key(request.args, *args, **kwargs)
+            if key is None:
+                return view(*args, **kwargs)
+
+            # Запрос профилирования по заголовку всегда выполняет скрапинг
+            if not (request.environ.get("asapi.cache_refresh", False)
+                    or profiler.requested(request.headers.get("X-Profile"))):
+                response = cache_lookup(key, request.full_path)
+                if response is not None:
+                    return response
+
+            # Успешный ответ попадет в кэш: задача сжимает его всеми кодировками
+            request.environ["asapi.cached"] = True
+            response = view(*args, **kwargs)
+            if response.status_code in (503, 504):
+                return stale_lookup(key) or response
+            cache_store(key, response, timeout, request.full_path)
+            return response
+
+        wrapper.cache_key = make_cache_key
+        wrapper.cache_timeout = timeout
+        return wrapper
+    return decorator
+
+def json_response(data, status=200):
+    """
+    Формирует JSON ответ API.
+
+    :param data: Тело ответа.
+    :type data: dict
+    :param status: HTTP код ответа.
+    :type status: int
+    :rtype: flask.Response
+    """
+    return Response(
+        json.dumps(data, ensure_ascii=False, indent=2),
+        status=status,
+        content_type='application/json; charset=utf-8'
+    )
+
+def json_stream_response(data, status=200, chunk_size=16384):
+    """
+    Формирует JSON ответ API, сериализуемый по частям при отправке.
+
+    :param data: Тело ответа.
+    :type data: dict
+    :param status: HTTP код ответа.
+    :type status: int
+    :param chunk_size: Размер отправляемых частей в байтах.
+    :type chunk_size: int
+    :rtype: flask.Response
+    """
+    def generate():
+        buffer = []
+        size = 0
+        for chunk in json.JSONEncoder(ensure_ascii=False, indent=2).iterencode(data):
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= chunk_size:
+                yield "".join(buffer).encode("utf-8")
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer).encode("utf-8")
+
+    return Response(generate(), status=status, content_type='application/json; charset=utf-8')
+
+def run_profiled(profile, task, *args):
+    """
+    Выполняет задачу с активным профилем и добавляет к ответу
+    заголовок ``Server-Timing``. Результат задачи, не являющийся ответом
+    (:meth:`ScrapeEndpoint.fetch`), возвращается как есть.
+
+    :param profile: Профиль запроса или None.
+    :type profile: Profile
+    :param task: Задача, возвращающая ответ.
+    :type task: callable
+    :rtype: flask.Response
+    """
+    if profile is None:
+        return task(*args)
+    with profiler.activate(profile):
+        response = task(*args)
+    if isinstance(response, Response):
+        response.headers["Server-Timing"] = profile.server_timing()
+    return response
+
+def submit_task(task, *args, priority=PRIORITY_NORMAL):
+    """
+    Отправляет задачу скрапинга в executor. Если запрос профилируется
+    (заголовок ``X-Profile`` или выборка), задача выполняется с профилем.
+    Запросы прогревателя кэша выполняются с низким приоритетом.
+
+    :param task: Задача, возвращающая ответ.
+    :type task: callable
+    :param priority: Приоритет задачи в executor.
+    :type priority: int
+    :rtype: concurrent.futures.Future
+    """
+    profile = profiler.start(request.path, request.headers.get("X-Profile"))
+    if request.environ.get("asapi.cache_refresh", False):
+        priority = PRIORITY_LOW
+    return executor.submit_priority(priority, run_profiled, profile, task, *args)
+
+def wait_response(future, timeout=None):
+    """
+    Ожидает ответ задачи, выполняемой в executor.
+
+    :param future: Задача executor, возвращающая ответ.
+    :type future: concurrent.futures.Future
+    :param timeout: Время ожидания в секундах, None - REQUEST_TIMEOUT.
+    :type timeout: float
+    :rtype: flask.Response
+    """
+    try:
+        return future.result(timeout=timeout if timeout is not None else settings.request_timeout)
+    except FutureTimeoutError:
+        return json_response({"success": False, "error": "Сайт не отвечает"}, status=504)
+
+endpoint_timings = CommandTimings() # Время задач скрапинга по эндпоинтам
+
+class ScrapeEndpoint:
+    """
+    Описание эндпоинта скрапинга. Эндпоинт объявляет, какую страницу
+    и каким методом Scraper скрапить, как получить аргументы из запроса,
+    как сформировать ответ, а также политику кэша, приоритет и таймаут.
+    Общий конвейер выполняет задачу в executor с приоритетом, в слоте
+    сайта-источника, на драйвере из пула с повторами, сжимает ответ,
+    переводит ошибки в ответы 400/404/500/504 и учитывает время задачи
+    в метриках.
+
+    :param name: Имя эндпоинта в метриках.
+    :type name: str
+    :param url: Функция аргументов задачи, возвращающая URL страницы.
+    :type url: callable
+    :param scrape: Функция ``(scraper, *args)``, вызывающая метод Scraper.
+    :type scrape: callable
+    :param render: Функция результата, возвращающая поля успешного ответа.
+    :type render: callable
+    :param parse_args: Функция ``(args, **path)``, возвращающая кортеж аргументов
+        задачи. ValueError (в том числе FilterValueError) дает ответ 400.
+    :type parse_args: callable
+    :param cache_key: Функция ключа кэша ``(args, **path)``.
+    :type cache_key: callable
+    :param cache_timeout: Время жизни записи кэша или функция, возвращающая
+        его, None - по умолчанию.
+    :type cache_timeout: int
+    :param priority: Приоритет задачи в executor.
+    :type priority: int
+    :param timeout: Сколько секунд ждать результата, None - REQUEST_TIMEOUT.
+    :type timeout: float
+    :param stream: Отдавать ответ потоком.
+    :type stream: bool
+    :param process: Функция ``(result, *args)``, выполняемая в воркере после
+        скрапинга (обновление индексов); ее результат передается в ``render``.
+    :type process: callable
+    :param shortcut: Функция аргументов задачи, возвращающая ответ без
+        скрапинга или None.
+    :type shortcut: callable
+    """
+
+    def __init__(self, name, url, scrape, render, parse_args=lambda args: (), cache_key=None,
+                 cache_timeout=None, priority=PRIORITY_NORMAL, timeout=None, stream=False,
+                 process=None, shortcut=None):
+        self.name = name
+        self.url = url
+        self.scrape = scrape
+        self.render = render
+        self.parse_args = parse_args
+        self.cache_key = cache_key or (lambda args, **path: f"{name}_{frozenset(args.items())}")
+        self.cache_timeout = cache_timeout
+        self.priority = priority
+        self.timeout = timeout
+        self.stream = stream
+        self.process = process
+        self.shortcut = shortcut
+        self.task = deadline_bound(precompressed(upstream_guarded(self.run)))
+
+    def scrape_result(self, *args):
+        """
+        Скрапит страницу на драйвере из пула с повторами и обрабатывает
+        результат ``process``. Слот сайта-источника занимает вызывающий.
+        """
+        result = scrape_with_retries(self.url(*args), lambda scraper: self.scrape(scraper, *args))
+        if self.process is not None:
+            result = self.process(result, *args)
+        return result
+
+    def run(self, *args):
+        """
+        Скрапит страницу и формирует ответ.
+        Выполняется в executor на драйвере из пула.
+
+        :rtype: flask.Response
+        """
+        started = perf_counter()
+        try:
+            result = self.scrape_result(*args)
+            data = {"success": True, **self.render(result)}
+            return json_stream_response(data) if self.stream else json_response(data)
+        except NoSuchElementException:
+            return json_response({"success": False, "error": "Данные не найдены"}, status=404)
+        except Exception as e:
+            logger.error(f"Error: {str(e)}")
+            return json_response({"success": False, "error": str(e)}, status=500)
+        finally:
+            endpoint_timings.record(self.name, perf_counter() - started)
+
+    def fetch(self, *args):
+        """
+        Скрапит страницу в слоте сайта-источника и возвращает обработанный
+        результат без формирования ответа: для обработчиков и фоновых задач,
+        которым нужны данные эндпоинта. Выполняется в executor.
+
+        :raises UpstreamUnavailable: Если сайт недоступен.
+        :raises NoSuchElementException: Если данные не найдены.
+        """
+        started = perf_counter()
+        try:
+            with upstream_health.slot(settings.upstream_slot_timeout):
+                return self.scrape_result(*args)
+        finally:
+            endpoint_timings.record(self.name, perf_counter() - started)
+
+    def submit(self, *args, priority=None):
+        """
+        Ставит :meth:`fetch` в executor с приоритетом эндпоинта. В запросе
+        Flask задача профилируется так же, как запросы самого эндпоинта.
+
+        :param priority: Приоритет задачи, None - приоритет эндпоинта.
+        :type priority: int
+        :rtype: concurrent.futures.Future
+        """
+        profile = profiler.start(request.path, request.headers.get("X-Profile")) if has_request_context() else None
+        priority = self.priority if priority is None else priority
+        return executor.submit_priority(priority, run_profiled, profile, self.fetch, *args)
+
+    def respond(self, args, **path):
+        """
+        Обрабатывает запрос эндпоинта в потоке Flask.
+
+        :param args: Параметры запроса.
+        :type args: werkzeug.datastructures.MultiDict
+        :rtype: flask.Response
+        """
+        try:
+            task_args = self.parse_args(args, **path)
+        except ValueError as e:
+            return json_response({"success": False, "error": str(e)}, status=400)
+        if self.shortcut is not None:
+            response = self.shortcut(*task_args)
+            if response is not None:
+                return response
+        encodings = response_encodings(
+            request.environ.get("asapi.cached", False), request.headers.get("Accept-Encoding")
+        )
+        timeout = self.timeout if self.timeout is not None else settings.request_timeout
+        task = partial(self.task, encodings=encodings, deadline=monotonic() + timeout)
+        return wait_response(submit_task(task, *task_args, priority=self.priority), timeout=timeout)
+
+def scrape_endpoint(endpoint):
+    """
+    Делает view эндпоинта скрапинга из функции с документацией:
+    запрос обрабатывается конвейером ``endpoint`` с его политикой кэша.
+
+    :param endpoint: Описание эндпоинта.
+    :type endpoint: ScrapeEndpoint
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**path):
+            return endpoint.respond(request.args, **path)
+        wrapper.scrape_endpoint = endpoint
+        return cached_endpoint(endpoint.cache_key, timeout=endpoint.cache_timeout)(wrapper)
+    return decorator
+
+def int_arg(name):
+    """
+    Читает неотрицательный целочисленный параметр запроса.
+
+    :param name: Имя параметра.
+    :type name: str
+    :return: Значение или None, если параметр не передан.
+    :rtype: int
+    :raises ValueError: Если значение не является числом.
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValueError(f"Invalid number: {name}")
+    return int(value)
+
+def acquire_driver():
+    """
+    Берет свободный драйвер из пула или создает новый.
+
+    :rtype: webdriver.Remote
+    """
+    with pool_lock:
+        if driver_pool:
+            return driver_pool.pop()
+    return create_driver()
+
+def release_driver(driver, failure=None):
+    """
+    Возвращает драйвер в пул после попытки скрапинга. Драйвер с потерянной
+    сессией или с DRIVER_MAX_FAILURES сбоями подряд выводится из пула
+    и заменяется в фоне. Исправный драйвер, превысивший пределы памяти
+    (DRIVER_MAX_RSS_MB, DRIVER_MAX_JS_HEAP_MB), тоже заменяется. Драйверы
+    сверх уменьшенного MAX_WORKERS завершаются без замены.
+
+    :param driver: Экземпляр WebDriver.
+    :type driver: webdriver.Remote
+    :param failure: Класс ошибки попытки или None при успехе.
+    :type failure: str
+    """
+    global quarantined_count, recycled_count, retiring_count
+    # Отсутствие данных на странице и ошибки сайта не говорят о неисправности драйвера
+    healthy = failure is None or failure in (SELECTOR_MISS, UPSTREAM_ERROR)
+    # Память проверяется вне блокировки пула: замер обращается к браузеру
+    recycle = driver_memory.check(driver) if healthy else None
+    with pool_lock:
+        if healthy:
+            driver_failures.pop(driver, None)
+            if recycle is None:
+                # После уменьшения MAX_WORKERS лишний драйвер завершается без замены
+                if driver_count - retiring_count <= settings.max_workers or draining.is_set():
+                    driver_pool.append(driver)
+                    return
+                retiring_count += 1
+                background_executor.submit(retire_driver, driver)
+                return
+            recycled_count += 1
+        else:
+            failures = driver_failures.pop(driver, 0) + 1
+            if failure != DEAD_SESSION and failures < settings.driver_max_failures:
+                driver_failures[driver] = failures
+                driver_pool.append(driver)
+                return
+            quarantined_count += 1
+
+    if not healthy:
+        logger.warning(f"Quarantining driver after {failures} failure(s), last: {failure}")
+    if draining.is_set():
+        # Замена не нужна, процессы драйвера завершатся при остановке
+        return
+    background_executor.submit(replace_driver, driver)
+
+def replace_driver(driver):
+    """
+    Завершает выведенный из пула драйвер и создает ему замену.
+
+    :param driver: Экземпляр WebDriver.
+    :type driver: webdriver.Remote
+    """
+    try:
+        quit_driver(driver)
+    except Exception as e:
+        logger.warning(f"Failed to quit quarantined driver: {str(e)}")
+
+    try:
+        driver = launch_driver(settings.max_workers)
+        if driver is not None:
+            with pool_lock:
+                driver_pool.append(driver)
+    except Exception as e:
+        logger.error(f"Failed to create replacement driver: {str(e)}")
+
+def retire_driver(driver):
+    """
+    Завершает драйвер, ставший лишним после уменьшения MAX_WORKERS.
+
+    :param driver: Экземпляр WebDriver.
+    :type driver: webdriver.Remote
+    """
+    global retiring_count
+    try:
+        quit_driver(driver)
+    except Exception as e:
+        logger.warning(f"Failed to quit retired driver: {str(e)}")
+    finally:
+        with pool_lock:
+            retiring_count -= 1
+
+def resize_pool(max_workers):
+    """
+    Применяет новый MAX_WORKERS: число задач executor, верхнюю границу
+    слотов сайта-источника и размер пула. Свободные драйверы сверх
+    предела завершаются сразу, занятые - при возврате в пул; при
+    увеличении новые драйверы создаются по мере надобности.
+
+    :param max_workers: Новое число воркеров.
+    :type max_workers: int
+    """
+    global retiring_count
+    executor.resize(max_workers)
+    upstream_health.set_max_limit(max_workers)
+    with pool_lock:
+        excess = max(driver_count - retiring_count - max_workers, 0)
+        idle = [driver_pool.pop() for _ in range(min(excess, len(driver_pool)))]
+        retiring_count += len(idle)
+    for driver in idle:
+        background_executor.submit(retire_driver, driver)
+    logger.info(f"Pool resized to {max_workers} workers, retiring {len(idle)} idle driver(s)")
+
+def configure_driver(driver):
+    """
+    Приводит таймаут асинхронных скриптов драйвера к PAGE_TIMEOUT:
+    ожидание загрузки страницы выполняется скриптом в браузере.
+
+    :param driver: Экземпляр WebDriver.
+    :type driver: webdriver.Remote
+    """
+    timeout = settings.page_timeout + 5
+    if driver_script_timeouts.get(driver) != timeout:
+        driver.set_script_timeout(timeout)
+        driver_script_timeouts[driver] = timeout
+
+def scrape_with_retries(url, scrape):
+    """
+    Выполняет скрапинг на драйвере из пула с повторами при временных сбоях.
+
+    Сбои навигации, потерянная сессия и ответы сайта 5xx повторяются
+    до SCRAPE_RETRIES раз, пока это позволяет бюджет повторов, сайт не
+    признан недоступным и не истек срок ответа клиенту (:func:`deadline_bound`).
+    Каждая попытка заново берет драйвер из пула, поэтому после потери
+    сессии повтор выполняется на другом драйвере.
+
+    :param url: URL страницы для Scraper.
+    :type url: str
+    :param scrape: Функция от Scraper, возвращающая результат.
+    :type scrape: callable
+    :raises Exception: Ошибка последней попытки.
+    """
+    retry_budget.deposit()
+    deadline = getattr(task_deadline, "value", None)
+    attempt = 0
+    while True:
+        driver = acquire_driver()
+        failure = None
+        profile = current_profile()
+        try:
+            configure_driver(driver)
+            scraper = Scraper(
+                url=url,
+                driver=driver,
+                snapshot_store=snapshot_store,
+                health=upstream_health,
+                reuse_searchpage=SEARCHPAGE_REUSE,
+                page_timeout=settings.page_timeout,
+                filter_delay_ms=settings.filter_delay_ms
+            )
+            if profile is not None:
+                profiler.start_driver(driver, profile)
+            return scrape(scraper)
+        except Exception as e:
+            failure = classify_failure(e)
+            # Повтор, начатый после срока ответа, клиент уже не дождется
+            expired = deadline is not None and monotonic() + SCRAPE_RETRY_BACKOFF * (attempt + 1) >= deadline
+            if (failure not in RETRYABLE or attempt >= settings.scrape_retries or expired
+                    or upstream_health.is_open() or not retry_budget.withdraw()):
+                raise
+            logger.warning(f"Retrying after {failure} failure: {str(e)}")
+        finally:
+            # Метрики Chrome забираются и после неудачной попытки, пока драйвер не вернулся в пул
+            if profile is not None and failure != DEAD_SESSION:
+                profiler.finish_driver(driver, profile)
+            release_driver(driver, failure)
+        attempt += 1
+        sleep(SCRAPE_RETRY_BACKOFF * attempt)
+
+filter_resolver = None
+resolver_refresh = None # Задача обновления снимка фильтров, одна на все запросы
+resolver_lock = Lock()
+
+def update_filter_resolver(variants):
+    """
+    Перестраивает резолвер фильтров по свежему снимку вариантов сайта.
+
+    :param variants: Результат ``scrape_filters(with_values=True)``.
+    :type variants: dict
+    :rtype: FilterResolver
+    """
+    global filter_resolver
+    resolver = FilterResolver(variants)
+    with resolver_lock:
+        filter_resolver = resolver
+    return resolver
+
+def refresh_filter_resolver():
+    """
+    Ставит в очередь скрапинг снимка вариантов фильтров (конвейер
+    ``filters_endpoint``), если он еще не выполняется. Скрапинг идет вне
+    блокировки резолвера, новый резолвер подменяет прежний в
+    ``update_filter_resolver``.
+
+    :return: Задача обновления, общая для всех ожидающих запросов.
+    :rtype: concurrent.futures.Future
+    """
+    global resolver_refresh
+    def done(future):
+        global resolver_refresh
+        with resolver_lock:
+            if resolver_refresh is future:
+                resolver_refresh = None
+
+    with resolver_lock:
+        if resolver_refresh is not None:
+            return resolver_refresh
+        future = resolver_refresh = filters_endpoint.submit()
+    future.add_done_callback(done)
+    return future
+
+def get_filter_resolver():
+    """
+    Возвращает резолвер значений фильтров. Снимок вариантов сайта
+    скрапится заново не чаще раза в CACHE_DEFAULT_TIMEOUT; пока он
+    обновляется, запросы обслуживаются устаревшим резолвером. Ждать
+    скрапинга приходится только до построения первого резолвера.
+
+    :rtype: FilterResolver
+    :raises concurrent.futures.TimeoutError: Если первый снимок не получен вовремя.
+    :raises UpstreamUnavailable: Если сайт недоступен.
+    """
+    resolver = filter_resolver
+    if resolver is not None and not resolver.is_expired(app.config['CACHE_DEFAULT_TIMEOUT']):
+        return resolver
+    refresh = refresh_filter_resolver()
+    if resolver is not None:
+        return resolver
+    refresh.result(timeout=settings.request_timeout)
+    return filter_resolver
+
+def peek_filter_resolver():
+    """
+    Возвращает резолвер фильтров, если он уже построен (в том числе
+    устаревший), то есть разбор фильтров не будет ждать скрапинга.
+
+    :rtype: FilterResolver
+    """
+    return filter_resolver
+
+def resolve_filters(filters):
+    """
+    Приводит значения фильтров к точным меткам вариантов сайта.
+    Если снимок вариантов получить не удалось, значения возвращаются как есть.
+
+    :param filters: Фильтры запроса.
+    :type filters: dict
+    :rtype: dict
+    :raises FilterValueError: Если значение не найдено среди вариантов.
+    """
+    try:
+        resolver = get_filter_resolver()
+    except Exception as e:
+        logger.warning(f"Filter resolver unavailable: {str(e)}")
+        return filters
+    return resolver.resolve_all(filters)
+
+def card_label(field, value):
+    """
+    Приводит текст карточки автомобиля (топливо, цвет) к метке варианта
+    фильтра сайта, чтобы в индексе он совпадал с разобранным фильтром
+    запроса. Без снимка вариантов или при отсутствии совпадения текст
+    возвращается как есть.
+
+    :rtype: str
+    """
+    resolver = peek_filter_resolver()
+    if resolver is None:
+        return value
+    try:
+        return resolver.resolve(field, value)
+    except FilterValueError:
+        return value
+
+def parse_cars_args(args):
+    """
+    Разбирает параметры запроса списка автомобилей.
+
+    :param args: Параметры запроса.
+    :type args: werkzeug.datastructures.MultiDict
+    :return: Фильтры, сортировка и номер страницы.
+    :rtype: tuple
+    """
+    filters = {
+        "brand": args.get("brand"),
+        "model": args.get("model"),
+        "gen": args.get("gen"),
+        "transmission": args.get("transmission"),
+        "fuel": args.get("fuel"),
+        "color": args.get("color"),
+        "mileage_from": args.get("mileage_from"),
+        "mileage_to": args.get("mileage_to"),
+        "year_release_from": args.get("year_from"),
+        "year_release_to": args.get("year_to"),
+        "price_from": args.get("price_from"),
+        "price_to": args.get("price_to")
+    }
+    return filters, args.get("order_by"), args.get("page_num", default="1")
+
+def cars_args(args):
+    """
+    Аргументы задачи списка автомобилей: номер страницы, фильтры
+    со значениями сайта и сортировка.
+
+    :raises FilterValueError: При недопустимом значении фильтра.
+    :rtype: tuple
+    """
+    filters, order_by, page_num = parse_cars_args(args)
+    return page_num, resolve_filters(filters), order_by
+
+def index_cars(result, page_num, filters, order_by):
+    """
+    Добавляет скрапнутую страницу списка в локальный индекс объявлений
+    и ставит в очередь предзагрузку первых автомобилей страницы.
+    """
+    cars_data, _ = result
+    listing_store.upsert(cars_data, filters, labels=card_label)
+    if CAR_PREFETCH_ENABLED:
+        car_prefetcher.schedule([car.get("id") for car in cars_data])
+    return result
+
+cars_endpoint = ScrapeEndpoint(
+    "cars",
+    url=lambda *args: SEARCHPAGE_URL,
+    scrape=lambda scraper, page_num, filters, order_by: (
+        scraper.scrape_cars(page_num, filters, order_by=order_by), scraper._get_pages_nums()
+    ),
+    process=index_cars,
+    render=lambda result: {"count": len(result[0]), "page_info": result[1], "cars": result[0]},
+    parse_args=cars_args,
+    cache_timeout=lambda: settings.cache_cars_timeout
+)
+
+@app.route("/api/v1/cars", methods=["GET"])
+@scrape_endpoint(cars_endpoint)
+def get_cars():
+    """
+    Получение списка автомобилей с возможностью фильтрации, сортировки и пагинации.
+    
+    Поддерживаемые параметры запроса:
+    - brand: Марка автомобиля (опционально)
+    - model: Модель автомобиля (опционально)
+    - gen: Поколение модели (опционально)
+    - page_num: Номер страницы (по умолчанию '1')
+    - year_from: Год выпуска от (опционально)
+    - year_to: Год выпуска до (опционально)
+    - price_from: Цена от (опционально)
+    - price_to: Цена до (опционально)
+    - order_by: Параметр сортировки (опционально)
+    
+    Returns:
+        Response: JSON ответ с данными об автомобилях и информацией о пагинации
+        
+    Пример запроса:
+        GET /api/v1/cars?brand=Toyota&model=Camry&page_num=2&order_by=sort__price_desc
+        
+    Структура ответа:
+    {
+        "success": boolean,  # Статус выполнения запроса
+        "count": integer,    # Количество найденных автомобилей
+        "page_info": {       # Информация о пагинации
+            "pages_nums": [string],  # Доступные страницы
+            "cur_page_num": string   # Текущая страница
+        },
+        "cars": [            # Список автомобилей
+            {
+                "id": string,        # Уникальный идентификатор
+                "title": string,     # Название автомобиля
+                "price": string,     # Цена
+                "year": string,      # Год выпуска
+                "image": string,     # URL изображения
+                "fuel": string,      # Тип топлива
+                "mileage": string,   # Пробег
+                "color": string      # Цвет
+            },
+            ...
+        ]
+    }
+    
+    Коды статуса HTTP:
+    - 200: Успешный запрос
+    - 400: Недопустимое значение фильтра
+    - 404: Данные не найдены
+    - 500: Внутренняя ошибка сервера
+    - 504: Таймаут при ожидании ответа от сайта
+    """
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """
+    Проверка живости: процесс запущен и обслуживает запросы.
+    Не зависит от драйверов и сайта-источника.
+
+    :status 200: Процесс жив
+    """
+    response = json_response({"success": True, "status": "alive"})
+    response.cache_control.no_store = True
+    return response
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """
+    Проверка готовности: созданы READY_MIN_DRIVERS драйверов и заполнен
+    кэш фильтров. До готовности балансировщик не направляет трафик
+    на экземпляр.
+
+    :Example Response:
+        {
+            "success": true,
+            "ready": true,
+            "checks": {"drivers": true, "filters": true},
+            "startup": {
+                "uptime": 84.2,
+                "import_seconds": 0.412,
+                "ready_seconds": 6.93,
+                "phases": {"drivers": 2.71, "filters": 3.8},
+                "failures": {}
+            }
+        }
+
+    :status 200: Экземпляр готов
+    :status 503: Экземпляр прогревается
+    """
+    ready = startup.is_ready()
+    response = json_response({
+        "success": ready,
+        "ready": ready,
+        "checks": startup.check(),
+        "startup": startup.stats()
+    }, status=200 if ready else 503)
+    response.cache_control.no_store = True
+    return response
+
+@app.route("/api/v1/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Текущее состояние пула драйверов и сайта-источника, время выполнения команд WebDriver.
+
+    :Example Response:
+        {
+            "success": true,
+            "pool": {
+                "max_workers": 3,
+                "queued": {"0": 1, "1": 4},
+                "drivers": 3,
+                "idle": 2,
+                "quarantined": 0,
+                "recycled": 1
+            },
+            "webdriver_commands": {
+                "executeScript": {
+                    "count": 120,
+                    "avg_ms": 14.2,
+                    "p50_ms": 9.8,
+                    "p95_ms": 41.0,
+                    "max_ms": 210.5
+                }
+            },
+            "driver_memory": {
+                "max_rss_mb": 1024,
+                "max_js_heap_mb": 384,
+                "total_rss_mb": 1312.4,
+                "recycled": {"rss_limit": 1, "js_heap_limit": 0},
+                "drivers": [
+                    {"uses": 35, "rss_mb": 702.1, "js_heap_mb": 148.3, "processes": 6},
+                    {"uses": 12, "rss_mb": 610.3, "js_heap_mb": 97.0, "processes": 6}
+                ]
+            },
+            "upstream": {
+                "state": "closed",
+                "limit": 3.0,
+                "active": 1,
+                "calls": 20,
+                "failure_rate": 0.05,
+                "p50_ms": 2100.0,
+                "p95_ms": 5400.0
+            },
+            "retry_budget": {"available": 9.4, "retries": 3, "rejected": 0},
+            "cache": {"hits": 310, "misses": 42},
+            "price_calculator": {
+                "currency_date": "16-07-2025 23:21",
+                "rates": {"EUR": "91.1531"},
+                "cars": 120,
+                "years_with_schedule": [2020, 2021],
+                "cached": 85,
+                "computed": 40,
+                "scraped": 120,
+                "verified": 2,
+                "mismatches": 0
+            },
+            "endpoints": {
+                "cars": {
+                    "count": 52,
+                    "avg_ms": 3120.4,
+                    "p50_ms": 2870.0,
+                    "p95_ms": 5230.1,
+                    "max_ms": 8011.7
+                }
+            },
+            "startup": {
+                "uptime": 84.2,
+                "import_seconds": 0.412,
+                "ready_seconds": 6.93,
+                "phases": {"drivers": 2.71, "filters": 3.8},
+                "failures": {}
+            },
+            "cache_warmer": {
+                "/api/v1/cars/filters?": {"hits": 42, "expires_in": 1800}
+            },
+            "car_prefetch": {
+                "scheduled": 40,
+                "prefetched": 36,
+                "failed": 1,
+                "hits": 21,
+                "unused": 9,
+                "skipped_cached": 55,
+                "skipped_rate": 0,
+                "skipped_budget": 12,
+                "skipped_capacity": 4,
+                "pending": 1,
+                "tracked": 6,
+                "hit_rate": 0.7
+            },
+            "option_index": {
+                "cars": 380,
+                "terms": {"option": 214, "spec": 1320, "check": 96, "inspection": 640}
+            }
+        }
+
+    :status 200: Успешный запрос
+    """
+    with pool_lock:
+        pool = {
+            "max_workers": settings.max_workers,
+            "queued": executor.queued(),
+            "drivers": driver_count,
+            "idle": len(driver_pool),
+            "quarantined": quarantined_count,
+            "recycled": recycled_count
+        }
+    return json_response({
+        "success": True,
+        "pool": pool,
+        "webdriver_commands": command_timings.stats(),
+        "driver_memory": driver_memory.stats(),
+        "upstream": upstream_health.stats(),
+        "retry_budget": retry_budget.stats(),
+        "cache": dict(cache_stats),
+        "price_calculator": price_calculator.stats(),
+        "endpoints": endpoint_timings.stats(),
+        "startup": startup.stats(),
+        "cache_warmer": cache_warmer.stats(),
+        "car_prefetch": car_prefetcher.stats(),
+        "option_index": option_index.info()
+    })
+
+def index_backfill(result, filters, pages):
+    """
+    Записывает автомобили первых страниц выдачи в локальный индекс.
+    Набор фильтров сайта отмечается покрытым, только если скрапинг дошел
+    до последней страницы выдачи, иначе индекс для него неполон.
+    """
+    cars_data, complete = result
+    listing_store.upsert(cars_data, filters, labels=card_label)
+    if complete:
+        listing_store.mark_covered(filters)
+    return result
+
+# Дозагрузка выдачи в локальный индекс для /api/v1/cars/query, без собственного маршрута
+cars_backfill_endpoint = ScrapeEndpoint(
+    "cars_backfill",
+    url=lambda filters, pages: SEARCHPAGE_URL,
+    scrape=lambda scraper, filters, pages: scraper.scrape_cars_pages(filters, None, pages),
+    process=index_backfill,
+    render=lambda result: {"count": len(result[0]), "cars": result[0], "complete": result[1]}
+)
+
+@app.route("/api/v1/cars/query", methods=["GET"])
+def query_cars():
+    """
+    Поиск автомобилей в локальном индексе по произвольным диапазонам цены,
+    пробега и года с сортировкой по нескольким ключам и пагинацией.
+
+    Если для запроса в индексе нет свежих данных, скрапится выдача сайта
+    с ближайшим охватывающим диапазоном из выпадающих списков. Если выдача
+    длиннее LISTING_BACKFILL_PAGES страниц, в индекс попадает только ее
+    начало: ответ содержит ``"complete": false``, а ``total`` считает лишь
+    проиндексированные объявления.
+
+    Поддерживаемые параметры запроса:
+    - brand, model, gen, fuel, color: Точные значения (опционально)
+    - price_min, price_max: Цена в рублях (опционально)
+    - mileage_min, mileage_max: Пробег в км (опционально)
+    - year_min, year_max: Год выпуска (опционально)
+    - sort: Ключи сортировки через запятую, "-" означает убывание,
+      доступны price, mileage, year, seen_at, id (например "price,-year")
+    - offset: Смещение (по умолчанию 0)
+    - limit: Размер страницы (по умолчанию 20, максимум 100)
+
+    :Example HTTP GET:
+        GET /api/v1/cars/query?brand=Toyota&price_min=1250000&price_max=1800000&sort=price,-year&limit=20
+
+    :Example Response:
+        {
+            "success": true,
+            "count": 1,
+            "total": 1,
+            "complete": true,
+            "offset": 0,
+            "limit": 20,
+            "cars": [
+                {
+                    "id": "12345",
+                    "title": "Toyota Camry 2020",
+                    "price": "1 300 000 ₽",
+                    "year": "2020",
+                    "image": "http://example.com/image1.jpg",
+                    "fuel": "Бензин",
+                    "mileage": "50 000 км",
+                    "color": "Серебристый"
+                }
+            ]
+        }
+
+    :status 200: Успешный запрос
+    :status 400: Некорректные параметры
+    :status 404: Данные не найдены
+    :status 500: Внутренняя ошибка сервера
+    :status 503: Сайт временно недоступен
+    :status 504: Таймаут при ожидании ответа от сайта
+    """
+    try:
+        ranges = {
+            field: (int_arg(f"{field}_min"), int_arg(f"{field}_max"))
+            for field in RANGE_FIELDS
+        }
+        offset = int_arg("offset") or 0
+        limit = min(int_arg("limit") or 20, 100)
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, status=400)
+
+    sort = [key for key in request.args.get("sort", "").split(",") if key]
+
+    try:
+        # Фильтры сайта: точные значения + ближайшие охватывающие диапазоны.
+        # Без снимка вариантов значения передаются как есть, а диапазоны не
+        # ограничивают скрапинг: объявления отбираются уже в локальном индексе
+        equals = resolve_filters({field: request.args.get(field) for field in TEXT_FIELDS})
+        site_filters = dict(equals)
+        resolver = peek_filter_resolver()
+        if resolver is not None and any(low is not None or high is not None for low, high in ranges.values()):
+            snapshot = resolver.labels()
+            for field, (low, high) in ranges.items():
+                from_key, to_key = RANGE_FIELDS[field]
+                site_filters[from_key], site_filters[to_key] = enclosing_range(
+                    snapshot.get(from_key, []), snapshot.get(to_key, []), low, high
+                )
+
+        complete = True
+        if not listing_store.is_covered(site_filters, LISTING_COVERAGE_TTL):
+            backfill = cars_backfill_endpoint.submit(site_filters, LISTING_BACKFILL_PAGES)
+            try:
+                _, complete = backfill.result(timeout=settings.request_timeout * LISTING_BACKFILL_PAGES)
+            except FutureTimeoutError:
+                backfill.cancel()
+                raise
+
+        total, cars_data = listing_store.query(ranges, equals, sort, offset, limit)
+
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, status=400)
+    except NoSuchElementException:
+        return json_response({"success": False, "error": "Данные не найдены"}, status=404)
+    except FutureTimeoutError:
+        return json_response({"success": False, "error": "Сайт не отвечает"}, status=504)
+    except UpstreamUnavailable as e:
+        return unavailable_response(e)
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return json_response({"success": False, "error": str(e)}, status=500)
+
+    return json_response({
+        "success": True,
+        "count": len(cars_data),
+        "total": total,
+        "complete": complete,
+        "offset": offset,
+        "limit": limit,
+        "cars": cars_data
+    })
+
+@app.route("/api/v1/stats", methods=["GET"])
+def get_stats():
+    """
+    Статистика по объявлениям локального индекса, сгруппированным по марке,
+    модели или поколению: цена, пробег, год, цена за километр пробега,
+    распределение по годам и гистограмма цен. Учитываются все объявления,
+    попавшие в индекс через /api/v1/cars и /api/v1/cars/query.
+
+    Поддерживаемые параметры запроса:
+    - group_by: Уровень группировки: brand, model или gen (по умолчанию model)
+    - brand, model, gen: Точные значения (опционально)
+    - bins: Число интервалов гистограммы цен (по умолчанию 10, максимум 50)
+    - min_count: Минимум объявлений в группе (по умолчанию 1)
+
+    :Example HTTP GET:
+        GET /api/v1/stats?brand=Toyota&group_by=model&bins=5
+
+    :Example Response:
+        {
+            "success": true,
+            "total": 42,
+            "count": 1,
+            "groups": [
+                {
+                    "brand": "toyota",
+                    "model": "camry",
+                    "count": 42,
+                    "price": {"median": 1850000, "mean": 1912000, "p25": 1500000, "p75": 2300000, "min": 950000, "max": 3400000},
+                    "mileage": {"median": 61000, "mean": 70500, "p25": 32000, "p75": 98000, "min": 0, "max": 210000},
+                    "year": {"median": 2019, "mean": 2018, "p25": 2017, "p75": 2021, "min": 2012, "max": 2023},
+                    "price_per_km": {"median": 31.4},
+                    "years": {"2019": 9, "2020": 7},
+                    "price_histogram": {
+                        "edges": [950000, 1440000, 1930000, 2420000, 2910000, 3400000],
+                        "counts": [6, 15, 12, 6, 3]
+                    }
+                }
+            ]
+        }
+
+    :status 200: Успешный запрос
+    :status 400: Некорректные параметры
+    :status 501: Аналитика недоступна (не установлен numpy)
     """
-    with pool_lock:
-        for driver in driver_pool:
-            driver.quit()
-        driver_pool.clear()
-atexit.register(cleanup)
+    if listing_analytics is None:
+        return json_response({"success": False, "error": "Аналитика недоступна: не установлен numpy"}, status=501)
+    try:
+        bins = min(int_arg("bins") or 10, 50)
+        min_count = int_arg("min_count") or 1
+        result = listing_analytics.stats(
+            request.args.get("group_by", "model"),
+            {field: request.args.get(field) for field in GROUP_LEVELS},
+            bins=bins,
+            min_count=min_count
+        )
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, status=400)
 
-@app.route("/api/v1/cars", methods=["GET"])
-def get_cars():
-    """
-    Получение списка автомобилей с возможностью фильтрации, сортировки и пагинации.
-    
-    Поддерживаемые параметры запроса:
-    - brand: Марка автомобиля (опционально)
-    - model: Модель автомобиля (опционально)
-    - gen: Поколение модели (опционально)
-    - page_num: Номер страницы (по умолчанию '1')
-    - year_from: Год выпуска от (опционально)
-    - year_to: Год выпуска до (опционально)
-    - price_from: Цена от (опционально)
-    - price_to: Цена до (опционально)
-    - order_by: Параметр сортировки (опционально)
-    
-    Returns:
-        Response: JSON ответ с данными об автомобилях и информацией о пагинации
-        
-    Пример запроса:
-        GET /api/v1/cars?brand=Toyota&model=Camry&page_num=2&order_by=sort__price_desc
-        
-    Структура ответа:
-    {
-        "success": boolean,  # Статус выполнения запроса
-        "count": integer,    # Количество найденных автомобилей
-        "page_info": {       # Информация о пагинации
-            "pages_nums": [string],  # Доступные страницы
-            "cur_page_num": string   # Текущая страница
-        },
-        "cars": [            # Список автомобилей
-            {
-                "id": string,        # Уникальный идентификатор
-                "title": string,     # Название автомобиля
-                "price": string,     # Цена
-                "year": string,      # Год выпуска
-                "image": string,     # URL изображения
-                "fuel": string,      # Тип топлива
-                "mileage": string,   # Пробег
-                "color": string      # Цвет
-            },
-            ...
-        ]
-    }
-    
-    Коды статуса HTTP:
-    - 200: Успешный запрос
-    - 404: Данные не найдены
-    - 500: Внутренняя ошибка сервера
-    - 504: Таймаут при ожидании ответа от сайта
+    return json_response({
+        "success": True,
+        "total": result["total"],
+        "count": len(result["groups"]),
+        "groups": result["groups"]
+    })
+
+@app.route("/api/v1/cars/search", methods=["GET"])
+def search_cars():
     """
-    filters = {
-        "brand": request.args.get("brand"),
-        "model": request.args.get("model"),
-        "gen": request.args.get("gen"),
-        "transmission": request.args.get("transmission"),
-        "fuel": request.args.get("fuel"),
-        "color": request.args.get("color"),
-        "mileage_from": request.args.get("mileage_from"),
-        "mileage_to": request.args.get("mileage_to"),
-        "year_release_from": request.args.get("year_from"),
-        "year_release_to": request.args.get("year_to"),
-        "price_from": request.args.get("price_from"),
-        "price_to": request.args.get("price_to")
-    }
+    Поиск автомобилей по опциям, характеристикам и результатам проверок
+    в индексе страниц автомобилей, полученных через /api/v1/cars/<id>.
+    Выполняется без обращения к сайту.
 
-    order_by = request.args.get("order_by")
+    Поддерживаемые параметры запроса (каждый можно повторять):
+    - option: Опция, например "Подогрев сидений"
+    - spec: Характеристика "Название:Значение", например "Тип топлива:Бензин"
+    - check: Параметр проверки "Название:Значение", например "ПТС:Оригинал"
+    - inspection: Строка осмотра "Параметр:Значение" или "Раздел/Параметр:Значение"
+    - match: all - все условия (по умолчанию), any - любое из условий
+    - offset: Смещение (по умолчанию 0)
+    - limit: Размер страницы (по умолчанию 20, максимум 100)
 
-    page_num = request.args.get("page_num", default="1")
+    Альтернативы внутри одного условия разделяются "|".
+    Сравнение без учета регистра.
 
-    def task():
-        with pool_lock:
-            driver = driver_pool.pop() if driver_pool else create_driver()
-        
-        try:
-            scraper = Scraper(
-                url=SEARCHPAGE_URL,
-                driver=driver
-            )
-            cars_data = scraper.scrape_cars(page_num, filters, order_by=order_by)
-
-            return Response(
-                json.dumps({
-                    "success": True,
-                    "count": len(cars_data),
-                    "page_info": scraper._get_pages_nums(),
-                    "cars": cars_data
-                }, ensure_ascii=False, indent=2),
-                status=200,
-                content_type='application/json; charset=utf-8'
-            )
-            
-        except NoSuchElementException:
-            return Response(
-                json.dumps({
-                    "success": False,
-                    "error": "Данные не найдены"
-                }, ensure_ascii=False, indent=2),
-                status=404,
-                mimetype='application/json; charset=utf-8'
-            )
-            
-        except Exception as e:
-            logger.error(f"Error: {str(e)}")
-            return Response(
-                    json.dumps({
-                        "success": False,
-                        "error": str(e)
-                    }, ensure_ascii=False, indent=2),
-                    status=500,
-                    mimetype='application/json; charset=utf-8'
-                )
-            
-        finally:
-            with pool_lock:
-                driver_pool.append(driver)
+    :Example HTTP GET:
+        GET /api/v1/cars/search?option=Подогрев сидений&option=Камера заднего вида|Парктроник&spec=Тип топлива:Бензин
+
+    :Example Response:
+        {
+            "success": true,
+            "count": 1,
+            "total": 1,
+            "offset": 0,
+            "limit": 20,
+            "cars": [
+                {
+                    "id": "10420276",
+                    "title": "Toyota Camry 2020",
+                    "price": "1 200 000 ₽"
+                }
+            ]
+        }
 
+    :status 200: Успешный запрос
+    :status 400: Некорректные параметры
+    """
     try:
-        future = executor.submit(task)
-        return future.result(timeout=30)
-    except TimeoutException:
-        return Response(
-            json.dumps({
-                "success": False,
-                "error": "Сайт не отвечает"
-            }, ensure_ascii=False, indent=2),
-            status=504,
-            mimetype='application/json; charset=utf-8'
+        offset = int_arg("offset") or 0
+        limit = min(int_arg("limit") or 20, 100)
+        match = request.args.get("match", "all")
+        if match not in ("all", "any"):
+            raise ValueError(f"Unknown match: {match}")
+        conditions = [
+            (kind, [text for text in value.split("|") if text.strip()])
+            for kind in TERM_SECTIONS
+            for value in request.args.getlist(kind)
+        ]
+        total, cars_data = option_index.search(
+            [condition for condition in conditions if condition[1]], match == "all", offset, limit
         )
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, status=400)
+
+    return json_response({
+        "success": True,
+        "count": len(cars_data),
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "cars": cars_data
+    })
+
+filters_endpoint = ScrapeEndpoint(
+    "filters",
+    url=lambda: SEARCHPAGE_URL,
+    scrape=lambda scraper: scraper.scrape_filters(with_values=True),
+    process=lambda variants: update_filter_resolver(variants).labels(),
+    render=lambda filters_data: {"count": len(filters_data), "filters": filters_data},
+    priority=PRIORITY_HIGH
+)
 
 @app.route("/api/v1/cars/filters", methods=["GET"])
-@cache.cached(make_cache_key=lambda: f"filters_{frozenset(request.args.items())}")
+@scrape_endpoint(filters_endpoint)
 def get_filters():
     """
     Получение всех доступных фильтров для поиска автомобилей.
@@ -253,67 +2037,18 @@ def get_filters():
     :status 404: Фильтры не найдены
     :status 500: Внутренняя ошибка сервера
     """
-    def task():
-        with pool_lock:
-            driver = driver_pool.pop() if driver_pool else create_driver()
-        
-        try:
-            scraper = Scraper(
-                url=SEARCHPAGE_URL,
-                driver=driver
-            )
-            filters_data = scraper.scrape_filters()
-
-            return Response(
-                json.dumps({
-                    "success": True,
-                    "count": len(filters_data),
-                    "filters": filters_data
-                }, ensure_ascii=False, indent=2),
-                status=200,
-                content_type='application/json; charset=utf-8'
-            )
-            
-        except NoSuchElementException:
-            return Response(
-                json.dumps({
-                    "success": False,
-                    "error": "Данные не найдены"
-                }, ensure_ascii=False, indent=2),
-                status=404,
-                mimetype='application/json; charset=utf-8'
-            )
-            
-        except Exception as e:
-            logger.error(f"Error: {str(e)}")
-            return Response(
-                    json.dumps({
-                        "success": False,
-                        "error": str(e)
-                    }, ensure_ascii=False, indent=2),
-                    status=500,
-                    mimetype='application/json; charset=utf-8'
-                )
-            
-        finally:
-            with pool_lock:
-                driver_pool.append(driver)
 
-    try:
-        future = executor.submit(task)
-        return future.result(timeout=30)
-    except TimeoutException:
-        return Response(
-            json.dumps({
-                "success": False,
-                "error": "Сайт не отвечает"
-            }, ensure_ascii=False, indent=2),
-            status=504,
-            mimetype='application/json; charset=utf-8'
-        )
+brand_models_endpoint = ScrapeEndpoint(
+    "filters_models",
+    url=lambda brand: SEARCHPAGE_URL,
+    scrape=lambda scraper, brand: scraper.scrape_brand_models(brand),
+    render=lambda models_data: {"count": len(models_data), "models": models_data},
+    parse_args=lambda args: (resolve_filters({"brand": args.get("brand")})["brand"],),
+    priority=PRIORITY_HIGH
+)
 
 @app.route("/api/v1/cars/filters/models", methods=["GET"])
-@cache.cached(make_cache_key=lambda: f"filters_models_{frozenset(request.args.items())}")
+@scrape_endpoint(brand_models_endpoint)
 def get_brand_models():
     """
     Получение списка моделей для указанной марки.
@@ -332,69 +2067,18 @@ def get_brand_models():
             "models": ["Camry", "Corolla", "RAV4"]
         }
     """
-    brand = request.args.get("brand")
-
-    def task():
-        with pool_lock:
-            driver = driver_pool.pop() if driver_pool else create_driver()
-        
-        try:
-            scraper = Scraper(
-                url=SEARCHPAGE_URL,
-                driver=driver
-            )
-            models_data = scraper.scrape_brand_models(brand)
-
-            return Response(
-                json.dumps({
-                    "success": True,
-                    "count": len(models_data),
-                    "models": models_data
-                }, ensure_ascii=False, indent=2),
-                status=200,
-                content_type='application/json; charset=utf-8'
-            )
-            
-        except NoSuchElementException:
-            return Response(
-                json.dumps({
-                    "success": False,
-                    "error": "Данные не найдены"
-                }, ensure_ascii=False, indent=2),
-                status=404,
-                mimetype='application/json; charset=utf-8'
-            )
-            
-        except Exception as e:
-            logger.error(f"Error: {str(e)}")
-            return Response(
-                    json.dumps({
-                        "success": False,
-                        "error": str(e)
-                    }, ensure_ascii=False, indent=2),
-                    status=500,
-                    mimetype='application/json; charset=utf-8'
-                )
-            
-        finally:
-            with pool_lock:
-                driver_pool.append(driver)
 
-    try:
-        future = executor.submit(task)
-        return future.result(timeout=30)
-    except TimeoutException:
-        return Response(
-            json.dumps({
-                "success": False,
-                "error": "Сайт не отвечает"
-            }, ensure_ascii=False, indent=2),
-            status=504,
-            mimetype='application/json; charset=utf-8'
-        )
+model_gens_endpoint = ScrapeEndpoint(
+    "filters_gens",
+    url=lambda brand, model: SEARCHPAGE_URL,
+    scrape=lambda scraper, brand, model: scraper.scrape_model_gens(brand, model),
+    render=lambda gens_data: {"count": len(gens_data), "gens": gens_data},
+    parse_args=lambda args: (resolve_filters({"brand": args.get("brand")})["brand"], args.get("model")),
+    priority=PRIORITY_HIGH
+)
 
 @app.route("/api/v1/cars/filters/gens", methods=["GET"])
-@cache.cached(make_cache_key=lambda: f"filters_gens_{frozenset(request.args.items())}")
+@scrape_endpoint(model_gens_endpoint)
 def get_model_gens():
     """
     Получение списка поколений для указанной модели и марки.
@@ -414,81 +2098,86 @@ def get_model_gens():
             "gens": ["VII (2017-2020)", "VIII (2021-2023)"]
         }
     """
-    brand = request.args.get("brand")
-    model = request.args.get("model")
 
-    def task():
-        with pool_lock:
-            driver = driver_pool.pop() if driver_pool else create_driver()
-        
-        try:
-            scraper = Scraper(
-                url=SEARCHPAGE_URL,
-                driver=driver
-            )
-            gens_data = scraper.scrape_model_gens(brand, model)
-
-            return Response(
-                json.dumps({
-                    "success": True,
-                    "count": len(gens_data),
-                    "gens": gens_data
-                }, ensure_ascii=False, indent=2),
-                status=200,
-                content_type='application/json; charset=utf-8'
-            )
-            
-        except NoSuchElementException:
-            return Response(
-                json.dumps({
-                    "success": False,
-                    "error": "Данные не найдены"
-                }, ensure_ascii=False, indent=2),
-                status=404,
-                mimetype='application/json; charset=utf-8'
-            )
-            
-        except Exception as e:
-            logger.error(f"Error: {str(e)}")
-            return Response(
-                    json.dumps({
-                        "success": False,
-                        "error": str(e)
-                    }, ensure_ascii=False, indent=2),
-                    status=500,
-                    mimetype='application/json; charset=utf-8'
-                )
-            
-        finally:
-            with pool_lock:
-                driver_pool.append(driver)
+def parse_car_details_args(args):
+    """
+    Разбирает выбор полей и ограничения размера для страницы автомобиля.
 
-    try:
-        future = executor.submit(task)
-        return future.result(timeout=30)
-    except TimeoutException:
-        return Response(
-            json.dumps({
-                "success": False,
-                "error": "Сайт не отвечает"
-            }, ensure_ascii=False, indent=2),
-            status=504,
-            mimetype='application/json; charset=utf-8'
-        )
+    :param args: Параметры запроса.
+    :type args: werkzeug.datastructures.MultiDict
+    :return: Список полей (None - все) и ограничения ``{"photos": n, "inspections": n}``.
+    :rtype: tuple
+    :raises ValueError: При неизвестном поле или некорректном ограничении.
+    """
+    fields = None
+    if args.get("fields"):
+        fields = [field.strip() for field in args["fields"].split(",") if field.strip()]
+        unknown = [field for field in fields if field not in CAR_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    limits = {}
+    for name in ("photos", "inspections"):
+        value = args.get(f"{name}_limit")
+        if value:
+            if not value.isdigit():
+                raise ValueError(f"Invalid number: {name}_limit")
+            limits[name] = int(value)
+    return fields, limits
+
+def index_car_details(car_data, id, fields, limits):
+    """
+    Добавляет разделы скрапнутой страницы автомобиля в индекс опций.
+    Усеченный ограничением список осмотров в индекс не попадает. Объем
+    и мощность двигателя сохраняются для расчета цены по сетке сборов.
+    """
+    option_index.add(id, {
+        section: value for section, value in car_data.items()
+        if not (section == "inspections" and "inspections" in limits)
+    })
+    if "base_parameters" in car_data or "tech_parameters" in car_data:
+        engine = engine_inputs(car_data)
+        listing_store.set_engine(id, engine["engine_volume"], engine["engine_power"])
+    return car_data
+
+def car_details_cache_key(args, id):
+    """
+    Ключ кэша страницы автомобиля: полный ответ хранится под ``car_<id>``.
+    """
+    if not args:
+        return f"car_{id}"
+    return f"car_{id}_{frozenset(args.items())}"
+
+car_details_endpoint = ScrapeEndpoint(
+    "car",
+    url=lambda id, fields, limits: CARPAGE_URL+str(id),
+    scrape=lambda scraper, id, fields, limits: scraper.scrape_car_details(id, fields, limits),
+    process=index_car_details,
+    render=lambda car_data: {"count": len(car_data), "cars": car_data},
+    parse_args=lambda args, id: (id, *parse_car_details_args(args)),
+    cache_key=car_details_cache_key,
+    cache_timeout=lambda: settings.cache_car_timeout,
+    stream=True
+)
 
 @app.route("/api/v1/cars/<id>", methods=["GET"])
+@scrape_endpoint(car_details_endpoint)
 def get_car_details(id):
     """
     Получение детальной информации об автомобиле по ID.
 
     :param id: Уникальный идентификатор автомобиля (обязательно)
     :type id: str
+    :query fields: Разделы ответа через запятую, например title,price,photos (опционально)
+    :query photos_limit: Максимум фотографий (опционально)
+    :query inspections_limit: Максимум строк проверок (опционально)
 
     :return: JSON с полной информацией об автомобиле
     :rtype: flask.Response
 
     :Example HTTP GET:
         GET /api/v1/cars/10420276
+        GET /api/v1/cars/10420276?fields=title,price,photos&photos_limit=1
 
     :Example Response:
         {
@@ -539,69 +2228,125 @@ def get_car_details(id):
         }
 
     :status 200: Успешный запрос
+    :status 400: Некорректные параметры
     :status 404: Автомобиль не найден
     :status 500: Внутренняя ошибка сервера
     """
-    def task():
-        with pool_lock:
-            driver = driver_pool.pop() if driver_pool else create_driver()
-        
-        try:
-            scraper = Scraper(
-                url=CARPAGE_URL+str(id),
-                driver=driver
-            )
-            car_data = scraper.scrape_car_details(id)
-
-            return Response(
-                json.dumps({
-                    "success": True,
-                    "count": len(car_data),
-                    "cars": car_data
-                }, ensure_ascii=False, indent=2),
-                status=200,
-                content_type='application/json; charset=utf-8'
-            )
-            
-        except NoSuchElementException:
-            return Response(
-                json.dumps({
-                    "success": False,
-                    "error": "Данные не найдены"
-                }, ensure_ascii=False, indent=2),
-                status=404,
-                mimetype='application/json; charset=utf-8'
-            )
-            
-        except Exception as e:
-            logger.error(f"Error: {str(e)}")
-            return Response(
-                    json.dumps({
-                        "success": False,
-                        "error": str(e)
-                    }, ensure_ascii=False, indent=2),
-                    status=500,
-                    mimetype='application/json; charset=utf-8'
-                )
-            
-        finally:
-            with pool_lock:
-                driver_pool.append(driver)
 
+def car_cached(id):
+    """
+    Проверяет, есть ли в кэше свежий полный ответ /api/v1/cars/<id>.
+
+    :rtype: bool
+    """
+    with app.app_context():
+        entry = cache.get(car_details_cache_key({}, id))
+    return entry is not None and entry["stored_at"] + entry["timeout"] >= time()
+
+def prefetch_car_details(id):
+    """
+    Скрапит страницу автомобиля и сохраняет полный ответ в кэш, как если
+    бы его запросил клиент. Выполняется в executor.
+
+    :param id: Идентификатор автомобиля.
+    :type id: str
+    :return: True, если ответ сохранен в кэш.
+    :rtype: bool
+    """
+    response = car_details_endpoint.task(id, None, {})
+    # Потоковый ответ собирается целиком: клиента, читающего поток, нет
+    response.get_data()
+    cache_store(car_details_cache_key({}, id), response, car_details_endpoint.cache_timeout, f"/api/v1/cars/{id}?")
+    return response.status_code == 200
+
+car_prefetcher = DetailPrefetcher(
+    prefetch_car_details,
+    lambda task, *args: executor.submit_priority(PRIORITY_LOW, task, *args),
+    car_cached,
+    lambda id: car_details_cache_key({}, id),
+    has_spare_capacity,
+    top_k=int(os.getenv("CAR_PREFETCH_TOP_K", "3")),
+    rate=int(os.getenv("CAR_PREFETCH_RATE", "30")),
+    max_pending=int(os.getenv("CAR_PREFETCH_MAX_PENDING", "2")),
+    ttl=settings.cache_car_timeout
+)
+
+def learn_price_calculation(price_data, id):
+    """
+    Учитывает скрапнутый расчет цены в калькуляторе.
+
+    :rtype: dict
+    """
+    price_calculator.learn(id, listing_store.price_inputs([id]).get(str(id), {}), price_data)
+    return price_data
+
+def verify_price_calculation(id, inputs, computed):
+    """
+    Сверяет локальный расчет с расчетом на странице сайта.
+    """
     try:
-        future = executor.submit(task)
-        return future.result(timeout=30)
-    except TimeoutException:
-        return Response(
-            json.dumps({
-                "success": False,
-                "error": "Сайт не отвечает"
-            }, ensure_ascii=False, indent=2),
-            status=504,
-            mimetype='application/json; charset=utf-8'
-        )
+        price_calculator.verify(inputs, computed, price_calculation_endpoint.fetch(id))
+    except Exception as e:
+        logger.warning(f"Price verification failed for {id}: {str(e)}")
+
+def local_price_calculation(id, inputs=None):
+    """
+    Расчет цены без загрузки страницы: сохраненный на текущую дату курса
+    или вычисленный по сетке сборов. Доля вычисленных расчетов
+    (PRICE_VERIFY_RATE) сверяется с сайтом в фоне, если есть свободные воркеры.
+
+    :param id: Идентификатор автомобиля.
+    :type id: str
+    :param inputs: Цена, год выпуска и двигатель, если уже известны.
+    :type inputs: dict
+    :return: Расчет и источник или (None, None).
+    :rtype: tuple
+    """
+    if inputs is None:
+        inputs = listing_store.price_inputs([id]).get(str(id), {})
+    calculation, source = price_calculator.lookup(id, inputs)
+    if source == COMPUTED and random() < PRICE_VERIFY_RATE and has_spare_capacity():
+        executor.submit_priority(PRIORITY_LOW, verify_price_calculation, id, inputs, calculation)
+    return calculation, source
+
+def price_cache_key(args, id):
+    """
+    Ключ кэша расчета цены по дате курса. Пока дата курса неизвестна
+    или устарела, расчет не кэшируется: иначе запись с датой None
+    отдавалась бы и после смены курса.
+
+    :rtype: str
+    """
+    currency_date = price_calculator.current_date()
+    if currency_date is None:
+        return None
+    return f"car_price_{id}_{currency_date}"
+
+def local_price_response(id):
+    """
+    Ответ с расчетом цены без загрузки страницы, если он доступен.
+
+    :rtype: flask.Response
+    """
+    calculation, _ = local_price_calculation(id)
+    if calculation is None:
+        return None
+    return json_response({"success": True, "price_calculation": calculation})
+
+price_calculation_endpoint = ScrapeEndpoint(
+    "car_price",
+    url=lambda id: CARPAGE_URL+str(id),
+    scrape=lambda scraper, id: scraper.scrape_price_calculation(),
+    process=learn_price_calculation,
+    render=lambda price_data: {"price_calculation": price_data},
+    parse_args=lambda args, id: (id,),
+    cache_key=price_cache_key,
+    cache_timeout=lambda: settings.cache_car_timeout,
+    shortcut=local_price_response
+)
 
 @app.route("/api/v1/cars/<id>/price", methods=["GET"])
+@scrape_endpoint(price_calculation_endpoint)
 def get_car_price_calculation(id):
     """
     Получение детальной информации о расчете цены автомобиля по ID.
@@ -640,64 +2385,199 @@ def get_car_price_calculation(id):
     :status 500: Внутренняя ошибка сервера
     :status 504: Таймаут при ожидании ответа от сайта
     """
-    def task():
-        with pool_lock:
-            driver = driver_pool.pop() if driver_pool else create_driver()
-        
+
+@app.route("/api/v1/cars/price:batch", methods=["POST"])
+def get_car_price_calculations():
+    """
+    Расчеты цены для нескольких автомобилей. Расчеты на текущую дату курса
+    и вычисляемые по сетке сборов отдаются без загрузки страниц. Остальные
+    скрапятся параллельно с низким приоритетом, не больше
+    PRICE_BATCH_SCRAPE_MAX за запрос и не дольше REQUEST_TIMEOUT в сумме;
+    для прочих возвращается ошибка, их можно запросить повторно.
+
+    :Example HTTP POST:
+        POST /api/v1/cars/price:batch
+        {"ids": ["10420276", "10420277"]}
+
+    :Example Response:
+        {
+            "success": true,
+            "count": 2,
+            "prices": {
+                "10420276": {
+                    "source": "cached",
+                    "price_calculation": {...}
+                },
+                "10420277": {
+                    "source": "scraped",
+                    "price_calculation": {...}
+                }
+            }
+        }
+
+    :status 200: Успешный запрос (ошибки по отдельным автомобилям в поле ``error``)
+    :status 400: Некорректное тело запроса
+    """
+    body = request.get_json(silent=True) or {}
+    ids = body.get("ids")
+    if not isinstance(ids, list) or not ids or not all(isinstance(id, (str, int)) for id in ids):
+        return json_response({"success": False, "error": "Expected JSON body {\"ids\": [...]}"}, status=400)
+    if len(ids) > PRICE_BATCH_MAX:
+        return json_response({"success": False, "error": f"Too many ids, maximum is {PRICE_BATCH_MAX}"}, status=400)
+
+    ids = list(dict.fromkeys(str(id) for id in ids))
+    inputs = listing_store.price_inputs(ids)
+    prices, futures = {}, {}
+    for id in ids:
+        calculation, source = local_price_calculation(id, inputs.get(id, {}))
+        if calculation is not None:
+            prices[id] = {"source": source, "price_calculation": calculation}
+        elif len(futures) < PRICE_BATCH_SCRAPE_MAX:
+            # Пакетные расчеты не должны вытеснять живой трафик
+            futures[id] = price_calculation_endpoint.submit(id, priority=PRIORITY_LOW)
+        else:
+            prices[id] = {"error": "Превышен лимит расчетов в запросе, повторите позже"}
+
+    deadline = time() + settings.request_timeout
+    for id, future in futures.items():
         try:
-            scraper = Scraper(
-                url=CARPAGE_URL+str(id),
-                driver=driver
-            )
-            price_data = scraper.scrape_price_calculation()
-
-            return Response(
-                json.dumps({
-                    "success": True,
-                    "price_calculation": price_data
-                }, ensure_ascii=False, indent=2),
-                status=200,
-                content_type='application/json; charset=utf-8'
-            )
-            
+            prices[id] = {"source": SCRAPED, "price_calculation": future.result(timeout=max(deadline - time(), 0))}
+        except FutureTimeoutError:
+            # Не начатые задачи снимаются с очереди, чтобы не занимать воркеры
+            future.cancel()
+            prices[id] = {"error": "Сайт не отвечает"}
+        except UpstreamUnavailable:
+            prices[id] = {"error": "Сайт временно недоступен"}
         except NoSuchElementException:
-            return Response(
-                json.dumps({
-                    "success": False,
-                    "error": "Данные не найдены"
-                }, ensure_ascii=False, indent=2),
-                status=404,
-                mimetype='application/json; charset=utf-8'
-            )
-            
+            prices[id] = {"error": "Данные не найдены"}
         except Exception as e:
             logger.error(f"Error: {str(e)}")
-            return Response(
-                    json.dumps({
-                        "success": False,
-                        "error": str(e)
-                    }, ensure_ascii=False, indent=2),
-                    status=500,
-                    mimetype='application/json; charset=utf-8'
-                )
-            
-        finally:
-            with pool_lock:
-                driver_pool.append(driver)
+            prices[id] = {"error": str(e)}
+
+    return json_response({
+        "success": True,
+        "count": len(prices),
+        "prices": {id: prices[id] for id in ids}
+    })
+
+def apply_settings(changes):
+    """
+    Применяет измененные без перезапуска настройки к работающим компонентам.
+    Остальные значения читаются из ``settings`` при каждом использовании.
+
+    :param changes: Измененные поля: ``{поле: (старое, новое)}``.
+    :type changes: dict
+    """
+    if "max_workers" in changes:
+        resize_pool(changes["max_workers"][1])
+    if "cache_default_timeout" in changes:
+        app.config['CACHE_DEFAULT_TIMEOUT'] = changes["cache_default_timeout"][1]
+    if "cache_car_timeout" in changes:
+        car_prefetcher.ttl = changes["cache_car_timeout"][1]
+
+settings.subscribe(apply_settings)
+
+# Токен администрирования: значение заголовка X-Admin-Token,
+# без него эндпоинты /api/v1/admin недоступны
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
+def admin_forbidden():
+    """
+    Проверяет токен администрирования запроса.
+
+    :return: Ответ 403 или None, если доступ разрешен.
+    :rtype: flask.Response
+    """
+    header = request.headers.get("X-Admin-Token", "")
+    if ADMIN_TOKEN and hmac.compare_digest(header.encode(), ADMIN_TOKEN.encode()):
+        return None
+    return json_response({"success": False, "error": "Доступ запрещен"}, status=403)
+
+def settings_response(changes=None):
+    """
+    Ответ с текущими настройками и, если переданы, изменениями.
+
+    :param changes: Измененные поля: ``{поле: (старое, новое)}``.
+    :type changes: dict
+    :rtype: flask.Response
+    """
+    data = {
+        "success": True,
+        "settings": settings.current.as_dict(),
+        "reloadable": Settings.reloadable()
+    }
+    if changes is not None:
+        data["changed"] = {name: {"old": old, "new": new} for name, (old, new) in changes.items()}
+    response = json_response(data)
+    response.cache_control.no_store = True
+    return response
+
+@app.route("/api/v1/admin/settings", methods=["GET", "PATCH"])
+def admin_settings():
+    """
+    Текущие настройки производительности (GET) и их изменение без
+    перезапуска (PATCH). Тело PATCH - JSON с новыми значениями полей из
+    ``reloadable``. Изменение MAX_WORKERS сразу меняет число задач
+    executor и размер пула драйверов.
+
+    Требует заголовок ``X-Admin-Token`` со значением ADMIN_TOKEN.
+
+    :Example HTTP PATCH:
+        PATCH /api/v1/admin/settings
+        {"max_workers": 5, "cache_cars_timeout": 300}
+
+    :Example Response:
+        {
+            "success": true,
+            "settings": {"max_workers": 5, "cache_cars_timeout": 300, ...},
+            "reloadable": ["max_workers", "cache_default_timeout", ...],
+            "changed": {"max_workers": {"old": 3, "new": 5}, "cache_cars_timeout": {"old": 600, "new": 300}}
+        }
+
+    :status 200: Успешный запрос
+    :status 400: Неизвестное поле, поле без горячей замены или некорректное значение
+    :status 403: Нет или неверный токен
+    """
+    forbidden = admin_forbidden()
+    if forbidden is not None:
+        return forbidden
+    if request.method == "GET":
+        return settings_response()
+
+    values = request.get_json(silent=True)
+    if not isinstance(values, dict) or not values:
+        return json_response({"success": False, "error": "Expected JSON object with settings"}, status=400)
     try:
-        future = executor.submit(task)
-        return future.result(timeout=30)
-    except TimeoutException:
-        return Response(
-            json.dumps({
-                "success": False,
-                "error": "Сайт не отвечает"
-            }, ensure_ascii=False, indent=2),
-            status=504,
-            mimetype='application/json; charset=utf-8'
-        )
+        changes = settings.update(values)
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, status=400)
+    return settings_response(changes)
+
+@app.route("/api/v1/admin/settings:reload", methods=["POST"])
+def admin_reload_settings():
+    """
+    Перечитывает окружение и .env и применяет изменившиеся поля с горячей
+    заменой. Изменения остальных полей вступят в силу после перезапуска.
+
+    Требует заголовок ``X-Admin-Token`` со значением ADMIN_TOKEN.
+
+    :status 200: Успешный запрос
+    :status 400: Некорректное значение в окружении
+    :status 403: Нет или неверный токен
+    """
+    forbidden = admin_forbidden()
+    if forbidden is not None:
+        return forbidden
+    load_dotenv(override=True)
+    try:
+        changes = settings.reload()
+    except ValueError as e:
+        return json_response({"success": False, "error": str(e)}, status=400)
+    return settings_response(changes)
 
 # if __name__ == "__main__":
 #     app.run(host="0.0.0.0", port=5000, threaded=True, debug=True)
+
+# Запуск с прогревом при загрузке воркера: gunicorn wsgi:application
+# Асинхронный запуск без потока на каждое соединение: uvicorn asgi:application
     
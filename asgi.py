@@ -0,0 +1,309 @@
+"""
+ASGI точка входа API.
+
+Эндпоинты скрапинга обслуживаются асинхронно: ожидание результата из
+пула браузеров выполняется через ``asyncio.wrap_future`` и не занимает
+поток ОС, поэтому число ожидающих клиентов не ограничено числом потоков.
+Работа с браузерами по-прежнему выполняется в ``app.executor``.
+Остальные запросы передаются во Flask приложение через WSGI в отдельном
+потоке. Формат JSON ответов совпадает с WSGI версией.
+
+Запуск::
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import io
+import logging
+import re
+import sys
+from contextvars import ContextVar
+from functools import partial
+from time import monotonic, perf_counter
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+
+import app as api
+
+logger = logging.getLogger(__name__)
+
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+# Профиль текущего запроса (заголовок X-Profile или выборка)
+request_profile = ContextVar("request_profile", default=None)
+
+
+async def await_response(future, timeout=None):
+    """
+    Асинхронно ожидает ответ задачи из executor.
+
+    :param future: Задача executor, возвращающая ответ.
+    :type future: concurrent.futures.Future
+    :param timeout: Время ожидания в секундах, None - REQUEST_TIMEOUT.
+    :type timeout: float
+    :rtype: flask.Response
+    """
+    if timeout is None:
+        timeout = api.settings.request_timeout
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        return api.json_response({"success": False, "error": "Сайт не отвечает"}, status=504)
+
+
+async def _in_app_context(func, *args):
+    # SimpleCache живет в памяти процесса, остальные бэкенды ходят по сети
+    def call():
+        with api.app.app_context():
+            return func(*args)
+
+    if api.app.config['CACHE_TYPE'] == 'SimpleCache':
+        return call()
+    return await asyncio.to_thread(call)
+
+
+async def cache_lookup(key, path):
+    return await _in_app_context(api.cache_lookup, key, path)
+
+
+async def cache_store(key, response, timeout, path):
+    await _in_app_context(api.cache_store, key, response, timeout, path)
+
+
+def _bad_request(error):
+    return api.json_response({"success": False, "error": str(error)}, status=400)
+
+
+async def handle(endpoint, args, encodings=None, **path):
+    """
+    Обрабатывает запрос эндпоинта скрапинга: разбор аргументов, ответ
+    без скрапинга, если он доступен, и ожидание задачи из executor.
+
+    :param endpoint: Описание эндпоинта.
+    :type endpoint: app.ScrapeEndpoint
+    :param encodings: Кодировки, которыми задача сжимает ответ
+        (см. :func:`app.response_encodings`), None - все доступные.
+    :type encodings: list
+    :rtype: flask.Response
+    """
+    # Разбор аргументов и ответ без скрапинга выполняются в потоке: без
+    # готового резолвера разбор фильтров сам скрапит сайт, а ответ без
+    # скрапинга обращается к индексу объявлений и кэшу курсов
+    try:
+        task_args = await asyncio.to_thread(endpoint.parse_args, args, **path)
+    except ValueError as e:
+        return _bad_request(e)
+    if endpoint.shortcut is not None:
+        response = await asyncio.to_thread(endpoint.shortcut, *task_args)
+        if response is not None:
+            return response
+    timeout = endpoint.timeout if endpoint.timeout is not None else api.settings.request_timeout
+    task = partial(endpoint.task, encodings=encodings, deadline=monotonic() + timeout)
+    future = api.executor.submit_priority(
+        endpoint.priority, api.run_profiled, request_profile.get(), task, *task_args
+    )
+    return await await_response(future, timeout)
+
+
+# Асинхронные эндпоинты: шаблон пути и Flask эндпоинт (описание эндпоинта скрапинга, ключ и время жизни кэша)
+ROUTES = [
+    (re.compile(r"^/api/v1/cars$"), api.get_cars),
+    (re.compile(r"^/api/v1/cars/filters$"), api.get_filters),
+    (re.compile(r"^/api/v1/cars/filters/models$"), api.get_brand_models),
+    (re.compile(r"^/api/v1/cars/filters/gens$"), api.get_model_gens),
+    (re.compile(r"^/api/v1/cars/(?P<id>[^/]+)/price$"), api.get_car_price_calculation),
+    (re.compile(r"^/api/v1/cars/(?P<id>(?!(?:query|search)$)[^/]+)$"), api.get_car_details),
+]
+
+
+async def dispatch(path, query_string, profile_header=None, accept_encoding=None):
+    """
+    Обрабатывает GET запрос асинхронным эндпоинтом с учетом кэша.
+
+    :return: Ответ или None, если путь не относится к асинхронным эндпоинтам.
+    :rtype: flask.Response
+    """
+    for pattern, view in ROUTES:
+        match = pattern.match(path)
+        if not match:
+            continue
+
+        if api.draining.is_set():
+            return api.draining_response()
+
+        kwargs = match.groupdict()
+        args = MultiDict(parse_qsl(query_string, keep_blank_values=True))
+        full_path = f"{path}?{query_string}"
+        key = view.cache_key(args, **kwargs)
+
+        # Без ключа ответ не кэшируется
+        if key is None:
+            encodings = api.response_encodings(False, accept_encoding)
+            return await handle(view.scrape_endpoint, args, encodings, **kwargs)
+
+        if not api.profiler.requested(profile_header):
+            response = await cache_lookup(key, full_path)
+            if response is not None:
+                return response
+
+        encodings = api.response_encodings(True, accept_encoding)
+        response = await handle(view.scrape_endpoint, args, encodings, **kwargs)
+        if response.status_code in (503, 504):
+            return await _in_app_context(api.stale_lookup, key) or response
+        await cache_store(key, response, view.cache_timeout, full_path)
+        return response
+    return None
+
+
+def _wsgi_environ(scope, body):
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+            environ[name] = value
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def call_wsgi(scope, body):
+    """
+    Выполняет запрос Flask приложением в отдельном потоке.
+
+    :return: Код ответа, заголовки и тело.
+    :rtype: tuple
+    """
+    environ = _wsgi_environ(scope, body)
+    result = {}
+
+    def start_response(status, headers, exc_info=None):
+        result["status"] = int(status.split(" ", 1)[0])
+        result["headers"] = headers
+
+    def run():
+        chunks = api.app(environ, start_response)
+        try:
+            return b"".join(chunks)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+    data = await asyncio.to_thread(run)
+    headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in result["headers"]]
+    return result["status"], headers, data
+
+
+def _encode(response, environ):
+    """
+    Сжимает ответ и готовит заголовки и итератор частей тела. Вызывается
+    в отдельном потоке: сжатие и сериализация не блокируют цикл событий.
+
+    :return: Код ответа, заголовки и итератор частей тела.
+    :rtype: tuple
+    """
+    response = api.prepare_response(response, environ)
+    status = response.status_code
+    headers = [
+        (k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.items()
+        if status != 304 or k.lower() != "content-length"
+    ] + CORS_HEADERS
+    if status == 304:
+        chunks = iter(())
+    elif response.is_streamed:
+        chunks = response.iter_encoded()
+    else:
+        chunks = iter([response.get_data()])
+    return status, headers, chunks
+
+
+async def _send_body(send, chunks):
+    # Каждая часть потокового ответа сериализуется и сжимается в отдельном
+    # потоке и отправляется клиенту сразу, не дожидаясь остальных
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            break
+        if chunk:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            api.start(handle_signals=False)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            # Сервер уже дождался открытых соединений, остаются фоновые задачи и драйверы
+            await asyncio.to_thread(api.shutdown)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    """
+    ASGI приложение.
+    """
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    body = await _read_body(receive)
+    started = perf_counter()
+
+    response = None
+    if scope["method"] == "GET":
+        request_headers = dict(scope["headers"])
+        header = request_headers.get(b"x-profile")
+        header = header.decode("latin-1") if header is not None else None
+        accept_encoding = request_headers.get(b"accept-encoding")
+        accept_encoding = accept_encoding.decode("latin-1") if accept_encoding is not None else None
+        request_profile.set(api.profiler.start(scope["path"], header))
+        response = await dispatch(
+            scope["path"], scope["query_string"].decode("latin-1"), header, accept_encoding
+        )
+
+    if response is not None:
+        status, headers, chunks = await asyncio.to_thread(_encode, response, _wsgi_environ(scope, body))
+        if api.traffic_recorder:
+            query_string = scope["query_string"].decode("latin-1")
+            path = f"{scope['path']}?{query_string}" if query_string else scope["path"]
+            api.traffic_recorder.record(scope["method"], path, status, perf_counter() - started)
+    else:
+        status, headers, data = await call_wsgi(scope, body)
+        chunks = iter([data])
+
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await _send_body(send, chunks)
@@ -0,0 +1,541 @@
+"""
+Асинхронный движок скрапинга поверх протокола WebDriver.
+
+Команды chromedriver отправляются напрямую по HTTP/1.1 через пул
+keep-alive соединений asyncio, поэтому один цикл событий может вести
+десятки сессий браузера без отдельного потока на каждую. ``AsyncScraper``
+повторяет методы ``Scraper`` и использует те же JS-скрипты.
+
+Пример::
+
+    pool = AsyncSessionPool(chrome_capabilities(CHROME_ARGUMENTS), size=20)
+    await pool.start()
+    async with pool.scraper(SEARCHPAGE_URL) as scraper:
+        cars = await scraper.scrape_cars("1", filters, order_by=None)
+    await pool.close()
+"""
+import asyncio
+import json
+import logging
+import socket
+from contextlib import asynccontextmanager
+from typing import Dict, List, Tuple
+
+from selenium.common.exceptions import (
+    InvalidSessionIdException,
+    JavascriptException,
+    NoSuchElementException,
+    TimeoutException,
+    WebDriverException,
+)
+
+from failures import DEAD_SESSION, classify_failure
+from scraper import FILTERS_MAP
+from scraper_scripts import (
+    APPLY_FILTER_JS,
+    APPLY_SORTING_JS,
+    BRAND_MODELS_JS,
+    CAR_DETAILS_JS,
+    INITIAL_FILTERS_JS,
+    LOAD_SNAPSHOT_JS,
+    MODEL_GENS_JS,
+    PAGES_NUMS_JS,
+    PARSE_CAR_LIST_JS,
+    PRICE_CALCULATION_JS,
+    PUSH_PAGE_NEXT_JS,
+    SUBMIT_SEARCH_JS,
+    WAIT_CARPAGE_JS,
+    WAIT_SEARCHPAGE_JS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Коды ошибок W3C WebDriver и соответствующие исключения Selenium
+ERRORS = {
+    "javascript error": JavascriptException,
+    "script timeout": TimeoutException,
+    "timeout": TimeoutException,
+    "no such element": NoSuchElementException,
+    "invalid session id": InvalidSessionIdException,
+}
+
+
+def chrome_capabilities(arguments: List[str]) -> Dict:
+    """
+    Возможности сессии Chrome для команды New Session.
+
+    :param arguments: Аргументы командной строки Chrome.
+    :type arguments: list
+    :rtype: dict
+    """
+    return {
+        "browserName": "chrome",
+        "goog:chromeOptions": {
+            "args": list(arguments),
+            "excludeSwitches": ["enable-automation"],
+            "useAutomationExtension": False
+        }
+    }
+
+
+class AsyncHttpPool:
+    """
+    Пул keep-alive HTTP/1.1 соединений к chromedriver.
+
+    :param host: Хост chromedriver.
+    :type host: str
+    :param port: Порт chromedriver.
+    :type port: int
+    :param size: Максимум одновременных соединений.
+    :type size: int
+    :param timeout: Таймаут одной команды в секундах.
+    :type timeout: float
+    """
+
+    def __init__(self, host: str, port: int, size: int = 10, timeout: float = 60):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def request(self, method: str, path: str, payload: Dict | None = None) -> Tuple[int, Dict]:
+        """
+        Выполняет HTTP запрос к chromedriver.
+
+        :return: Код ответа и разобранное JSON тело.
+        :rtype: tuple
+        """
+        async with self._slots:
+            reused = bool(self._idle)
+            conn = self._idle.pop() if reused else await asyncio.open_connection(self.host, self.port)
+            try:
+                status, body, keep_alive = await self._send(conn, method, path, payload)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if not reused:
+                    raise
+                # Соединение из пула могло быть закрыто сервером, повторяем на новом
+                conn = await asyncio.open_connection(self.host, self.port)
+                status, body, keep_alive = await self._send(conn, method, path, payload)
+
+            if keep_alive:
+                self._idle.append(conn)
+            else:
+                conn[1].close()
+            return status, json.loads(body) if body else {}
+
+    async def _send(self, conn, method: str, path: str, payload: Dict | None):
+        try:
+            return await asyncio.wait_for(self._roundtrip(conn, method, path, payload), self.timeout)
+        except BaseException:
+            conn[1].close()
+            raise
+
+    async def _roundtrip(self, conn, method: str, path: str, payload: Dict | None):
+        reader, writer = conn
+        data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by chromedriver")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, value = line.decode("latin-1").split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                body += await reader.readexactly(size)
+                await reader.readline()
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return status, body, keep_alive
+
+    def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class AsyncWebDriver:
+    """
+    Сессия W3C WebDriver с асинхронными командами.
+
+    :param http: Пул соединений к chromedriver.
+    :type http: AsyncHttpPool
+    :param session_id: Идентификатор сессии.
+    :type session_id: str
+    """
+
+    def __init__(self, http: AsyncHttpPool, session_id: str):
+        self.http = http
+        self.session_id = session_id
+
+    @staticmethod
+    def _check(status: int, body: Dict):
+        value = body.get("value")
+        if status >= 400 or (isinstance(value, dict) and "error" in value):
+            error = value.get("error", "unknown error") if isinstance(value, dict) else "unknown error"
+            message = value.get("message", "") if isinstance(value, dict) else str(value)
+            raise ERRORS.get(error, WebDriverException)(message)
+        return value
+
+    @classmethod
+    async def create(cls, http: AsyncHttpPool, capabilities: Dict) -> "AsyncWebDriver":
+        status, body = await http.request("POST", "/session", {
+            "capabilities": {"alwaysMatch": capabilities}
+        })
+        value = cls._check(status, body)
+        return cls(http, value["sessionId"])
+
+    async def _command(self, method: str, path: str, payload: Dict | None = None):
+        status, body = await self.http.request(method, f"/session/{self.session_id}{path}", payload)
+        return self._check(status, body)
+
+    async def get(self, url: str) -> None:
+        await self._command("POST", "/url", {"url": url})
+
+    async def execute_script(self, script: str, *args):
+        return await self._command("POST", "/execute/sync", {"script": script, "args": list(args)})
+
+    async def execute_async_script(self, script: str, *args):
+        return await self._command("POST", "/execute/async", {"script": script, "args": list(args)})
+
+    async def page_source(self) -> str:
+        return await self._command("GET", "/source")
+
+    async def quit(self) -> None:
+        status, body = await self.http.request("DELETE", f"/session/{self.session_id}")
+        self._check(status, body)
+
+
+class AsyncScraper:
+    """
+    Асинхронный аналог ``Scraper`` с теми же JS-скриптами извлечения.
+    """
+
+    def __init__(self, url: str, driver: AsyncWebDriver, snapshot_store=None):
+        self.driver = driver
+        self.url = url
+        self.snapshot_store = snapshot_store
+        self._filters_map = FILTERS_MAP
+
+    async def _load_searchpage(self, url: str) -> None:
+        await self.driver.get(url)
+        await self._wait_for_loading_searchpage()
+
+    async def _load_carpage(self, url: str) -> None:
+        await self.driver.get(url)
+        await self._wait_for_loading_carpage()
+
+    async def _capture_snapshot(self, page: str, args: list) -> None:
+        if not self.snapshot_store:
+            return
+        try:
+            html = await self.driver.page_source()
+            await asyncio.to_thread(self.snapshot_store.save, self.url, page, args, html)
+        except Exception as e:
+            logger.warning(f"Snapshot capture failed: {str(e)}")
+
+    async def load_snapshot(self, html: str) -> None:
+        await self.driver.execute_script(LOAD_SNAPSHOT_JS, html)
+
+    async def _wait_for_loading_searchpage(self) -> None:
+        try:
+            result = await self.driver.execute_async_script(WAIT_SEARCHPAGE_JS)
+            if not result:
+                raise TimeoutException("Loader did not disappear")
+        except JavascriptException:
+            raise TimeoutException("Page loading timeout")
+
+    async def _wait_for_loading_carpage(self) -> None:
+        try:
+            result = await self.driver.execute_async_script(WAIT_CARPAGE_JS)
+            if not result:
+                raise TimeoutException("Loader did not disappear")
+        except JavascriptException:
+            raise TimeoutException("Page loading timeout")
+
+    async def _apply_filters(self, filters: Dict[str, str]) -> None:
+        for key, value in filters.items():
+            if value and key in self._filters_map:
+                found = await self.driver.execute_script(APPLY_FILTER_JS, self._filters_map[key], value)
+                if not found:
+                    raise NoSuchElementException(f"Filter value not found: {key}={value}")
+
+    async def _submit_search(self) -> None:
+        await self.driver.execute_script(SUBMIT_SEARCH_JS)
+
+    async def _parse_car_list(self) -> List[Dict]:
+        try:
+            return await self.driver.execute_script(PARSE_CAR_LIST_JS)
+        except Exception:
+            return []
+
+    async def _get_initial_filters(self, with_values: bool = False) -> Dict:
+        return await self.driver.execute_script(INITIAL_FILTERS_JS, with_values)
+
+    async def _get_brand_models(self, brand: str) -> List[str]:
+        return await self.driver.execute_script(BRAND_MODELS_JS, brand)
+
+    async def _get_model_gens(self, brand: str, model: str) -> List[str]:
+        return await self.driver.execute_script(MODEL_GENS_JS, brand, model)
+
+    async def _get_car_details(self, id: str, fields: List[str] | None = None,
+                               limits: Dict[str, int] | None = None) -> Dict:
+        return await self.driver.execute_script(CAR_DETAILS_JS, id, fields, limits or {})
+
+    async def _get_pages_nums(self) -> Dict[str, List[str]]:
+        return await self.driver.execute_script(PAGES_NUMS_JS)
+
+    async def _push_page_next(self) -> None:
+        await self.driver.execute_script(PUSH_PAGE_NEXT_JS)
+
+    async def _apply_sorting(self, sort_value: str) -> None:
+        await self.driver.execute_script(APPLY_SORTING_JS, sort_value)
+
+    async def _get_price_calculation(self) -> Dict[str, str]:
+        return await self.driver.execute_script(PRICE_CALCULATION_JS)
+
+    async def _logged(self, coro):
+        try:
+            return await coro
+        except JavascriptException as e:
+            logger.error(f"JS error: {str(e)}")
+            raise
+        except TimeoutException:
+            logger.error("Timeout while waiting for page elements")
+            raise
+        except Exception:
+            logger.exception("Unexpected error during scraping")
+            raise
+
+    async def _search(self, filters: Dict[str, str], order_by: str | None) -> None:
+        await self._load_searchpage(self.url)
+        await self._apply_filters(filters)
+        await self._submit_search()
+        await self._wait_for_loading_searchpage()
+        if order_by:
+            await self._apply_sorting(order_by)
+            await self._wait_for_loading_searchpage()
+
+    async def scrape_cars(self, page_num: str, filters: Dict[str, str], order_by: str | None) -> List[Dict]:
+        async def run():
+            await self._search(filters, order_by)
+            while (await self._get_pages_nums())["cur_page_num"] != page_num:
+                await self._push_page_next()
+                await self._wait_for_loading_searchpage()
+            await self._capture_snapshot("searchpage", [page_num, filters, order_by])
+            return await self._parse_car_list()
+        return await self._logged(run())
+
+    async def scrape_cars_pages(self, filters: Dict[str, str], order_by: str | None, max_pages: int) -> Tuple[List[Dict], bool]:
+        async def run():
+            await self._search(filters, order_by)
+            cars = []
+            for _ in range(max_pages):
+                cars.extend(await self._parse_car_list())
+                pages = await self._get_pages_nums()
+                if not pages["pages_nums"] or pages["cur_page_num"] == pages["pages_nums"][-1]:
+                    return cars, True
+                await self._push_page_next()
+                await self._wait_for_loading_searchpage()
+            return cars, False
+        return await self._logged(run())
+
+    async def scrape_filters(self, with_values: bool = False) -> Dict:
+        async def run():
+            await self._load_searchpage(self.url)
+            await self._capture_snapshot("searchpage", [])
+            return await self._get_initial_filters(with_values)
+        return await self._logged(run())
+
+    async def scrape_brand_models(self, brand: str) -> List[str]:
+        async def run():
+            await self._load_searchpage(self.url)
+            return await self._get_brand_models(brand)
+        return await self._logged(run())
+
+    async def scrape_model_gens(self, brand: str, model: str) -> List[str]:
+        async def run():
+            await self._load_searchpage(self.url)
+            return await self._get_model_gens(brand, model)
+        return await self._logged(run())
+
+    async def scrape_car_details(self, id: str, fields: List[str] | None = None,
+                                 limits: Dict[str, int] | None = None) -> Dict:
+        async def run():
+            await self._load_carpage(self.url)
+            await self._capture_snapshot("carpage", [id])
+            return await self._get_car_details(id, fields, limits)
+        return await self._logged(run())
+
+    async def scrape_price_calculation(self) -> Dict[str, str]:
+        async def run():
+            await self._load_carpage(self.url)
+            await self._capture_snapshot("carpage", [])
+            return await self._get_price_calculation()
+        return await self._logged(run())
+
+
+class ChromeDriverProcess:
+    """
+    Процесс chromedriver, запущенный на свободном локальном порту.
+
+    :param path: Путь к исполняемому файлу chromedriver.
+    :type path: str
+    """
+
+    def __init__(self, path: str = "/usr/bin/chromedriver"):
+        self.path = path
+        self.host = "127.0.0.1"
+        self.port = None
+        self.process = None
+
+    async def start(self, timeout: float = 20) -> None:
+        with socket.socket() as sock:
+            sock.bind((self.host, 0))
+            self.port = sock.getsockname()[1]
+
+        self.process = await asyncio.create_subprocess_exec(
+            self.path, f"--port={self.port}",
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+
+        http = AsyncHttpPool(self.host, self.port, size=1, timeout=2)
+        deadline = asyncio.get_running_loop().time() + timeout
+        try:
+            while True:
+                try:
+                    status, body = await http.request("GET", "/status")
+                    if status == 200 and body.get("value", {}).get("ready"):
+                        return
+                except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    pass
+                if asyncio.get_running_loop().time() > deadline:
+                    raise WebDriverException("chromedriver did not start")
+                await asyncio.sleep(0.1)
+        finally:
+            http.close()
+
+    async def stop(self) -> None:
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+            await self.process.wait()
+
+
+class AsyncSessionPool:
+    """
+    Пул сессий браузера под одним процессом chromedriver.
+
+    :param capabilities: Возможности сессии (см. :func:`chrome_capabilities`).
+    :type capabilities: dict
+    :param size: Число сессий.
+    :type size: int
+    :param chromedriver_path: Путь к chromedriver.
+    :type chromedriver_path: str
+    :param connections: Размер пула HTTP соединений, по умолчанию ``size``.
+    :type connections: int
+    :param snapshot_store: Хранилище снимков страниц.
+    :type snapshot_store: SnapshotStore
+    """
+
+    def __init__(self, capabilities: Dict, size: int = 10, chromedriver_path: str = "/usr/bin/chromedriver",
+                 connections: int | None = None, snapshot_store=None):
+        self.capabilities = capabilities
+        self.size = size
+        self.connections = connections or size
+        self.snapshot_store = snapshot_store
+        self.process = ChromeDriverProcess(chromedriver_path)
+        self.http = None
+        self._drivers = []
+        self._idle = None
+
+    async def start(self) -> None:
+        """
+        Запускает chromedriver и создает сессии. Если хотя бы одна сессия
+        не создалась, уже созданные закрываются, chromedriver
+        останавливается и исключение пробрасывается.
+        """
+        await self.process.start()
+        self.http = AsyncHttpPool(self.process.host, self.process.port, size=self.connections)
+        results = await asyncio.gather(*(
+            AsyncWebDriver.create(self.http, self.capabilities) for _ in range(self.size)
+        ), return_exceptions=True)
+        self._drivers = [result for result in results if isinstance(result, AsyncWebDriver)]
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            logger.error(f"Failed to create {len(errors)} of {self.size} sessions: {str(errors[0])}")
+            await self.close()
+            raise errors[0]
+        self._idle = asyncio.Queue()
+        for driver in self._drivers:
+            self._idle.put_nowait(driver)
+
+    async def _replace(self, driver: AsyncWebDriver) -> AsyncWebDriver | None:
+        """
+        Заменяет потерянную сессию новой. Если новую создать не удалось,
+        пул уменьшается на одну сессию.
+        """
+        self._drivers.remove(driver)
+        try:
+            await driver.quit()
+        except Exception:
+            pass
+        try:
+            replacement = await AsyncWebDriver.create(self.http, self.capabilities)
+        except Exception as e:
+            logger.error(f"Failed to recreate session, pool size {len(self._drivers)}: {str(e)}")
+            return None
+        self._drivers.append(replacement)
+        return replacement
+
+    @asynccontextmanager
+    async def scraper(self, url: str):
+        """
+        Выдает ``AsyncScraper`` на свободной сессии и возвращает ее в пул.
+        Сессия, завершившаяся ошибкой потерянной сессии, в пул не
+        возвращается и заменяется новой.
+        """
+        driver = await self._idle.get()
+        try:
+            yield AsyncScraper(url, driver, snapshot_store=self.snapshot_store)
+        except Exception as e:
+            if classify_failure(e) == DEAD_SESSION:
+                logger.warning(f"Session {driver.session_id} is dead, recreating: {str(e)}")
+                driver = await self._replace(driver)
+            raise
+        finally:
+            if driver is not None:
+                self._idle.put_nowait(driver)
+
+    async def close(self) -> None:
+        await asyncio.gather(*(driver.quit() for driver in self._drivers), return_exceptions=True)
+        self._drivers.clear()
+        if self.http:
+            self.http.close()
+        await self.process.stop()
@@ -0,0 +1,120 @@
+import logging
+from collections import Counter
+from threading import Event, Lock, Thread
+from time import time
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """
+    Фоновое обновление популярных записей кэша до истечения их срока.
+
+    Горячие запросы берутся из списка ``paths`` и из счетчика обращений,
+    который пополняется через :meth:`record_hit`. Обновление выполняется
+    только при наличии свободных воркеров (``has_capacity``) и не чаще
+    ``rate`` запросов в минуту, чтобы не конкурировать с живым трафиком.
+
+    :param refresh: Функция, выполняющая запрос с принудительным обновлением кэша.
+    :type refresh: callable
+    :param has_capacity: Функция проверки свободной емкости пула.
+    :type has_capacity: callable
+    :param paths: Пути, которые прогреваются всегда.
+    :type paths: list
+    :param top_n: Сколько самых популярных путей прогревать дополнительно.
+    :type top_n: int
+    :param ahead: За сколько секунд до истечения обновлять запись.
+    :type ahead: int
+    :param interval: Период проверки в секундах.
+    :type interval: int
+    :param rate: Максимум обновлений в минуту.
+    :type rate: int
+    """
+
+    MAX_TRACKED = 10000
+
+    def __init__(self, refresh: Callable[[str], None], has_capacity: Callable[[], bool],
+                 paths: List[str] | None = None, top_n: int = 20, ahead: int = 300,
+                 interval: int = 60, rate: int = 10):
+        self.refresh = refresh
+        self.has_capacity = has_capacity
+        self.paths = list(paths or [])
+        self.top_n = top_n
+        self.ahead = ahead
+        self.interval = interval
+        self.rate = rate
+        self._hits = Counter()
+        self._expires = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+
+    def record_hit(self, path: str) -> None:
+        """
+        Учитывает обращение клиента к кэшируемому пути.
+        """
+        with self._lock:
+            self._hits[path] += 1
+            if len(self._hits) > self.MAX_TRACKED:
+                self._hits = Counter(dict(self._hits.most_common(self.MAX_TRACKED // 10)))
+
+    def record_store(self, path: str, timeout: int) -> None:
+        """
+        Запоминает момент истечения записи кэша для пути.
+        """
+        with self._lock:
+            self._expires[path] = time() + timeout
+
+    def hot_paths(self) -> List[str]:
+        """
+        Пути для прогрева: заданные в конфигурации и самые популярные.
+
+        :rtype: list
+        """
+        with self._lock:
+            popular = [path for path, _ in self._hits.most_common(self.top_n)]
+        return list(dict.fromkeys(self.paths + popular))
+
+    def stats(self) -> Dict:
+        # hot_paths берет ту же блокировку, поэтому вызывается до нее
+        paths = self.hot_paths()
+        with self._lock:
+            hits = {path: self._hits.get(path, 0) for path in paths}
+            expires = {path: self._expires.get(path) for path in paths}
+        now = time()
+        return {
+            path: {
+                "hits": hits[path],
+                "expires_in": int(expires[path] - now) if expires[path] is not None else None
+            }
+            for path in paths
+        }
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name="cache-warmer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        spacing = 60 / max(self.rate, 1)
+        while not self._stop.wait(self.interval):
+            for path in self.hot_paths():
+                with self._lock:
+                    expires = self._expires.get(path, 0)
+                if expires - time() > self.ahead:
+                    continue
+                if not self.has_capacity():
+                    logger.info("No spare capacity, postponing cache warm-up")
+                    break
+                try:
+                    started = time()
+                    self.refresh(path)
+                    logger.info(f"Warmed {path} in {time() - started:.2f}s")
+                except Exception as e:
+                    logger.warning(f"Cache warm-up failed for {path}: {str(e)}")
+                if self._stop.wait(spacing):
+                    return
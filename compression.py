@@ -0,0 +1,111 @@
+import gzip
+import zlib
+from typing import Dict, Iterable, Iterator, List
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Тела меньше этого размера не сжимаются: выигрыш меньше накладных расходов
+MIN_SIZE = 1024
+
+# Уровни сжатия для заранее подготовленных тел и для потоковой отправки
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+BROTLI_STREAM_QUALITY = 5
+
+
+def available_encodings() -> List[str]:
+    """
+    Поддерживаемые кодировки в порядке предпочтения сервера.
+    Brotli доступен при установленном пакете ``brotli``.
+
+    :rtype: list
+    """
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_all(body: bytes, encodings: Iterable[str] | None = None) -> Dict[str, bytes]:
+    """
+    Сжимает тело всеми доступными кодировками.
+
+    :param body: Исходное тело ответа.
+    :type body: bytes
+    :param encodings: Кодировки, None - все из :func:`available_encodings`.
+    :type encodings: list
+    :return: Сжатые тела по кодировкам, пустой словарь для маленьких тел.
+    :rtype: dict
+    """
+    if len(body) < MIN_SIZE:
+        return {}
+    if encodings is None:
+        encodings = available_encodings()
+    return {encoding: compress(body, encoding) for encoding in encodings}
+
+
+def negotiate(accept_encoding: str | None, encodings: Iterable[str]) -> str | None:
+    """
+    Выбирает кодировку по заголовку ``Accept-Encoding`` клиента.
+
+    :param accept_encoding: Значение заголовка.
+    :type accept_encoding: str
+    :param encodings: Кодировки, доступные для ответа, в порядке предпочтения.
+    :type encodings: list
+    :return: Кодировка или None, если ответ отправляется без сжатия.
+    :rtype: str
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """
+    Сжимает потоковый ответ по мере отправки частей.
+
+    :param chunks: Части исходного тела.
+    :type chunks: iterable
+    :param encoding: Кодировка из :func:`available_encodings`.
+    :type encoding: str
+    :rtype: iterator
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_STREAM_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,197 @@
+import logging
+import os
+from threading import Lock
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+MB = 1024 * 1024
+
+# Причины замены драйвера
+RSS_LIMIT = "rss_limit"
+JS_HEAP_LIMIT = "js_heap_limit"
+
+
+def read_processes() -> Dict[int, Tuple[int, int]]:
+    """
+    Таблица процессов из /proc: PID -> (PPID, RSS в байтах).
+    На системах без /proc таблица пуста.
+
+    :rtype: dict
+    """
+    result = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return result
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                # Имя процесса в скобках может содержать пробелы, поля считаются после него
+                fields = f.read().rsplit(b")", 1)[1].split()
+            result[int(entry)] = (int(fields[1]), int(fields[21]) * PAGE_SIZE)
+        except (OSError, IndexError, ValueError):
+            continue
+    return result
+
+
+def descendants(processes: Dict[int, Tuple[int, int]], root: int) -> List[int]:
+    """
+    Все потомки процесса ``root`` по таблице ``read_processes``.
+
+    :rtype: list
+    """
+    children = {}
+    for pid, (ppid, _) in processes.items():
+        children.setdefault(ppid, []).append(pid)
+    result, frontier = [], [root]
+    while frontier:
+        found = children.get(frontier.pop(), [])
+        result.extend(found)
+        frontier.extend(found)
+    return result
+
+
+def chrome_memory_arguments(renderer_process_limit: int | None = None,
+                            js_heap_mb: int | None = None) -> List[str]:
+    """
+    Аргументы Chrome, ограничивающие память.
+
+    :param renderer_process_limit: Максимум процессов рендеринга.
+    :type renderer_process_limit: int
+    :param js_heap_mb: Предел старого поколения кучи V8 в МБ.
+    :type js_heap_mb: int
+    :rtype: list
+    """
+    arguments = []
+    if renderer_process_limit:
+        arguments.append(f"--renderer-process-limit={renderer_process_limit}")
+    if js_heap_mb:
+        arguments.append(f"--js-flags=--max-old-space-size={js_heap_mb}")
+    return arguments
+
+
+class DriverMemoryMonitor:
+    """
+    Память драйверов: RSS дерева процессов Chrome из /proc и размер
+    JS-кучи страницы через CDP. Проверка выполняется каждые
+    ``check_every`` использований драйвера; драйвер, превысивший
+    ``max_rss_mb`` или ``max_js_heap_mb``, подлежит замене.
+
+    Процесс браузера находится среди потомков текущего процесса
+    по каталогу профиля (``--user-data-dir``) из capabilities сессии.
+
+    :param max_rss_mb: Предел RSS дерева процессов Chrome, 0 - без предела.
+    :type max_rss_mb: int
+    :param max_js_heap_mb: Предел занятой JS-кучи, 0 - без предела.
+    :type max_js_heap_mb: int
+    :param check_every: Через сколько использований драйвера проверять память.
+    :type check_every: int
+    """
+
+    def __init__(self, max_rss_mb: int = 0, max_js_heap_mb: int = 0, check_every: int = 5):
+        self.max_rss_mb = max_rss_mb
+        self.max_js_heap_mb = max_js_heap_mb
+        self.check_every = max(check_every, 1)
+        self._drivers = {}
+        self._recycled = {RSS_LIMIT: 0, JS_HEAP_LIMIT: 0}
+        self._lock = Lock()
+
+    def _browser_pid(self, driver) -> int | None:
+        user_data_dir = driver.capabilities.get("chrome", {}).get("userDataDir")
+        if not user_data_dir:
+            return None
+        argument = f"--user-data-dir={user_data_dir}".encode()
+        for pid in descendants(read_processes(), os.getpid()):
+            try:
+                with open(f"/proc/{pid}/cmdline", "rb") as f:
+                    cmdline = f.read().split(b"\0")
+            except OSError:
+                continue
+            # Процесс браузера - единственный без аргумента --type
+            if argument in cmdline and not any(part.startswith(b"--type=") for part in cmdline):
+                return pid
+        return None
+
+    def sample(self, driver) -> Dict:
+        """
+        Замеряет память драйвера.
+
+        :param driver: Экземпляр WebDriver.
+        :type driver: webdriver.Remote
+        :return: ``{"rss_mb": ..., "js_heap_mb": ..., "processes": ...}``, None для недоступных значений.
+        :rtype: dict
+        """
+        with self._lock:
+            state = self._drivers.setdefault(driver, {"uses": 0, "pid": None})
+        if state["pid"] is None:
+            state["pid"] = self._browser_pid(driver)
+
+        rss, processes = None, None
+        if state["pid"] is not None:
+            table = read_processes()
+            if state["pid"] in table:
+                tree = [state["pid"]] + descendants(table, state["pid"])
+                rss = round(sum(table[pid][1] for pid in tree) / MB, 1)
+                processes = len(tree)
+
+        js_heap = None
+        try:
+            usage = driver.execute("executeCdpCommand", {"cmd": "Runtime.getHeapUsage", "params": {}})
+            js_heap = round(usage["value"]["usedSize"] / MB, 1)
+        except Exception as e:
+            logger.warning(f"Failed to read JS heap size: {str(e)}")
+
+        result = {"rss_mb": rss, "js_heap_mb": js_heap, "processes": processes}
+        with self._lock:
+            state.update(result)
+        return result
+
+    def check(self, driver) -> str | None:
+        """
+        Учитывает использование драйвера и при очередной проверке
+        сравнивает его память с пределами.
+
+        :param driver: Экземпляр WebDriver.
+        :type driver: webdriver.Remote
+        :return: Причина замены (RSS_LIMIT, JS_HEAP_LIMIT) или None.
+        :rtype: str
+        """
+        with self._lock:
+            state = self._drivers.setdefault(driver, {"uses": 0, "pid": None})
+            state["uses"] += 1
+            if state["uses"] % self.check_every:
+                return None
+
+        sample = self.sample(driver)
+        reason = None
+        if self.max_rss_mb and sample["rss_mb"] is not None and sample["rss_mb"] > self.max_rss_mb:
+            reason = RSS_LIMIT
+        elif self.max_js_heap_mb and sample["js_heap_mb"] is not None and sample["js_heap_mb"] > self.max_js_heap_mb:
+            reason = JS_HEAP_LIMIT
+        if reason:
+            with self._lock:
+                self._recycled[reason] += 1
+            logger.info(f"Recycling driver after {state['uses']} uses: {reason} ({sample})")
+        return reason
+
+    def forget(self, driver) -> None:
+        with self._lock:
+            self._drivers.pop(driver, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            drivers = [
+                {key: state.get(key) for key in ("uses", "rss_mb", "js_heap_mb", "processes")}
+                for state in self._drivers.values()
+            ]
+            return {
+                "max_rss_mb": self.max_rss_mb,
+                "max_js_heap_mb": self.max_js_heap_mb,
+                "total_rss_mb": round(sum(driver["rss_mb"] or 0 for driver in drivers), 1),
+                "recycled": dict(self._recycled),
+                "drivers": drivers
+            }
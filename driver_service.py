@@ -0,0 +1,203 @@
+import logging
+from collections import deque
+from itertools import cycle
+from threading import Lock
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, List
+
+from profiling import current_profile
+
+# Пакет selenium.webdriver загружает драйверы всех браузеров, поэтому
+# импортируется при первом создании сессии, а не при импорте приложения
+if TYPE_CHECKING:
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+logger = logging.getLogger(__name__)
+
+# Аргументы запуска Chrome (общие для Selenium и асинхронного клиента)
+BASE_CHROME_ARGUMENTS = [
+    "--headless=new",
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-infobars",
+    "--disable-notifications",
+    "--disable-blink-features=AutomationControlled",
+    "--window-size=1280,720",
+]
+
+
+def chrome_options(arguments: List[str]):
+    """
+    Настройки Chrome с аргументами запуска и без признаков автоматизации.
+
+    :param arguments: Аргументы командной строки Chrome.
+    :type arguments: list
+    :rtype: selenium.webdriver.chrome.options.Options
+    """
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    for argument in arguments:
+        options.add_argument(argument)
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+    return options
+
+
+class CommandTimings:
+    """
+    Скользящая статистика времени выполнения команд WebDriver.
+
+    :param window: Сколько последних замеров хранить на каждую команду.
+    :type window: int
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = Lock()
+
+    def record(self, command: str, seconds: float) -> None:
+        with self._lock:
+            if command not in self._samples:
+                self._samples[command] = deque(maxlen=self.window)
+                self._counts[command] = 0
+            self._samples[command].append(seconds)
+            self._counts[command] += 1
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Число команд и перцентили времени выполнения в миллисекундах.
+
+        :rtype: dict
+        """
+        with self._lock:
+            samples = {command: sorted(values) for command, values in self._samples.items()}
+            counts = dict(self._counts)
+
+        result = {}
+        for command, values in samples.items():
+            if not values:
+                continue
+            result[command] = {
+                "count": counts[command],
+                "avg_ms": round(sum(values) / len(values) * 1000, 2),
+                "p50_ms": round(values[len(values) // 2] * 1000, 2),
+                "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2)
+            }
+        return result
+
+
+_connection_class = None
+
+
+def timed_connection_class():
+    """
+    Класс соединения с chromedriver с keep-alive и замером времени каждой
+    команды. Команды также записываются в профиль, активный в текущем потоке.
+    Класс создается при первом вызове вместе с импортом Selenium.
+
+    :rtype: type
+    """
+    global _connection_class
+    if _connection_class is not None:
+        return _connection_class
+
+    from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+
+    class TimedRemoteConnection(ChromiumRemoteConnection):
+        timings = None
+
+        def execute(self, command, params):
+            started = perf_counter()
+            try:
+                return super().execute(command, params)
+            finally:
+                elapsed = perf_counter() - started
+                if self.timings is not None:
+                    self.timings.record(command, elapsed)
+                profile = current_profile()
+                if profile is not None:
+                    profile.record(command, params, elapsed)
+
+    _connection_class = TimedRemoteConnection
+    return _connection_class
+
+
+class DriverServicePool:
+    """
+    Небольшой пул общих процессов chromedriver. Каждый процесс обслуживает
+    множество сессий, новые сессии распределяются по процессам по кругу.
+    Процессы запускаются при первом создании драйвера и перезапускаются,
+    если перестали отвечать.
+
+    :param executable_path: Путь к chromedriver.
+    :type executable_path: str
+    :param size: Число процессов chromedriver.
+    :type size: int
+    :param timings: Статистика времени команд.
+    :type timings: CommandTimings
+    """
+
+    def __init__(self, executable_path: str, size: int = 1, timings: CommandTimings | None = None):
+        self.executable_path = executable_path
+        self.size = max(size, 1)
+        self.timings = timings
+        self._services = []
+        self._order = None
+        self._lock = Lock()
+
+    def _next_service(self) -> "Service":
+        from selenium.webdriver.chrome.service import Service
+
+        with self._lock:
+            if not self._services:
+                self._services = [Service(executable_path=self.executable_path) for _ in range(self.size)]
+                for service in self._services:
+                    service.start()
+                self._order = cycle(range(self.size))
+                logger.info(f"Started {self.size} chromedriver service(s)")
+
+            index = next(self._order)
+            service = self._services[index]
+            if not service.is_connectable():
+                logger.warning(f"chromedriver service #{index} is not responding, restarting")
+                service.stop()
+                service = Service(executable_path=self.executable_path)
+                service.start()
+                self._services[index] = service
+            return service
+
+    def create_driver(self, options) -> "webdriver.Remote":
+        """
+        Открывает новую сессию Chrome на одном из общих процессов chromedriver.
+
+        :param options: Настройки Chrome.
+        :type options: selenium.webdriver.chrome.options.Options
+        :rtype: webdriver.Remote
+        """
+        from selenium import webdriver
+
+        service = self._next_service()
+        executor = timed_connection_class()(
+            service.service_url,
+            vendor_prefix="goog",
+            browser_name="chrome",
+            keep_alive=True
+        )
+        executor.timings = self.timings
+        return webdriver.Remote(command_executor=executor, options=options)
+
+    def stop(self) -> None:
+        with self._lock:
+            for service in self._services:
+                try:
+                    service.stop()
+                except Exception as e:
+                    logger.warning(f"Failed to stop chromedriver: {str(e)}")
+            self._services.clear()
@@ -0,0 +1,135 @@
+from threading import Lock
+from time import monotonic
+from typing import Dict
+
+from selenium.common.exceptions import (
+    InvalidSessionIdException,
+    NoSuchElementException,
+    NoSuchWindowException,
+    TimeoutException,
+    WebDriverException,
+)
+
+# Классы ошибок скрапинга
+TRANSIENT = "transient"            # таймаут или сетевой сбой навигации
+DEAD_SESSION = "dead_session"      # браузер или сессия chromedriver недоступны
+SELECTOR_MISS = "selector_miss"    # на странице нет ожидаемых данных
+UPSTREAM_ERROR = "upstream_error"  # сайт ответил 5xx
+UNKNOWN = "unknown"
+
+# Повтор имеет смысл только для этих классов
+RETRYABLE = (TRANSIENT, DEAD_SESSION, UPSTREAM_ERROR)
+
+# Фрагменты сообщений chromedriver о потерянной сессии
+DEAD_SESSION_MESSAGES = (
+    "invalid session id",
+    "session deleted",
+    "chrome not reachable",
+    "disconnected",
+    "target crashed",
+    "tab crashed",
+    "no such window",
+)
+
+
+class UpstreamServerError(Exception):
+    """
+    Сайт-источник ответил на навигацию кодом 5xx.
+    """
+
+    def __init__(self, url: str, status: int):
+        super().__init__(f"Upstream responded {status} for {url}")
+        self.url = url
+        self.status = status
+
+
+def classify_failure(error: BaseException) -> str:
+    """
+    Определяет класс ошибки скрапинга.
+
+    :param error: Исключение, возникшее при работе с браузером.
+    :type error: BaseException
+    :return: Один из TRANSIENT, DEAD_SESSION, SELECTOR_MISS, UPSTREAM_ERROR, UNKNOWN.
+    :rtype: str
+    """
+    # urllib3 импортируется при первой ошибке, а не при импорте приложения
+    from urllib3.exceptions import HTTPError as ConnectionFailure
+
+    if isinstance(error, UpstreamServerError):
+        return UPSTREAM_ERROR
+    if isinstance(error, NoSuchElementException):
+        return SELECTOR_MISS
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException, ConnectionFailure, ConnectionError)):
+        return DEAD_SESSION
+    if isinstance(error, WebDriverException):
+        message = (error.msg or "").lower()
+        if any(fragment in message for fragment in DEAD_SESSION_MESSAGES):
+            return DEAD_SESSION
+        if isinstance(error, TimeoutException) or "net::err_" in message or "timeout" in message:
+            return TRANSIENT
+    return UNKNOWN
+
+
+class RetryBudget:
+    """
+    Ограничивает долю повторных попыток относительно числа запросов,
+    чтобы повторы не умножали нагрузку на сайт во время сбоев.
+
+    Каждый запрос пополняет бюджет на ``ratio`` попытки, каждый повтор
+    расходует одну. Дополнительно бюджет пополняется на ``min_per_second``
+    попыток в секунду, чтобы повторы были возможны и при малом трафике.
+
+    :param ratio: Доля повторов от числа запросов.
+    :type ratio: float
+    :param min_per_second: Гарантированное число повторов в секунду.
+    :type min_per_second: float
+    :param capacity: Максимальный запас попыток.
+    :type capacity: float
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 0.1, capacity: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = monotonic()
+        self._retries = 0
+        self._rejected = 0
+        self._lock = Lock()
+
+    def _refill(self, amount: float) -> None:
+        now = monotonic()
+        amount += (now - self._updated) * self.min_per_second
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+    def deposit(self) -> None:
+        """
+        Учитывает новый запрос.
+        """
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        Разрешает повтор, если бюджет не исчерпан.
+
+        :rtype: bool
+        """
+        with self._lock:
+            self._refill(0)
+            if self._tokens < 1:
+                self._rejected += 1
+                return False
+            self._tokens -= 1
+            self._retries += 1
+            return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refill(0)
+            return {
+                "available": round(self._tokens, 2),
+                "retries": self._retries,
+                "rejected": self._rejected
+            }
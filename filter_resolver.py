@@ -0,0 +1,114 @@
+from time import time
+from typing import Dict, List
+
+from listing_store import parse_number
+
+# Ключи снимка фильтров, отличающиеся от имен полей фильтров
+SNAPSHOT_FIELDS = {
+    "brands": "brand",
+}
+
+# Поля с числовыми значениями, для которых допускается ввод числом
+NUMERIC_FIELDS = (
+    "mileage_from",
+    "mileage_to",
+    "year_release_from",
+    "year_release_to",
+    "price_from",
+    "price_to",
+)
+
+
+class FilterValueError(ValueError):
+    """
+    Значение фильтра отсутствует среди вариантов сайта.
+    """
+
+    def __init__(self, field: str, value: str):
+        super().__init__(f"Invalid value for filter '{field}': {value}")
+        self.field = field
+        self.value = value
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).split()).casefold().replace("ё", "е")
+
+
+class FilterResolver:
+    """
+    Сопоставляет пользовательский ввод точным вариантам фильтров сайта.
+
+    Строится по снимку ``Scraper.scrape_filters(with_values=True)``.
+    Для каждого поля заранее строится словарь нормализованных ключей
+    (метка без учета регистра и пробелов, ``data-value``, число для
+    диапазонов), поэтому поиск выполняется за O(1).
+
+    :param variants: Снимок вариантов ``{поле: [{"label": ..., "value": ...}]}``.
+    :type variants: dict
+    """
+
+    def __init__(self, variants: Dict[str, List[Dict[str, str]]]):
+        self.variants = variants
+        self.created_at = time()
+        self._index = {}
+
+        for key, options in variants.items():
+            field = SNAPSHOT_FIELDS.get(key, key)
+            index = self._index.setdefault(field, {})
+            for option in options:
+                label = option["label"]
+                value = option.get("value")
+                keys = [_normalize(label)]
+                if value:
+                    keys.append(_normalize(value))
+                if field in NUMERIC_FIELDS:
+                    number = parse_number(label)
+                    if number is not None:
+                        keys.append(number)
+                for lookup in keys:
+                    index.setdefault(lookup, (label, value))
+
+    def is_expired(self, ttl: int) -> bool:
+        return time() - self.created_at > ttl
+
+    def labels(self) -> Dict[str, List[str]]:
+        """
+        Метки вариантов в формате ответа ``/api/v1/cars/filters``.
+
+        :rtype: dict
+        """
+        return {key: [option["label"] for option in options] for key, options in self.variants.items()}
+
+    def resolve(self, field: str, value: str | None) -> str | None:
+        """
+        Возвращает точную метку варианта для значения фильтра.
+        Поля, для которых в снимке нет вариантов (модель, поколение),
+        возвращаются без изменений.
+
+        :param field: Имя поля фильтра.
+        :type field: str
+        :param value: Пользовательское значение.
+        :type value: str
+        :return: Метка варианта.
+        :rtype: str
+        :raises FilterValueError: Если значение не найдено среди вариантов.
+        """
+        if not value or field not in self._index:
+            return value
+
+        index = self._index[field]
+        match = index.get(_normalize(value))
+        if match is None and field in NUMERIC_FIELDS:
+            match = index.get(parse_number(value))
+        if match is None:
+            raise FilterValueError(field, value)
+        return match[0]
+
+    def resolve_all(self, filters: Dict[str, str | None]) -> Dict[str, str | None]:
+        """
+        Применяет :meth:`resolve` ко всем фильтрам.
+
+        :rtype: dict
+        :raises FilterValueError: При первом недопустимом значении.
+        """
+        return {field: self.resolve(field, value) for field, value in filters.items()}
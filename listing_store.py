@@ -0,0 +1,310 @@
+import json
+import logging
+import re
+import sqlite3
+from threading import Lock
+from time import time
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Числовые поля объявления и соответствующие им фильтры сайта (от, до)
+RANGE_FIELDS = {
+    "price": ("price_from", "price_to"),
+    "mileage": ("mileage_from", "mileage_to"),
+    "year": ("year_release_from", "year_release_to"),
+}
+TEXT_FIELDS = ("brand", "model", "gen", "fuel", "color")
+SORT_FIELDS = ("price", "mileage", "year", "seen_at", "id")
+
+
+def parse_number(text: str | None) -> int | None:
+    """
+    Извлекает целое число из строки вида ``"1 200 000 ₽"`` или ``"50 000 км"``.
+
+    :param text: Исходная строка.
+    :type text: str
+    :return: Число или None, если цифр нет.
+    :rtype: int
+    """
+    if text is None:
+        return None
+    digits = re.sub(r"\D", "", str(text))
+    return int(digits) if digits else None
+
+
+def normalize_text(text: str) -> str:
+    """
+    Приводит текстовое поле объявления к виду, в котором оно хранится
+    в индексе: без лишних пробелов, без учета регистра и "ё".
+
+    :rtype: str
+    """
+    return " ".join(text.split()).casefold().replace("ё", "е")
+
+
+def enclosing_range(from_labels: List[str], to_labels: List[str],
+                    low: int | None, high: int | None) -> Tuple[str | None, str | None]:
+    """
+    Подбирает ближайший охватывающий диапазон из значений выпадающих
+    списков сайта: наибольшее "от" не больше ``low`` и наименьшее "до"
+    не меньше ``high``.
+
+    :return: Пара меток (от, до), None означает отсутствие ограничения.
+    :rtype: tuple
+    """
+    label_from = None
+    if low is not None:
+        candidates = [(parse_number(l), l) for l in from_labels]
+        candidates = [c for c in candidates if c[0] is not None and c[0] <= low]
+        if candidates:
+            label_from = max(candidates)[1]
+
+    label_to = None
+    if high is not None:
+        candidates = [(parse_number(l), l) for l in to_labels]
+        candidates = [c for c in candidates if c[0] is not None and c[0] >= high]
+        if candidates:
+            label_to = min(candidates)[1]
+
+    return label_from, label_to
+
+
+class ListingStore:
+    """
+    Локальный индекс объявлений, наполняемый результатами скрапинга.
+
+    Цена, пробег и год хранятся числами в индексированных колонках SQLite,
+    что позволяет фильтровать по произвольным диапазонам, сортировать по
+    нескольким ключам и листать без обращения к сайту.
+
+    :param path: Путь к файлу базы или ``:memory:``.
+    :type path: str
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS listings (
+                    id TEXT PRIMARY KEY,
+                    price INTEGER,
+                    mileage INTEGER,
+                    year INTEGER,
+                    brand TEXT,
+                    model TEXT,
+                    gen TEXT,
+                    fuel TEXT,
+                    color TEXT,
+                    seen_at REAL,
+                    data TEXT
+                );
+                CREATE INDEX IF NOT EXISTS listings_price ON listings(price);
+                CREATE INDEX IF NOT EXISTS listings_mileage ON listings(mileage);
+                CREATE INDEX IF NOT EXISTS listings_year ON listings(year);
+                CREATE INDEX IF NOT EXISTS listings_brand_model ON listings(brand, model, gen);
+                CREATE TABLE IF NOT EXISTS coverage (
+                    scope TEXT PRIMARY KEY,
+                    scraped_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS engines (
+                    id TEXT PRIMARY KEY,
+                    volume REAL,
+                    power INTEGER
+                );
+            """)
+
+    @staticmethod
+    def _norm(value: str | None) -> str | None:
+        return normalize_text(value) if value else None
+
+    def upsert(self, cars: List[Dict], filters: Dict[str, str] | None = None,
+               labels: Callable[[str, str], str] | None = None) -> int:
+        """
+        Добавляет или обновляет объявления из результата ``scrape_cars``.
+        Марка, модель и поколение берутся из фильтров поиска, так как
+        в карточке списка их нет. Топливо и цвет тоже берутся из фильтров,
+        а если поиск по ним не ограничивался, из текста карточки.
+
+        :param cars: Список автомобилей.
+        :type cars: list
+        :param filters: Фильтры, с которыми выполнялся поиск.
+        :type filters: dict
+        :param labels: Функция ``(поле, текст)``, приводящая текст карточки
+            к метке варианта фильтра сайта, с которой сравнивается запрос.
+        :type labels: callable
+        :return: Число записанных объявлений.
+        :rtype: int
+        """
+        filters = filters or {}
+        labels = labels or (lambda field, value: value)
+
+        def text(car, field):
+            return self._norm(filters.get(field) or labels(field, car.get(field)))
+
+        with self._lock, self._conn:
+            # Время фиксируется под блокировкой, чтобы seen_at возрастал в порядке
+            # записи и changes_since не пропускал параллельно записанные объявления
+            now = time()
+            rows = [(
+                car["id"],
+                parse_number(car.get("price")),
+                parse_number(car.get("mileage")),
+                parse_number(car.get("year")),
+                self._norm(filters.get("brand")),
+                self._norm(filters.get("model")),
+                self._norm(filters.get("gen")),
+                text(car, "fuel"),
+                text(car, "color"),
+                now,
+                json.dumps(car, ensure_ascii=False)
+            ) for car in cars if car.get("id")]
+            self._conn.executemany("""
+                INSERT INTO listings (id, price, mileage, year, brand, model, gen, fuel, color, seen_at, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    price = excluded.price,
+                    mileage = excluded.mileage,
+                    year = excluded.year,
+                    brand = COALESCE(excluded.brand, listings.brand),
+                    model = COALESCE(excluded.model, listings.model),
+                    gen = COALESCE(excluded.gen, listings.gen),
+                    fuel = excluded.fuel,
+                    color = excluded.color,
+                    seen_at = excluded.seen_at,
+                    data = excluded.data
+            """, rows)
+        return len(rows)
+
+    def query(self, ranges: Dict[str, Tuple[int | None, int | None]] | None = None,
+              equals: Dict[str, str] | None = None, sort: List[str] | None = None,
+              offset: int = 0, limit: int = 20) -> Tuple[int, List[Dict]]:
+        """
+        Выборка объявлений из индекса.
+
+        :param ranges: Диапазоны по числовым полям: ``{"price": (min, max)}``.
+        :type ranges: dict
+        :param equals: Точные значения текстовых полей: ``{"brand": "Toyota"}``.
+        :type equals: dict
+        :param sort: Ключи сортировки, ``-`` в начале означает убывание.
+        :type sort: list
+        :param offset: Смещение.
+        :type offset: int
+        :param limit: Размер страницы.
+        :type limit: int
+        :return: Общее число подходящих объявлений и страница результатов.
+        :rtype: tuple
+        :raises ValueError: При неизвестном поле фильтра или сортировки.
+        """
+        where, params = [], []
+        for field, (low, high) in (ranges or {}).items():
+            if field not in RANGE_FIELDS:
+                raise ValueError(f"Unknown range field: {field}")
+            if low is not None:
+                where.append(f"{field} >= ?")
+                params.append(low)
+            if high is not None:
+                where.append(f"{field} <= ?")
+                params.append(high)
+        for field, value in (equals or {}).items():
+            if field not in TEXT_FIELDS:
+                raise ValueError(f"Unknown field: {field}")
+            if value:
+                where.append(f"{field} = ?")
+                params.append(self._norm(value))
+
+        order = []
+        for key in sort or []:
+            field = key.lstrip("-")
+            if field not in SORT_FIELDS:
+                raise ValueError(f"Unknown sort field: {field}")
+            order.append(f"{field} IS NULL, {field} {'DESC' if key.startswith('-') else 'ASC'}")
+        order.append("id ASC")
+
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM listings {where_sql}", params
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT data FROM listings {where_sql} ORDER BY {', '.join(order)} LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return total, [json.loads(row[0]) for row in rows]
+
+    def price_inputs(self, ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Цена, год выпуска и двигатель объявлений по идентификаторам.
+        Объем и мощность известны только для автомобилей, страница которых
+        уже скрапилась (:meth:`set_engine`), иначе они None.
+
+        :param ids: Идентификаторы автомобилей.
+        :type ids: list
+        :return: ``{id: {"price": ..., "year": ..., "engine_volume": ..., "engine_power": ...}}``
+            для найденных объявлений.
+        :rtype: dict
+        """
+        ids = [str(id) for id in ids]
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT listings.id, price, year, volume, power FROM listings "
+                "LEFT JOIN engines ON engines.id = listings.id "
+                f"WHERE listings.id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall()
+        return {
+            row[0]: {"price": row[1], "year": row[2], "engine_volume": row[3], "engine_power": row[4]}
+            for row in rows
+        }
+
+    def set_engine(self, id: str, volume: float | None, power: int | None) -> None:
+        """
+        Запоминает объем (л) и мощность (л.с.) двигателя автомобиля со страницы автомобиля.
+        """
+        with self._lock, self._conn:
+            # Страница с частью разделов не стирает найденные ранее значения
+            self._conn.execute("""
+                INSERT INTO engines (id, volume, power) VALUES (?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    volume = COALESCE(excluded.volume, engines.volume),
+                    power = COALESCE(excluded.power, engines.power)
+            """, (str(id), volume, power))
+
+    def changes_since(self, seen_at: float | None) -> List[Tuple]:
+        """
+        Объявления, записанные или обновленные позже указанного времени.
+
+        :param seen_at: Время предыдущей выборки, None - все объявления.
+        :type seen_at: float
+        :return: Строки ``(id, price, mileage, year, brand, model, gen, seen_at)`` в порядке записи.
+        :rtype: list
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, price, mileage, year, brand, model, gen, seen_at FROM listings "
+                "WHERE seen_at > ? ORDER BY seen_at",
+                (seen_at if seen_at is not None else float("-inf"),)
+            ).fetchall()
+
+    @staticmethod
+    def scope_key(filters: Dict[str, str]) -> str:
+        return json.dumps({k: v for k, v in filters.items() if v}, ensure_ascii=False, sort_keys=True)
+
+    def is_covered(self, filters: Dict[str, str], max_age: int) -> bool:
+        """
+        Проверяет, выполнялся ли недавно скрапинг с этим набором фильтров сайта.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT scraped_at FROM coverage WHERE scope = ?", (self.scope_key(filters),)
+            ).fetchone()
+        return bool(row) and time() - row[0] < max_age
+
+    def mark_covered(self, filters: Dict[str, str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO coverage (scope, scraped_at) VALUES (?, ?)",
+                (self.scope_key(filters), time())
+            )
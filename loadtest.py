@@ -0,0 +1,391 @@
+"""
+Нагрузочное тестирование API повтором журнала запросов.
+
+Журнал — JSONL, по записи на строку: ``{"t": unix time, "method": "GET",
+"path": "/api/v1/cars?brand=Toyota"}``. Такой журнал пишет само
+приложение, если задан ``TRAFFIC_LOG``.
+
+Примеры::
+
+    python loadtest.py run traffic.jsonl --url http://localhost:5000 --concurrency 8 --out before.json
+    python loadtest.py run traffic.jsonl --in-process --rate 5 --out after.json
+    python loadtest.py compare before.json after.json
+"""
+import argparse
+import json
+import logging
+import re
+import sys
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock, Thread
+from time import perf_counter, sleep, time
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Идентификаторы в путях заменяются шаблоном, чтобы группировать запросы по эндпоинтам
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+class TrafficRecorder:
+    """
+    Пишет журнал обслуженных запросов в формате, который понимает
+    :func:`load_log`. Записываются только GET запросы: тела POST и PATCH
+    в журнал не попадают, и повторить их нельзя.
+
+    :param path: Путь к файлу JSONL.
+    :type path: str
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+
+    def record(self, method: str, path: str, status: int, seconds: float) -> None:
+        if method != "GET":
+            return
+        line = json.dumps({
+            "t": round(time(), 3),
+            "method": method,
+            "path": path,
+            "status": status,
+            "ms": round(seconds * 1000, 2)
+        }, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def load_log(path: str) -> List[Dict]:
+    """
+    Читает журнал запросов и переводит время в смещения от первой записи.
+
+    :param path: Путь к файлу JSONL.
+    :type path: str
+    :return: Записи ``{"offset", "method", "path"}`` GET запросов по возрастанию времени.
+    :rtype: list
+    """
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            # Запросы с телом повторить нельзя, в журнале оно не хранится
+            if record.get("method", "GET").upper() != "GET":
+                continue
+            entries.append({
+                "t": float(record.get("t", 0)),
+                "method": record.get("method", "GET").upper(),
+                "path": record["path"]
+            })
+    entries.sort(key=lambda entry: entry["t"])
+    start = entries[0]["t"] if entries else 0
+    for entry in entries:
+        entry["offset"] = entry.pop("t") - start
+    return entries
+
+
+def endpoint_of(path: str) -> str:
+    return ID_SEGMENT.sub("/<id>", path.split("?", 1)[0])
+
+
+def percentile(values: List[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))], 2)
+
+
+class HttpClient:
+    """
+    Отправляет запросы к запущенному экземпляру API.
+
+    :param base_url: Адрес API, например ``http://localhost:5000``.
+    :type base_url: str
+    :param timeout: Таймаут запроса в секундах.
+    :type timeout: float
+    """
+
+    def __init__(self, base_url: str, timeout: float = 60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method: str, path: str) -> Tuple[int, Dict]:
+        req = urllib.request.Request(self.base_url + path, method=method, headers={"Accept-Encoding": "gzip"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                body = response.read()
+                return response.status, {"bytes": len(body)}
+        except urllib.error.HTTPError as e:
+            return e.code, {"bytes": len(e.read())}
+
+    def metrics(self) -> Dict | None:
+        try:
+            with urllib.request.urlopen(self.base_url + "/api/v1/metrics", timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except Exception as e:
+            logger.warning(f"Failed to fetch metrics: {str(e)}")
+            return None
+
+
+class InProcessClient:
+    """
+    Выполняет запросы приложением в текущем процессе через тестовый
+    клиент Flask. Сайт-источник берется из настроек приложения
+    (``SEARCHPAGE_URL``, ``CARPAGE_URL``), поэтому его можно направить
+    на локальную копию сайта.
+    """
+
+    def __init__(self):
+        import app
+        # Прогрев запускается так же, как при загрузке воркера (wsgi.py)
+        app.start()
+        self.app = app.app
+
+    def request(self, method: str, path: str) -> Tuple[int, Dict]:
+        with self.app.test_client() as client:
+            response = client.open(path, method=method, headers={"Accept-Encoding": "gzip"})
+            return response.status_code, {"bytes": len(response.get_data())}
+
+    def metrics(self) -> Dict | None:
+        with self.app.test_client() as client:
+            response = client.get("/api/v1/metrics")
+            return response.get_json() if response.status_code == 200 else None
+
+
+class LoadRunner:
+    """
+    Повторяет журнал запросов с заданной параллельностью.
+
+    Запросы отправляются по времени из журнала, умноженному на
+    ``time_scale`` (0.5 — вдвое быстрее), либо с постоянной частотой
+    ``rate`` запросов в секунду, если она задана. Параллельно раз в
+    ``stats_interval`` секунд снимается ``/api/v1/metrics``.
+
+    Задержка запроса отсчитывается от момента по расписанию, а не от
+    начала отправки: время ожидания свободного потока, когда все
+    ``concurrency`` заняты, тоже входит в задержку, как у клиента,
+    пришедшего в это время.
+
+    :param client: Клиент с методами ``request`` и ``metrics``.
+    :param concurrency: Максимум одновременных запросов.
+    :type concurrency: int
+    :param rate: Частота запросов в секунду, None - по времени журнала.
+    :type rate: float
+    :param time_scale: Множитель времени журнала.
+    :type time_scale: float
+    :param stats_interval: Период снятия метрик в секундах.
+    :type stats_interval: float
+    """
+
+    def __init__(self, client, concurrency: int = 4, rate: float | None = None,
+                 time_scale: float = 1.0, stats_interval: float = 5.0):
+        self.client = client
+        self.concurrency = concurrency
+        self.rate = rate
+        self.time_scale = time_scale
+        self.stats_interval = stats_interval
+        self._results = []
+        self._timeline = []
+        self._lock = Lock()
+
+    def _send(self, entry: Dict, started_at: float, at: float) -> None:
+        scheduled = started_at + at
+        try:
+            status, info = self.client.request(entry["method"], entry["path"])
+        except Exception as e:
+            status, info = 0, {"error": str(e)}
+        result = {
+            "endpoint": endpoint_of(entry["path"]),
+            "status": status,
+            "ms": (perf_counter() - scheduled) * 1000,
+            "at": at,
+            "bytes": info.get("bytes", 0)
+        }
+        with self._lock:
+            self._results.append(result)
+
+    def _sample_metrics(self, stop: Event, started_at: float) -> None:
+        while not stop.wait(self.stats_interval):
+            metrics = self.client.metrics()
+            if metrics:
+                self._timeline.append({
+                    "at": round(perf_counter() - started_at, 1),
+                    "pool": metrics.get("pool"),
+                    "upstream": metrics.get("upstream"),
+                    "cache": metrics.get("cache"),
+                    "cache_warmer": len(metrics.get("cache_warmer") or {})
+                })
+
+    def run(self, entries: List[Dict], repeat: int = 1) -> Dict:
+        """
+        Выполняет прогон и возвращает отчет.
+
+        :param entries: Записи из :func:`load_log`.
+        :type entries: list
+        :param repeat: Сколько раз повторить журнал.
+        :type repeat: int
+        :rtype: dict
+        """
+        schedule = []
+        span = (entries[-1]["offset"] if entries else 0) + 1
+        for round_num in range(repeat):
+            for index, entry in enumerate(entries):
+                if self.rate:
+                    at = (round_num * len(entries) + index) / self.rate
+                else:
+                    at = (round_num * span + entry["offset"]) * self.time_scale
+                schedule.append((at, entry))
+
+        stop = Event()
+        started_at = perf_counter()
+        sampler = Thread(target=self._sample_metrics, args=(stop, started_at), daemon=True)
+        sampler.start()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for at, entry in schedule:
+                delay = at - (perf_counter() - started_at)
+                if delay > 0:
+                    sleep(delay)
+                pool.submit(self._send, entry, started_at, at)
+        elapsed = perf_counter() - started_at
+        stop.set()
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict:
+        by_endpoint = {}
+        for result in self._results:
+            by_endpoint.setdefault(result["endpoint"], []).append(result)
+
+        endpoints = {}
+        for endpoint, results in sorted(by_endpoint.items()):
+            latencies = [result["ms"] for result in results]
+            statuses = {}
+            for result in results:
+                statuses[str(result["status"])] = statuses.get(str(result["status"]), 0) + 1
+            errors = sum(1 for result in results if not 200 <= result["status"] < 400)
+            endpoints[endpoint] = {
+                "count": len(results),
+                "throughput": round(len(results) / elapsed, 2),
+                "error_rate": round(errors / len(results), 4),
+                "statuses": statuses,
+                "p50_ms": percentile(latencies, 0.5),
+                "p90_ms": percentile(latencies, 0.9),
+                "p99_ms": percentile(latencies, 0.99),
+                "max_ms": round(max(latencies), 2),
+                "avg_bytes": int(sum(result["bytes"] for result in results) / len(results))
+            }
+
+        latencies = [result["ms"] for result in self._results]
+        errors = sum(1 for result in self._results if not 200 <= result["status"] < 400)
+        return {
+            "duration_s": round(elapsed, 2),
+            "requests": len(self._results),
+            "throughput": round(len(self._results) / elapsed, 2) if elapsed else 0,
+            "error_rate": round(errors / len(self._results), 4) if self._results else 0,
+            "p50_ms": percentile(latencies, 0.5),
+            "p99_ms": percentile(latencies, 0.99),
+            "endpoints": endpoints,
+            "timeline": self._timeline
+        }
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        f"duration {report['duration_s']}s, {report['requests']} requests, "
+        f"{report['throughput']} req/s, errors {report['error_rate']:.2%}, "
+        f"p50 {report['p50_ms']} ms, p99 {report['p99_ms']} ms",
+        f"{'endpoint':<40} {'count':>6} {'req/s':>7} {'err':>7} {'p50':>9} {'p90':>9} {'p99':>9}"
+    ]
+    for endpoint, stats in report["endpoints"].items():
+        lines.append(
+            f"{endpoint:<40} {stats['count']:>6} {stats['throughput']:>7} {stats['error_rate']:>7.2%} "
+            f"{stats['p50_ms']:>9} {stats['p90_ms']:>9} {stats['p99_ms']:>9}"
+        )
+    return "\n".join(lines)
+
+
+def _delta(before: float | None, after: float | None) -> str:
+    if before is None or after is None:
+        return "n/a"
+    if before == 0:
+        return f"{after}"
+    return f"{after} ({(after - before) / before:+.1%})"
+
+
+def compare_reports(before: Dict, after: Dict) -> str:
+    """
+    Сравнивает два отчета: пропускную способность, задержки и долю ошибок.
+
+    :param before: Отчет базового прогона.
+    :type before: dict
+    :param after: Отчет нового прогона.
+    :type after: dict
+    :rtype: str
+    """
+    lines = [
+        f"total: req/s {_delta(before['throughput'], after['throughput'])}, "
+        f"p50 {_delta(before['p50_ms'], after['p50_ms'])}, p99 {_delta(before['p99_ms'], after['p99_ms'])}, "
+        f"errors {before['error_rate']:.2%} -> {after['error_rate']:.2%}"
+    ]
+    for endpoint in sorted(set(before["endpoints"]) | set(after["endpoints"])):
+        old = before["endpoints"].get(endpoint)
+        new = after["endpoints"].get(endpoint)
+        if not old or not new:
+            lines.append(f"{endpoint}: only in {'after' if new else 'before'}")
+            continue
+        lines.append(
+            f"{endpoint}: req/s {_delta(old['throughput'], new['throughput'])}, "
+            f"p50 {_delta(old['p50_ms'], new['p50_ms'])}, p99 {_delta(old['p99_ms'], new['p99_ms'])}, "
+            f"errors {old['error_rate']:.2%} -> {new['error_rate']:.2%}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочное тестирование API повтором журнала запросов")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Повторить журнал запросов")
+    run.add_argument("log", help="Журнал запросов JSONL")
+    target = run.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Адрес запущенного API")
+    target.add_argument("--in-process", action="store_true", help="Выполнять запросы приложением в этом процессе")
+    run.add_argument("--concurrency", type=int, default=4)
+    run.add_argument("--rate", type=float, help="Запросов в секунду вместо времени журнала")
+    run.add_argument("--time-scale", type=float, default=1.0, help="Множитель времени журнала")
+    run.add_argument("--repeat", type=int, default=1)
+    run.add_argument("--stats-interval", type=float, default=5.0, help="Период снятия /api/v1/metrics")
+    run.add_argument("--out", help="Файл JSON для отчета")
+
+    compare = commands.add_parser("compare", help="Сравнить два отчета")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.before, encoding="utf-8") as f:
+            before = json.load(f)
+        with open(args.after, encoding="utf-8") as f:
+            after = json.load(f)
+        print(compare_reports(before, after))
+        return
+
+    entries = load_log(args.log)
+    if not entries:
+        sys.exit("Empty request log")
+
+    client = InProcessClient() if args.in_process else HttpClient(args.url)
+    runner = LoadRunner(client, args.concurrency, args.rate, args.time_scale, args.stats_interval)
+    report = runner.run(entries, repeat=args.repeat)
+    print(format_report(report))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import logging
+import re
+import sqlite3
+from threading import Lock
+from time import time
+from typing import Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Виды условий поиска и разделы страницы автомобиля, из которых они извлекаются
+TERM_SECTIONS = {
+    "option": "car_body_options",
+    "spec": "tech_parameters",
+    "check": "car_check_parameters",
+    "inspection": "inspections",
+}
+
+
+def normalize(text) -> str:
+    return re.sub(r"\s+", " ", str(text)).strip().casefold()
+
+
+def make_term(kind: str, text: str) -> str:
+    """
+    Термин индекса из условия поиска: ``"Подогрев сидений"`` для опции,
+    ``"Тип топлива:Бензин"`` для характеристики и проверки,
+    ``"Лобовое стекло:Царапины"`` или ``"Кузов/Лобовое стекло:Царапины"``
+    для строки осмотра.
+
+    :param kind: Вид условия из ``TERM_SECTIONS``.
+    :type kind: str
+    :param text: Условие.
+    :type text: str
+    :rtype: str
+    :raises ValueError: При неизвестном виде или условии без значения.
+    """
+    if kind not in TERM_SECTIONS:
+        raise ValueError(f"Unknown search field: {kind}")
+    if kind == "option":
+        return f"{kind}:{normalize(text)}"
+    name, separator, value = text.partition(":")
+    if not separator or not name.strip() or not value.strip():
+        raise ValueError(f"Expected name:value in {kind}: {text}")
+    return _pair_term(kind, name, value)
+
+
+def _pair_term(kind: str, name: str, value: str) -> str:
+    return f"{kind}:{normalize(name)}={normalize(value)}"
+
+
+def extract_terms(details: Dict) -> Dict[str, Set[str]]:
+    """
+    Термины индекса по разделам страницы автомобиля. Возвращаются только
+    виды, раздел которых есть в ``details``.
+
+    :param details: Результат ``scrape_car_details``.
+    :type details: dict
+    :return: Вид -> множество терминов.
+    :rtype: dict
+    """
+    terms = {}
+    for kind, section in TERM_SECTIONS.items():
+        data = details.get(section)
+        if data is None:
+            continue
+        found = terms[kind] = set()
+        if kind == "option":
+            for options in data.values():
+                found.update(f"{kind}:{normalize(option)}" for option in options if option)
+        elif kind == "inspection":
+            for row in data:
+                if row.get("parameter") and row.get("value"):
+                    found.add(_pair_term(kind, row["parameter"], row["value"]))
+                    if row.get("section"):
+                        found.add(_pair_term(kind, f"{row['section']}/{row['parameter']}", row["value"]))
+        else:
+            found.update(_pair_term(kind, name, value) for name, value in data.items() if name and value)
+    return terms
+
+
+class OptionIndex:
+    """
+    Инвертированный индекс опций, характеристик и результатов проверок
+    автомобилей, наполняемый результатами ``scrape_car_details``.
+
+    Каждому автомобилю присваивается порядковый номер, список автомобилей
+    термина хранится битовой картой (целым числом) по этим номерам, поэтому
+    условия И/ИЛИ сводятся к побитовым операциям. Термины сохраняются в
+    SQLite, карты восстанавливаются из базы при запуске. При повторном
+    скрапинге автомобиля термины обновляются только для полученных разделов.
+
+    :param path: Путь к файлу базы или ``:memory:``.
+    :type path: str
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()
+        self._docs = {}
+        self._cars = []
+        self._terms = {}
+        self._postings = {}
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS option_cars (
+                    doc INTEGER PRIMARY KEY,
+                    id TEXT UNIQUE,
+                    title TEXT,
+                    price TEXT,
+                    indexed_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS option_terms (
+                    doc INTEGER,
+                    kind TEXT,
+                    term TEXT,
+                    PRIMARY KEY (doc, term)
+                );
+            """)
+            self._load()
+
+    def _load(self) -> None:
+        for doc, id, title, price in self._conn.execute(
+                "SELECT doc, id, title, price FROM option_cars ORDER BY doc"):
+            self._docs[id] = doc
+            self._cars.extend([None] * (doc + 1 - len(self._cars)))
+            self._cars[doc] = {"id": id, "title": title, "price": price}
+        for doc, kind, term in self._conn.execute("SELECT doc, kind, term FROM option_terms"):
+            self._terms.setdefault(doc, {}).setdefault(kind, set()).add(term)
+            self._postings[term] = self._postings.get(term, 0) | (1 << doc)
+        if self._docs:
+            logger.info(f"Option index loaded: {len(self._docs)} cars, {len(self._postings)} terms")
+
+    def add(self, id: str, details: Dict) -> int:
+        """
+        Добавляет или обновляет автомобиль в индексе.
+
+        :param id: Идентификатор автомобиля.
+        :type id: str
+        :param details: Результат ``scrape_car_details``, в том числе с частью разделов.
+        :type details: dict
+        :return: Число терминов автомобиля после обновления.
+        :rtype: int
+        """
+        id = str(id)
+        found = extract_terms(details)
+        with self._lock, self._conn:
+            doc = self._docs.get(id)
+            if doc is None:
+                doc = self._docs[id] = len(self._cars)
+                self._cars.append({"id": id, "title": None, "price": None})
+            car = self._cars[doc]
+            for field in ("title", "price"):
+                if details.get(field):
+                    car[field] = details[field]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO option_cars (doc, id, title, price, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                (doc, id, car["title"], car["price"], time())
+            )
+
+            bit = 1 << doc
+            current = self._terms.setdefault(doc, {})
+            for kind, terms in found.items():
+                previous = current.get(kind, set())
+                for term in previous - terms:
+                    postings = self._postings[term] & ~bit
+                    if postings:
+                        self._postings[term] = postings
+                    else:
+                        del self._postings[term]
+                for term in terms - previous:
+                    self._postings[term] = self._postings.get(term, 0) | bit
+                current[kind] = terms
+                self._conn.execute("DELETE FROM option_terms WHERE doc = ? AND kind = ?", (doc, kind))
+                self._conn.executemany(
+                    "INSERT INTO option_terms (doc, kind, term) VALUES (?, ?, ?)",
+                    [(doc, kind, term) for term in terms]
+                )
+            return sum(len(terms) for terms in current.values())
+
+    def search(self, conditions: List[Tuple[str, List[str]]], match_all: bool = True,
+               offset: int = 0, limit: int = 20) -> Tuple[int, List[Dict]]:
+        """
+        Автомобили, удовлетворяющие условиям. Каждое условие - вид и список
+        альтернатив (ИЛИ); условия объединяются через И или, при
+        ``match_all=False``, через ИЛИ.
+
+        :param conditions: Пары (вид, альтернативы): ``[("option", ["Люк", "Панорамная крыша"])]``.
+        :type conditions: list
+        :param match_all: Объединять условия через И.
+        :type match_all: bool
+        :param offset: Смещение.
+        :type offset: int
+        :param limit: Размер страницы.
+        :type limit: int
+        :return: Общее число найденных автомобилей и страница результатов
+            по убыванию номера в индексе: позже впервые добавленные первыми,
+            повторная индексация автомобиля его место не меняет.
+        :rtype: tuple
+        :raises ValueError: При неизвестном виде или некорректном условии.
+        """
+        if not conditions:
+            raise ValueError("No search conditions")
+        groups = [[make_term(kind, text) for text in alternatives] for kind, alternatives in conditions]
+
+        with self._lock:
+            result = None
+            for terms in groups:
+                matched = 0
+                for term in terms:
+                    matched |= self._postings.get(term, 0)
+                if result is None:
+                    result = matched
+                else:
+                    result = result & matched if match_all else result | matched
+                if match_all and not result:
+                    break
+
+            total = result.bit_count()
+            # Номера автомобилей по убыванию: позиции единиц в двоичной записи
+            bits = bin(result)[2:] if result else ""
+            cars, position, skipped = [], bits.find("1"), 0
+            while position != -1 and len(cars) < limit:
+                if skipped < offset:
+                    skipped += 1
+                else:
+                    cars.append(dict(self._cars[len(bits) - 1 - position]))
+                position = bits.find("1", position + 1)
+        return total, cars
+
+    def info(self) -> Dict:
+        with self._lock:
+            kinds = {kind: 0 for kind in TERM_SECTIONS}
+            for term in self._postings:
+                kinds[term.split(":", 1)[0]] += 1
+            return {"cars": len(self._docs), "terms": kinds}
@@ -0,0 +1,172 @@
+import logging
+from collections import deque
+from threading import Lock
+from time import time
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class DetailPrefetcher:
+    """
+    Предзагрузка страниц автомобилей из только что отданной выдачи.
+
+    После ответа со списком первые ``top_k`` автомобилей, которых еще нет
+    в кэше, ставятся в очередь задачами с низким приоритетом, чтобы
+    переход клиента на страницу автомобиля отдавался из кэша. Задачи
+    ставятся и выполняются только при наличии свободных воркеров
+    (``has_capacity``), не чаще ``rate`` в минуту и не больше
+    ``max_pending`` одновременно. Попадания клиентов в предзагруженные
+    записи учитываются через :meth:`record_hit`; запись, к которой не
+    обратились за ``ttl`` секунд, считается лишней.
+
+    :param fetch: Функция, загружающая страницу автомобиля в кэш по ID.
+    :type fetch: callable
+    :param submit: Функция постановки задачи в очередь с низким приоритетом.
+    :type submit: callable
+    :param is_cached: Функция проверки, есть ли свежая запись автомобиля в кэше.
+    :type is_cached: callable
+    :param cache_key: Функция ключа кэша страницы автомобиля по ID.
+    :type cache_key: callable
+    :param has_capacity: Функция проверки свободной емкости пула.
+    :type has_capacity: callable
+    :param top_k: Сколько первых автомобилей выдачи предзагружать.
+    :type top_k: int
+    :param rate: Максимум предзагрузок в минуту.
+    :type rate: int
+    :param max_pending: Максимум предзагрузок в очереди и в работе.
+    :type max_pending: int
+    :param ttl: Сколько секунд ждать обращения к предзагруженной записи.
+    :type ttl: int
+    """
+
+    MAX_TRACKED = 10000
+
+    def __init__(self, fetch: Callable[[str], bool], submit: Callable, is_cached: Callable[[str], bool],
+                 cache_key: Callable[[str], str], has_capacity: Callable[[], bool],
+                 top_k: int = 3, rate: int = 30, max_pending: int = 2, ttl: int = 1800):
+        self.fetch = fetch
+        self.submit = submit
+        self.is_cached = is_cached
+        self.cache_key = cache_key
+        self.has_capacity = has_capacity
+        self.top_k = top_k
+        self.rate = rate
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._pending = set()
+        self._started = deque()
+        self._prefetched = {}
+        self._stats = {
+            "scheduled": 0, "prefetched": 0, "failed": 0, "hits": 0, "unused": 0,
+            "skipped_cached": 0, "skipped_rate": 0, "skipped_budget": 0, "skipped_capacity": 0
+        }
+        self._lock = Lock()
+
+    def schedule(self, ids: List[str]) -> int:
+        """
+        Ставит в очередь предзагрузку первых автомобилей выдачи.
+
+        :param ids: ID автомобилей в порядке выдачи.
+        :type ids: list
+        :return: Число поставленных задач.
+        :rtype: int
+        """
+        scheduled = 0
+        for id in [id for id in ids if id][:self.top_k]:
+            id = str(id)
+            with self._lock:
+                if id in self._pending:
+                    continue
+                reason = self._admit()
+                if reason is None:
+                    self._pending.add(id)
+            if reason is None and self.is_cached(id):
+                reason = "skipped_cached"
+            if reason is None and not self.has_capacity():
+                reason = "skipped_capacity"
+            if reason is None:
+                try:
+                    self.submit(self._run, id)
+                except RuntimeError:
+                    # Executor уже завершает работу
+                    reason = "skipped_capacity"
+            with self._lock:
+                if reason is not None:
+                    self._pending.discard(id)
+                    self._stats[reason] += 1
+                    # Лимиты действуют и на остальные автомобили выдачи
+                    if reason != "skipped_cached":
+                        break
+                    continue
+                self._started.append(time())
+                self._stats["scheduled"] += 1
+            scheduled += 1
+        return scheduled
+
+    def _admit(self) -> str | None:
+        now = time()
+        while self._started and now - self._started[0] > 60:
+            self._started.popleft()
+        if len(self._pending) >= self.max_pending:
+            return "skipped_budget"
+        if len(self._started) >= self.rate:
+            return "skipped_rate"
+        return None
+
+    def _run(self, id: str) -> None:
+        try:
+            # Пока задача ждала в очереди, воркеры могли понадобиться живому трафику
+            if not self.has_capacity():
+                with self._lock:
+                    self._stats["skipped_capacity"] += 1
+                return
+            fetched = self.fetch(id)
+            with self._lock:
+                if fetched:
+                    self._stats["prefetched"] += 1
+                    self._expire()
+                    self._prefetched[self.cache_key(id)] = time() + self.ttl
+                    if len(self._prefetched) > self.MAX_TRACKED:
+                        self._prefetched.pop(next(iter(self._prefetched)))
+                else:
+                    self._stats["failed"] += 1
+        except Exception as e:
+            logger.warning(f"Prefetch failed for car {id}: {str(e)}")
+            with self._lock:
+                self._stats["failed"] += 1
+        finally:
+            with self._lock:
+                self._pending.discard(id)
+
+    def _expire(self) -> None:
+        now = time()
+        expired = [key for key, expires in self._prefetched.items() if expires < now]
+        for key in expired:
+            del self._prefetched[key]
+        self._stats["unused"] += len(expired)
+
+    def record_hit(self, key: str) -> None:
+        """
+        Учитывает ответ из кэша: первое обращение к предзагруженной записи - попадание.
+
+        :param key: Ключ кэша ответа.
+        :type key: str
+        """
+        with self._lock:
+            if key in self._prefetched:
+                if self._prefetched.pop(key) >= time():
+                    self._stats["hits"] += 1
+                else:
+                    self._stats["unused"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._expire()
+            used = self._stats["hits"] + self._stats["unused"]
+            return {
+                **self._stats,
+                "pending": len(self._pending),
+                "tracked": len(self._prefetched),
+                "hit_rate": round(self._stats["hits"] / used, 3) if used else None
+            }
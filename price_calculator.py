@@ -0,0 +1,284 @@
+import logging
+import re
+from threading import Lock
+from time import time
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Допустимое относительное расхождение при сравнении сумм
+TOLERANCE = 0.005
+
+# Источники расчета
+CACHED = "cached"      # скрапнутый расчет этого автомобиля на текущую дату курса
+COMPUTED = "computed"  # расчет по выученной сетке сборов
+SCRAPED = "scraped"
+
+
+def _close(a: float, b: float) -> bool:
+    return abs(a - b) <= max(abs(a), abs(b), 1) * TOLERANCE
+
+
+AMOUNT = re.compile(r"^(\D*?)(\d[\d\s]*\d|\d)(\D*)")
+ENGINE_VOLUME = re.compile(r"(\d+(?:[.,]\d+)?)\s*л(?![\w.])")
+ENGINE_POWER = re.compile(r"(\d+)\s*л\.\s*с")
+
+
+def parse_amount(text: str | None) -> int | None:
+    """
+    Первая сумма в строке: ``"1 251 501 ₽ (13 730 € )"`` -> ``1251501``.
+
+    :rtype: int
+    """
+    match = AMOUNT.match(text or "")
+    return int(re.sub(r"\D", "", match.group(2))) if match else None
+
+
+def format_like(sample: str, value: int) -> str:
+    """
+    Форматирует сумму так же, как пример с сайта: префикс, разделитель
+    разрядов и обозначение валюты (например ``"1 234 567 ₽"``).
+    Дополнительные суммы образца (в скобках) не переносятся.
+
+    :param sample: Строка-образец.
+    :type sample: str
+    :param value: Сумма.
+    :type value: int
+    :rtype: str
+    """
+    match = AMOUNT.match(sample or "")
+    if not match:
+        return str(value)
+    prefix, digits, suffix = match.groups()
+    separator = "\u00a0" if "\u00a0" in digits else " "
+    return (f"{prefix}{value:,}".replace(",", separator) + suffix.rstrip("( ")).strip()
+
+
+def engine_inputs(details: Dict) -> Dict[str, float | int | None]:
+    """
+    Объем и мощность двигателя из параметров страницы автомобиля:
+    ``"Двигатель": "2.5 л / 181 л.с."`` -> ``{"engine_volume": 2.5, "engine_power": 181}``.
+
+    :param details: Результат ``scrape_car_details``.
+    :type details: dict
+    :return: Найденные значения, None для отсутствующих.
+    :rtype: dict
+    """
+    volume, power = None, None
+    for section in ("base_parameters", "tech_parameters"):
+        for value in (details.get(section) or {}).values():
+            text = str(value)
+            match = ENGINE_VOLUME.search(text)
+            if volume is None and match:
+                volume = float(match.group(1).replace(",", "."))
+            match = ENGINE_POWER.search(text)
+            if power is None and match:
+                power = int(match.group(1))
+    return {"engine_volume": volume, "engine_power": power}
+
+
+def schedule_key(inputs: Dict) -> Tuple | None:
+    """
+    Ключ сетки сборов: год выпуска, объем и мощность двигателя. Пошлина
+    и утилизационный сбор зависят от двигателя, поэтому без любого из
+    этих значений сетка не применяется.
+
+    :rtype: tuple
+    """
+    key = (inputs.get("year"), inputs.get("engine_volume"), inputs.get("engine_power"))
+    return None if None in key else key
+
+
+class PriceCalculator:
+    """
+    Расчеты стоимости автомобилей с учетом даты курса валют.
+
+    Скрапнутый расчет автомобиля хранится, пока на сайте действует та же
+    дата курса (``currency_date``) и не изменилась цена автомобиля. Для
+    каждой даты курса хранится таблица курсов, а по накопленным расчетам
+    подбирается сетка сборов: для каждой статьи разбивки в пределах года
+    выпуска, объема и мощности двигателя (:func:`schedule_key`) значение
+    либо постоянно, либо пропорционально цене. Сетка применяется только
+    после ``min_samples`` согласованных расчетов и только если итог на всех
+    образцах равен сумме статей (с ценой или без). Локальные расчеты
+    выборочно сверяются со скрапнутыми, при расхождении образцы сетки
+    сбрасываются.
+
+    :param rate_ttl: Сколько секунд дата курса считается действующей без новых расчетов.
+    :type rate_ttl: int
+    :param min_samples: Минимум расчетов сетки для локального расчета.
+    :type min_samples: int
+    :param max_samples: Максимум хранимых расчетов на сетку.
+    :type max_samples: int
+    """
+
+    def __init__(self, rate_ttl: int = 6 * 3600, min_samples: int = 3, max_samples: int = 50):
+        self.rate_ttl = rate_ttl
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self._dates = {}
+        self._results = {}
+        self._current = None
+        self._lock = Lock()
+        self._stats = {CACHED: 0, COMPUTED: 0, SCRAPED: 0, "verified": 0, "mismatches": 0}
+
+    def current_date(self) -> str | None:
+        """
+        Дата курса последнего скрапнутого расчета, если она еще действует.
+
+        :rtype: str
+        """
+        with self._lock:
+            return self._current_date()
+
+    def _current_date(self) -> str | None:
+        if self._current is None or time() - self._dates[self._current]["seen_at"] > self.rate_ttl:
+            return None
+        return self._current
+
+    def learn(self, id: str, inputs: Dict[str, int], calculation: Dict) -> None:
+        """
+        Учитывает скрапнутый расчет автомобиля.
+
+        :param id: Идентификатор автомобиля.
+        :type id: str
+        :param inputs: Цена, год выпуска и двигатель из индекса объявлений (могут отсутствовать).
+        :type inputs: dict
+        :param calculation: Результат ``scrape_price_calculation``.
+        :type calculation: dict
+        """
+        date = calculation.get("currency_date")
+        if not date:
+            return
+        price, key = inputs.get("price"), schedule_key(inputs)
+        with self._lock:
+            self._stats[SCRAPED] += 1
+            entry = self._dates.setdefault(date, {"samples": {}})
+            entry["rates"] = calculation.get("currency_rates", {})
+            entry["seen_at"] = time()
+            if self._current != date:
+                logger.info(f"Currency date changed to {date}")
+                self._current = date
+                # Расчеты по прежней дате больше не действуют
+                self._results = {key: value for key, value in self._results.items() if value[1] == date}
+                self._dates = {date: entry}
+            self._results[str(id)] = (price, date, calculation)
+            if price and key:
+                samples = entry["samples"].setdefault(key, [])
+                samples.append((price, calculation))
+                del samples[:-self.max_samples]
+
+    def lookup(self, id: str, inputs: Dict[str, int]) -> Tuple[Dict | None, str | None]:
+        """
+        Расчет без загрузки страницы: сохраненный или вычисленный по сетке сборов.
+
+        :param id: Идентификатор автомобиля.
+        :type id: str
+        :param inputs: Цена, год выпуска и двигатель из индекса объявлений.
+        :type inputs: dict
+        :return: Расчет и его источник (CACHED или COMPUTED) либо (None, None).
+        :rtype: tuple
+        """
+        with self._lock:
+            date = self._current_date()
+            if date is None:
+                return None, None
+            result = self._results.get(str(id))
+            if result and result[1] == date and (inputs.get("price") is None or result[0] == inputs.get("price")):
+                self._stats[CACHED] += 1
+                return result[2], CACHED
+            calculation = self._compute(date, inputs)
+            if calculation is not None:
+                self._stats[COMPUTED] += 1
+                return calculation, COMPUTED
+        return None, None
+
+    def _compute(self, date: str, inputs: Dict[str, int]) -> Dict | None:
+        price, key = inputs.get("price"), schedule_key(inputs)
+        if not price or not key:
+            return None
+        entry = self._dates[date]
+        samples = entry["samples"].get(key, [])
+        if len(samples) < self.min_samples:
+            return None
+
+        names = list(samples[-1][1].get("breakdown", {}))
+        parsed = []
+        for sample_price, calculation in samples:
+            breakdown = calculation.get("breakdown", {})
+            if list(breakdown) != names:
+                return None
+            values = [parse_amount(breakdown[name]) for name in names]
+            total = parse_amount(calculation.get("total_price"))
+            if total is None or None in values:
+                return None
+            parsed.append((sample_price, values, total))
+
+        breakdown = []
+        for index in range(len(names)):
+            values = [(sample_price, sample_values[index]) for sample_price, sample_values, _ in parsed]
+            ratio = values[0][1] / values[0][0]
+            if all(_close(value, values[0][1]) for _, value in values):
+                breakdown.append(values[0][1])
+            elif all(_close(value, sample_price * ratio) for sample_price, value in values):
+                breakdown.append(round(price * ratio))
+            else:
+                return None
+
+        if all(_close(total, sum(values)) for _, values, total in parsed):
+            total = sum(breakdown)
+        elif all(_close(total, sample_price + sum(values)) for sample_price, values, total in parsed):
+            total = price + sum(breakdown)
+        else:
+            return None
+
+        # Постоянные статьи переносятся из образца как есть
+        template = samples[-1][1]
+        return {
+            "currency_rates": dict(entry["rates"]),
+            "currency_date": date,
+            "total_price": format_like(template.get("total_price"), total),
+            "breakdown": {
+                name: template["breakdown"][name] if value == parsed[-1][1][index]
+                else format_like(template["breakdown"][name], value)
+                for index, (name, value) in enumerate(zip(names, breakdown))
+            }
+        }
+
+    def verify(self, inputs: Dict[str, int], computed: Dict, scraped: Dict) -> bool:
+        """
+        Сверяет локальный расчет со скрапнутым. При расхождении образцы
+        сетки сбрасываются, и она подбирается заново.
+
+        :rtype: bool
+        """
+        expected = parse_amount(scraped.get("total_price"))
+        actual = parse_amount(computed.get("total_price"))
+        matches = (
+            expected is not None and actual is not None and _close(expected, actual)
+            and computed.get("currency_date") == scraped.get("currency_date")
+        )
+        with self._lock:
+            self._stats["verified"] += 1
+            if not matches:
+                self._stats["mismatches"] += 1
+                entry = self._dates.get(computed.get("currency_date"))
+                if entry:
+                    entry["samples"].pop(schedule_key(inputs), None)
+        if not matches:
+            logger.warning(f"Computed price {actual} differs from scraped {expected}, fee schedule reset")
+        return matches
+
+    def stats(self) -> Dict:
+        with self._lock:
+            date = self._current_date()
+            return {
+                "currency_date": date,
+                "rates": dict(self._dates[date]["rates"]) if date else {},
+                "cars": len(self._results),
+                "years_with_schedule": sorted({
+                    key[0] for key, samples in self._dates[date]["samples"].items()
+                    if len(samples) >= self.min_samples
+                }) if date else [],
+                **self._stats
+            }
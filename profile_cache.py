@@ -0,0 +1,161 @@
+import logging
+import os
+import shutil
+import tempfile
+from threading import Lock
+from time import time
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Подкаталоги профиля Chrome, которые переносятся между драйверами.
+# Копируются только кэши статики (JS/CSS/картинки и байткод V8),
+# куки и прочее состояние сессии не разделяются.
+CACHE_SUBDIRS = (
+    os.path.join("Default", "Cache"),
+    os.path.join("Default", "Code Cache"),
+)
+
+STAMP_FILE = ".asapi_profile_stamp"
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class ProfileCache:
+    """
+    Общий шаблон профиля Chrome с дисковым HTTP-кэшем.
+
+    Каждый драйвер получает собственный временный ``--user-data-dir``,
+    в который копируются кэши из шаблона. Шаблон заполняется кэшем
+    первого завершенного драйвера и дальше используется только на чтение,
+    пока не устареет (``max_age``). Размер кэша ограничен ``max_size_mb``.
+
+    Копирование выполняется вне блокировки: под ней только проверяется
+    готовность шаблона и учитываются читающие его драйверы. Устаревший
+    шаблон удаляется, когда читающих не осталось, новый шаблон собирается
+    одним драйвером рядом и подменяется под блокировкой.
+
+    :param template_dir: Каталог шаблона профиля.
+    :type template_dir: str
+    :param max_size_mb: Максимальный размер кэша в мегабайтах.
+    :type max_size_mb: int
+    :param max_age: Время жизни шаблона в секундах.
+    :type max_age: int
+    """
+
+    def __init__(self, template_dir: str, max_size_mb: int = 200, max_age: int = 86400):
+        self.template_dir = template_dir
+        self.max_size = max_size_mb * 1024 * 1024
+        self.max_age = max_age
+        self._lock = Lock()
+        self._readers = 0
+        self._seeding = False
+
+    def acquire(self) -> str:
+        """
+        Создает временный профиль для нового драйвера на основе шаблона.
+
+        :return: Путь к каталогу профиля.
+        :rtype: str
+        """
+        profile_dir = tempfile.mkdtemp(prefix="asapi-chrome-")
+        with self._lock:
+            self._invalidate_if_expired()
+            if not self._is_ready():
+                return profile_dir
+            # Пока шаблон читается, он не удаляется и не подменяется
+            self._readers += 1
+        try:
+            for subdir in CACHE_SUBDIRS:
+                src = os.path.join(self.template_dir, subdir)
+                if os.path.isdir(src):
+                    shutil.copytree(src, os.path.join(profile_dir, subdir), dirs_exist_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to copy profile template: {str(e)}")
+        finally:
+            with self._lock:
+                self._readers -= 1
+        return profile_dir
+
+    def release(self, profile_dir: str) -> None:
+        """
+        Удаляет временный профиль драйвера. Если шаблона еще нет,
+        кэш профиля сохраняется как новый шаблон.
+
+        :param profile_dir: Путь к каталогу профиля.
+        :type profile_dir: str
+        """
+        try:
+            with self._lock:
+                self._invalidate_if_expired()
+                if self._is_ready() or self._seeding:
+                    return
+                self._seeding = True
+            try:
+                self._seed(profile_dir)
+            finally:
+                with self._lock:
+                    self._seeding = False
+        except OSError as e:
+            logger.warning(f"Failed to seed profile template: {str(e)}")
+        finally:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+    def chrome_arguments(self, profile_dir: str) -> List[str]:
+        """
+        Аргументы командной строки Chrome для профиля.
+
+        :param profile_dir: Путь к каталогу профиля.
+        :type profile_dir: str
+        :return: Список аргументов.
+        :rtype: list
+        """
+        return [
+            f"--user-data-dir={profile_dir}",
+            f"--disk-cache-size={self.max_size}",
+        ]
+
+    def _is_ready(self) -> bool:
+        return os.path.isfile(os.path.join(self.template_dir, STAMP_FILE))
+
+    def _invalidate_if_expired(self) -> None:
+        if self._readers:
+            return
+        stamp = os.path.join(self.template_dir, STAMP_FILE)
+        try:
+            age = time() - os.path.getmtime(stamp)
+        except OSError:
+            return
+        if age > self.max_age:
+            logger.info(f"Profile template expired ({int(age)}s), dropping")
+            shutil.rmtree(self.template_dir, ignore_errors=True)
+
+    def _seed(self, profile_dir: str) -> None:
+        size = sum(_dir_size(os.path.join(profile_dir, subdir)) for subdir in CACHE_SUBDIRS)
+        if size == 0 or size > self.max_size:
+            return
+
+        # Собираем шаблон рядом и подменяем атомарно
+        staging = self.template_dir.rstrip(os.sep) + ".staging"
+        shutil.rmtree(staging, ignore_errors=True)
+        for subdir in CACHE_SUBDIRS:
+            src = os.path.join(profile_dir, subdir)
+            if os.path.isdir(src):
+                shutil.copytree(src, os.path.join(staging, subdir))
+        with open(os.path.join(staging, STAMP_FILE), "w") as f:
+            f.write(str(time()))
+
+        # Пока шаблон не готов, читающих его драйверов нет
+        with self._lock:
+            shutil.rmtree(self.template_dir, ignore_errors=True)
+            os.replace(staging, self.template_dir)
+        logger.info(f"Profile template seeded ({size // 1024} KiB)")
@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+import random
+import re
+from contextlib import contextmanager
+from threading import local
+from time import perf_counter, strftime
+from typing import Dict, Iterator, List
+
+import scraper_scripts
+
+logger = logging.getLogger(__name__)
+
+# Имена JS-скриптов по их тексту, чтобы различать команды executeScript
+SCRIPT_NAMES = {value: name for name, value in vars(scraper_scripts).items() if name.endswith("_JS")}
+
+# Команды WebDriver, выполняющие скрипт из параметра "script"
+SCRIPT_COMMANDS = ("w3cExecuteScript", "w3cExecuteScriptAsync")
+
+# Категории трассировки Chrome для профилей с трассой
+TRACE_CATEGORIES = "devtools.timeline,v8.execute,blink.user_timing,loading,netlog"
+
+_local = local()
+
+
+def current_profile():
+    """
+    Профиль, активный в текущем потоке.
+
+    :rtype: Profile
+    """
+    return getattr(_local, "profile", None)
+
+
+class Profile:
+    """
+    Профиль одного запроса: время каждой команды WebDriver,
+    метрики Chrome Performance и, при необходимости, трасса.
+
+    :param name: Имя профиля (путь запроса).
+    :type name: str
+    :param trace: Записывать трассу Chrome.
+    :type trace: bool
+    """
+
+    def __init__(self, name: str, trace: bool = False):
+        self.name = name
+        self.trace = trace
+        self.commands = []
+        self.metrics = {}
+        self.trace_events = []
+        self.started = perf_counter()
+        self.finished = None
+
+    def record(self, command: str, params: Dict, seconds: float) -> None:
+        label = command
+        if command in SCRIPT_COMMANDS:
+            label = SCRIPT_NAMES.get(params.get("script"), "anonymous_script")
+        self.commands.append((label, seconds))
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        Суммарное время и число вызовов по командам и скриптам.
+
+        :rtype: dict
+        """
+        result = {}
+        for label, seconds in self.commands:
+            entry = result.setdefault(label, {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] = round(entry["total_ms"] + seconds * 1000, 2)
+        return result
+
+    def server_timing(self) -> str:
+        """
+        Значение заголовка ``Server-Timing``.
+
+        :rtype: str
+        """
+        total = (self.finished or perf_counter()) - self.started
+        parts = [f"total;dur={total * 1000:.1f}"]
+        for label, entry in sorted(self.summary().items(), key=lambda item: -item[1]["total_ms"]):
+            parts.append(f'{re.sub(r"[^A-Za-z0-9_-]", "_", label)};dur={entry["total_ms"]:.1f};desc="x{entry["count"]}"')
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "total_ms": round(((self.finished or perf_counter()) - self.started) * 1000, 2),
+            "summary": self.summary(),
+            "commands": [{"command": label, "ms": round(seconds * 1000, 2)} for label, seconds in self.commands],
+            "performance_metrics": self.metrics
+        }
+
+
+class Profiler:
+    """
+    Включает профилирование запросов по заголовку или выборочно
+    и сохраняет профили в каталог.
+
+    :param directory: Каталог профилей, None - не сохранять.
+    :type directory: str
+    :param sample_rate: Доля запросов, профилируемых без заголовка.
+    :type sample_rate: float
+    :param token: Значение заголовка, включающее профилирование, None - только выборка.
+    :type token: str
+    :param trace: Разрешить запись трассы Chrome (драйверы создаются с журналом производительности).
+    :type trace: bool
+    """
+
+    def __init__(self, directory: str | None = None, sample_rate: float = 0.0,
+                 token: str | None = None, trace: bool = False):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token
+        self.trace = trace
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def requested(self, header: str | None) -> bool:
+        return bool(self.token) and header == self.token
+
+    def start(self, name: str, header: str | None = None) -> Profile | None:
+        """
+        Создает профиль для запроса, если он запрошен заголовком или попал в выборку.
+
+        :param name: Путь запроса.
+        :type name: str
+        :param header: Значение заголовка ``X-Profile``.
+        :type header: str
+        :rtype: Profile
+        """
+        if self.requested(header):
+            return Profile(name, trace=self.trace)
+        if self.sample_rate and random.random() < self.sample_rate:
+            return Profile(name)
+        return None
+
+    @contextmanager
+    def activate(self, profile: Profile) -> Iterator[Profile]:
+        """
+        Делает профиль активным в текущем потоке на время блока ``with``
+        и сохраняет его по завершении.
+        """
+        _local.profile = profile
+        try:
+            yield profile
+        finally:
+            _local.profile = None
+            profile.finished = perf_counter()
+            self.save(profile)
+
+    def chrome_options(self, options) -> None:
+        """
+        Включает журнал производительности chromedriver с трассой,
+        если запись трассы разрешена.
+
+        :param options: Настройки Chrome.
+        :type options: selenium.webdriver.chrome.options.Options
+        """
+        if not self.trace:
+            return
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        options.add_experimental_option("perfLoggingPrefs", {
+            "enableNetwork": False,
+            "enablePage": False,
+            "traceCategories": TRACE_CATEGORIES
+        })
+
+    def start_driver(self, driver, profile: Profile) -> None:
+        """
+        Включает сбор метрик Chrome перед скрапингом профилируемого запроса.
+        """
+        try:
+            driver.execute("executeCdpCommand", {"cmd": "Performance.enable", "params": {}})
+            if profile.trace:
+                driver.get_log("performance")  # отбрасываем записи предыдущих запросов
+        except Exception as e:
+            logger.warning(f"Failed to start Chrome profiling: {str(e)}")
+
+    def finish_driver(self, driver, profile: Profile) -> None:
+        """
+        Забирает метрики Chrome и трассу после скрапинга.
+        """
+        try:
+            result = driver.execute("executeCdpCommand", {"cmd": "Performance.getMetrics", "params": {}})
+            profile.metrics = {metric["name"]: metric["value"] for metric in result["value"]["metrics"]}
+            driver.execute("executeCdpCommand", {"cmd": "Performance.disable", "params": {}})
+            if profile.trace:
+                profile.trace_events.extend(self._trace_events(driver.get_log("performance")))
+        except Exception as e:
+            logger.warning(f"Failed to collect Chrome profile: {str(e)}")
+
+    @staticmethod
+    def _trace_events(entries: List[Dict]) -> List[Dict]:
+        events = []
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            if message["method"] == "Tracing.dataCollected":
+                events.append(message["params"])
+        return events
+
+    def save(self, profile: Profile) -> None:
+        if not self.directory:
+            return
+        slug = re.sub(r"[^A-Za-z0-9_-]+", "_", profile.name).strip("_") or "root"
+        path = os.path.join(self.directory, f"{strftime('%Y%m%d-%H%M%S')}-{random.randrange(16 ** 6):06x}-{slug}")
+        try:
+            with open(f"{path}.json", "w", encoding="utf-8") as f:
+                json.dump(profile.to_dict(), f, ensure_ascii=False, indent=2)
+            if profile.trace_events:
+                with open(f"{path}.trace.json", "w", encoding="utf-8") as f:
+                    json.dump({"traceEvents": profile.trace_events}, f)
+        except OSError as e:
+            logger.warning(f"Failed to save profile: {str(e)}")
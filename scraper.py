@@ -1,67 +1,113 @@
-from selenium.webdriver.remote.webdriver import WebDriver
-from selenium.common.exceptions import JavascriptException, TimeoutException
-from typing import Dict, List
+from selenium.common.exceptions import JavascriptException, NoSuchElementException, TimeoutException
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+from scraper_scripts import (
+    APPLY_FILTER_JS,
+    APPLY_SORTING_JS,
+    BRAND_MODELS_JS,
+    CAR_DETAILS_JS,
+    INITIAL_FILTERS_JS,
+    LOAD_SNAPSHOT_JS,
+    MODEL_GENS_JS,
+    NAVIGATION_STATUS_JS,
+    PAGES_NUMS_JS,
+    PARSE_CAR_LIST_JS,
+    PRICE_CALCULATION_JS,
+    PUSH_PAGE_NEXT_JS,
+    RESET_FILTERS_JS,
+    SEARCHPAGE_STATE_JS,
+    SUBMIT_SEARCH_JS,
+    WAIT_CARPAGE_JS,
+    WAIT_SEARCHPAGE_JS,
+)
+from failures import TRANSIENT, UPSTREAM_ERROR, UpstreamServerError, classify_failure
 import logging
 
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+
 logger = logging.getLogger(__name__)
 
+FILTERS_MAP = {
+    'brand': 'brand',
+    'model': 'model',
+    'gen': 'gen',
+    'transmission': 'transmission',
+    'fuel': 'fuel',
+    'color': 'color',
+    'mileage_from': 'mileage_from',
+    'mileage_to': 'mileage_to',
+    'year_release_from': 'year_release_from',
+    'year_release_to': 'year_release_to',
+    'price_from': 'price_from',
+    'price_to': 'price_to'
+}
+
 class Scraper:
 
-    def __init__(self, url: str, driver: WebDriver):
+    def __init__(self, url: str, driver: "WebDriver", snapshot_store=None, health=None,
+                 reuse_searchpage: bool = False, page_timeout: float = 30, filter_delay_ms: int = 300):
         self.driver = driver
         self.url = url
-        self._filters_map = {
-            'brand': 'brand',
-            'model': 'model',
-            'gen': 'gen',
-            'transmission': 'transmission',
-            'fuel': 'fuel',
-            'color': 'color',
-            'mileage_from': 'mileage_from',
-            'mileage_to': 'mileage_to',
-            'year_release_from': 'year_release_from',
-            'year_release_to': 'year_release_to',
-            'price_from': 'price_from',
-            'price_to': 'price_to'
-        }
+        self.snapshot_store = snapshot_store
+        self.health = health
+        self.reuse_searchpage = reuse_searchpage
+        self.page_timeout_ms = int(page_timeout * 1000)
+        self.filter_delay_ms = filter_delay_ms
+        self._filters_map = FILTERS_MAP
+
+    def _load_page(self, url: str, wait: Callable[[], None]) -> None:
+        # Время и результат загрузки учитываются в состоянии сайта,
+        # сбои браузера на состояние сайта не влияют
+        started = perf_counter()
+        try:
+            self.driver.get(url)
+            status = self.driver.execute_script(NAVIGATION_STATUS_JS)
+            if status >= 500:
+                raise UpstreamServerError(url, status)
+            wait()
+        except Exception as e:
+            if self.health and classify_failure(e) in (TRANSIENT, UPSTREAM_ERROR):
+                self.health.record(perf_counter() - started, ok=False)
+            raise
+        if self.health:
+            self.health.record(perf_counter() - started, ok=True)
 
     def _load_searchpage(self, url: str) -> None:
-        self.driver.get(url)
-        self._wait_for_loading_searchpage()
+        self._load_page(url, self._wait_for_loading_searchpage)
+
+    def _open_searchpage(self, url: str) -> None:
+        # Если драйвер уже на странице поиска, фильтры сбрасываются
+        # элементами страницы без навигации; при непригодном состоянии
+        # страницы или неудачном сбросе она загружается заново
+        if self.reuse_searchpage:
+            try:
+                if (self.driver.execute_script(SEARCHPAGE_STATE_JS, url)
+                        and self.driver.execute_script(
+                            RESET_FILTERS_JS, list(self._filters_map.values()), self.filter_delay_ms)):
+                    return
+            except JavascriptException as e:
+                logger.warning(f"Search page reset failed, reloading: {str(e)}")
+        self._load_searchpage(url)
 
     def _load_carpage(self, url: str) -> None:
-        self.driver.get(url)
-        self._wait_for_loading_carpage()
+        self._load_page(url, self._wait_for_loading_carpage)
+
+    def _capture_snapshot(self, page: str, args: list) -> None:
+        if not self.snapshot_store:
+            return
+        try:
+            self.snapshot_store.save(self.url, page, args, self.driver.page_source)
+        except Exception as e:
+            logger.warning(f"Snapshot capture failed: {str(e)}")
+
+    def load_snapshot(self, html: str) -> None:
+        # Подменяем документ без выполнения скриптов страницы
+        self.driver.execute_script(LOAD_SNAPSHOT_JS, html)
 
     def _wait_for_loading_searchpage(self) -> None:
         try:
-            result = self.driver.execute_async_script("""
-                const callback = arguments[arguments.length - 1];
-                const loader = document.querySelector('div.big_preloader');
-                
-                if (!loader || loader.style.opacity === '0') {
-                    callback(true);
-                    return;
-                }
-                
-                const observer = new MutationObserver(function(mutations) {
-                    if (loader.style.opacity === '0') {
-                        observer.disconnect();
-                        callback(true);
-                    }
-                });
-                
-                observer.observe(loader, {
-                    attributes: true,
-                    attributeFilter: ['style']
-                });
-                
-                // Таймаут на случай если изменения не произойдут
-                setTimeout(() => {
-                    observer.disconnect();
-                    callback(false);
-                }, 30000);
-            """)
+            result = self.driver.execute_async_script(WAIT_SEARCHPAGE_JS, self.page_timeout_ms)
             
             if not result:
                 raise TimeoutException("Loader did not disappear")
@@ -70,34 +116,7 @@ class Scraper:
         
     def _wait_for_loading_carpage(self) -> None:
         try:
-            result = self.driver.execute_async_script("""
-                const callback = arguments[arguments.length - 1];
-                const loader = document.querySelector('div.big_preloader');
-                
-                // Если прелоадер уже скрыт или отсутствует
-                if (!loader || loader.classList.contains('hide')) {
-                    callback(true);
-                    return;
-                }
-                
-                const observer = new MutationObserver(function(mutations) {
-                    if (loader.classList.contains('hide')) {
-                        observer.disconnect();
-                        callback(true);
-                    }
-                });
-                
-                observer.observe(loader, {
-                    attributes: true,
-                    attributeFilter: ['class']
-                });
-                
-                // Таймаут на случай если изменения не произойдут
-                setTimeout(() => {
-                    observer.disconnect();
-                    callback(false);
-                }, 30000);
-            """)
+            result = self.driver.execute_async_script(WAIT_CARPAGE_JS, self.page_timeout_ms)
             if not result:
                 raise TimeoutException("Loader did not disappear")
         except JavascriptException:
@@ -106,430 +125,47 @@ class Scraper:
     def _apply_filters(self, filters: Dict[str, str]) -> None:
         for key, value in filters.items():
             if value and key in self._filters_map:
-                field_name = self._filters_map[key]
-                self.driver.execute_script(f"""
-                    const filter = document.querySelector(
-                        'div.select__field[data-field_name="{field_name}"]'
-                    );
-                    if (filter) {{
-                        filter.click();
-                        const option = filter.querySelector(
-                            'div.select__field__variant[data-label="{value}"]'
-                        );
-                        if (option) {{
-                            option.click();
-                            return new Promise(resolve => setTimeout(resolve, 300));
-                        }}
-                    }}
-                """)
+                found = self.driver.execute_script(APPLY_FILTER_JS, self._filters_map[key], value, self.filter_delay_ms)
+                if not found:
+                    raise NoSuchElementException(f"Filter value not found: {key}={value}")
 
     def _submit_search(self) -> None:
-        self.driver.execute_script("""
-            const btn = document.querySelector(
-                'div.search_car__block__settings__button[data-button_name="show_result"]'
-            );
-            if (btn) btn.click();
-            else throw new Error('Search button not found');
-        """)
+        self.driver.execute_script(SUBMIT_SEARCH_JS)
 
     def _parse_car_list(self) -> List[Dict]:
         try:
-            return self.driver.execute_script("""
-                console.group('=== Парсинг автомобилей ===');
-                const cars = [];
-                const metaKeys = {
-                    'Год:': 'year',
-                    'Топливо:': 'fuel',
-                    'Пробег:': 'mileage',
-                    'Цвет:': 'color'
-                };
-                
-                const carElements = document.querySelectorAll('div.car__wrapper');
-                console.log(`Найдено элементов автомобилей: ${carElements.length}`);
-                
-                carElements.forEach((car, index) => {
-                    console.group(`Автомобиль #${index}`);
-                    const data = {};
-                    
-                    try {
-                        // 2.1. Базовые данные
-                        data.id = car.getAttribute('data-car_id') || null;
-                        console.log(`ID: ${data.id}`);
-                        
-                        data.title = car.querySelector('h3.car__content__title')?.textContent.trim() || null;
-                        console.log(`Название: ${data.title}`);
-                        
-                        data.image = car.querySelector('div.car__image img')?.src || null;
-                        console.log(`Изображение: ${data.image ? 'есть' : 'нет'}`);
-                        
-                        // 2.2. Парсинг цены
-                        const priceDigits = car.querySelector('span.car__price__value_digits');
-                        const priceText = car.querySelector('span.car__price__value_text');
-                        data.price = priceDigits?.textContent.trim() || priceText?.textContent.trim() || null;
-                        console.log(`Цена: ${data.price}`);
-                        
-                        // 2.3. Парсинг мета-данных
-                        console.group('Мета-данные:');
-                        const metaItems = car.querySelectorAll('div.car__content__meta__item');
-                        console.log(`Найдено мета-элементов: ${metaItems.length}`);
-                        
-                        metaItems.forEach(item => {
-                            const label = item.querySelector('div.car__content__meta__item__label')?.textContent.trim();
-                            const value = item.querySelector('div.car__content__meta__item__value')?.textContent.trim();
-                            
-                            if (label && metaKeys[label]) {
-                                data[metaKeys[label]] = value;
-                                console.log(`${label}: ${value}`);
-                            }
-                        });
-                        console.groupEnd();
-                        
-                        // 2.4. Проверка полноты данных
-                        if (!data.id) {
-                            console.warn('Автомобиль пропущен - отсутствует ID');
-                            console.groupEnd();
-                            return;
-                        }
-                        
-                        cars.push(data);
-                        console.log('Автомобиль успешно добавлен');
-                    } catch (error) {
-                        console.error(`Ошибка при парсинге: ${error}`);
-                        console.log('Текущие данные:', JSON.stringify(data, null, 2));
-                    }
-                    
-                    console.groupEnd();
-                });
-                
-                console.log(`Успешно распарсено автомобилей: ${cars.length}`);
-                console.groupEnd();
-                return cars;
-            """)
+            return self.driver.execute_script(PARSE_CAR_LIST_JS)
         except Exception as e:
             return []
 
-    def _get_initial_filters(self) -> Dict:
-        return self.driver.execute_script("""
-            const result = {
-                brands: [],
-                transmission: [],
-                fuel: [],
-                color: [],
-                mileage_from: [],
-                mileage_to: [],
-                year_release_from: [],
-                year_release_to: [],
-                price_from: [],
-                price_to: [],
-                
-            };
-            
-            // Получаем бренды
-            const brandFilter = document.querySelector('div.select__field[data-field_name="brand"]');
-            if (brandFilter) {
-                result.brands = Array.from(brandFilter.querySelectorAll('div.select__field__variant'))
-                    .map(el => el.dataset.label)
-                    .filter(label => label);
-            }
-            
-            // Получаем остальные фильтры
-            ['transmission',
-            'fuel',
-            'color',
-            'mileage_from',
-            'mileage_to',
-            'year_release_from', 
-            'year_release_to', 
-            'price_from', 
-            'price_to'].forEach(name => {
-                const filter = document.querySelector(`div.select__field[data-field_name="${name}"]`);
-                if (filter) {
-                    result[name] = Array.from(filter.querySelectorAll('div.select__field__variant'))
-                        .map(el => el.dataset.label)
-                        .filter(label => label);
-                }
-            });
-            
-            return result;
-        """)
+    def _get_initial_filters(self, with_values: bool = False) -> Dict:
+        return self.driver.execute_script(INITIAL_FILTERS_JS, with_values)
 
     def _get_brand_models(self, brand: str) -> List[str]:
-        return self.driver.execute_script("""
-            const brandFilter = document.querySelector('div.select__field[data-field_name="brand"]');
-            if (!brandFilter) return [];
-            
-            const brandOption = brandFilter.querySelector(`div.select__field__variant[data-label="${arguments[0]}"]`);
-            if (!brandOption) {
-                brandFilter.click();
-                return [];
-            }
-            
-            brandOption.click();
-            
-            const modelFilter = document.querySelector('div.select__field[data-field_name="model"]');
-            if (!modelFilter) {
-                brandOption.click();
-                return [];
-            }
-            
-            modelFilter.click();
-            await new Promise(resolve => setTimeout(resolve, 300));
-            
-            const models = Array.from(modelFilter.querySelectorAll('div.select__field__variant'))
-                .map(el => el.dataset.label)
-                .filter(label => label);
-            
-            return models;
-        """, brand)
+        return self.driver.execute_script(BRAND_MODELS_JS, brand, self.filter_delay_ms)
 
     def _get_model_gens(self, brand: str, model: str) -> List[str]:
-        return self.driver.execute_script("""
+        return self.driver.execute_script(MODEL_GENS_JS, brand, model, self.filter_delay_ms)
 
-            const brandFilter = document.querySelector('div.select__field[data-field_name="brand"]');
-            if (!brandFilter) return [];
-            
-            const brandOption = brandFilter.querySelector(`div.select__field__variant[data-label="${arguments[0]}"]`);
-            if (!brandOption) {
-                brandFilter.click();
-                return [];
-            }
-            
-            brandOption.click();
-            
-            const modelFilter = document.querySelector('div.select__field[data-field_name="model"]');
-            if (!modelFilter) {
-                brandOption.click();
-                return [];
-            }
-            
-            modelFilter.click();
-            await new Promise(resolve => setTimeout(resolve, 300));
-            
-            const modelOption = modelFilter.querySelector(`div.select__field__variant[data-label="${arguments[1]}"]`);
-            if (!modelOption) {
-                modelFilter.click();
-                return [];
-            }
-            
-            modelOption.click();
-            
-            const genFilter = document.querySelector('div.select__field[data-field_name="gen"]');
-            if (!genFilter) {
-                modelOption.click();
-                return [];
-            }
-            
-            genFilter.click();
-            await new Promise(resolve => setTimeout(resolve, 300));
-            
-            const gens = Array.from(genFilter.querySelectorAll('div.select__field__variant'))
-                .map(el => el.dataset.label)
-                .filter(label => label);
-            
-            return gens;
-        """, brand, model)
-
-    def _get_car_details(self, id: str) -> Dict:
-        return self.driver.execute_script("""
-            const carId = arguments[0];
-            const result = {
-                id: carId,
-                photos: [],
-                title: null,
-                price: null,
-                base_parameters: {},
-                tech_parameters: {},
-                car_check_parameters: {},
-                car_check_inspections: {},
-                car_body_options: {}
-            };
-        const parseInspections = () => {
-            const inspectionsData = [];
-            const inspectionSections = document.querySelectorAll('details.car_body__car_check__inspections');
-            
-            inspectionSections.forEach(section => {
-                const sectionTitle = section.querySelector('summary')?.textContent.trim() || 'Проверка';
-                const tables = section.querySelectorAll('table');
-                
-                tables.forEach(table => {
-                    const rows = table.querySelectorAll('tbody tr');
-                    
-                    rows.forEach(row => {
-                        const cells = row.querySelectorAll('td');
-                        if (cells.length >= 2) {
-                            inspectionsData.push({
-                                'section': sectionTitle,
-                                'parameter': cells[0].textContent.trim(),
-                                'value': cells[1].textContent.trim()
-                            });
-                        }
-                    });
-                });
-            });
-            
-            return inspectionsData;
-        };
-
-        try {
-            result.title = document.querySelector('div.car_body__right_part__car_title h2')?.textContent.trim() || null;
-            result.price = document.querySelector('div.car_body__right_part__row__price__digits')?.textContent.trim() || null;
-            const photoElements = document.querySelectorAll('div.car_body__left_part__car_gallery__image_wrapper img');
-            result.photos = Array.from(photoElements).map(img => img.getAttribute('data-big_pict') || img.src).filter(Boolean);
-            const baseParamElements = document.querySelectorAll('div.car_body__right_part__base_parameter');
-            baseParamElements.forEach(el => {
-                const label = el.querySelector('div.car_body__right_part__base_parameter__label')?.textContent.trim();
-                const value = el.querySelector('div.car_body__right_part__base_parameter__value')?.textContent.trim();
-                if (label && value) {
-                    result.base_parameters[label] = value;
-                }
-            });
-            const techParamElements = document.querySelectorAll('div.car_body__tech_parameter');
-            techParamElements.forEach(el => {
-                const name = el.getAttribute('data-parameter_name');
-                const value = el.querySelectorAll('span')[1]?.textContent.trim();
-                if (name && value) {
-                    result.tech_parameters[name] = value;
-                }
-            });
-            const checkParamElements = document.querySelectorAll('div.car_body__car_check_parameter');
-            checkParamElements.forEach(el => {
-                const name = el.getAttribute('data-parameter_name');
-                const value = el.querySelectorAll('span')[1]?.textContent.trim();
-                if (name && value) {
-                    result.car_check_parameters[name] = value;
-                }
-            });
-            result.inspections = parseInspections();
-            const optionElements = document.querySelectorAll('details.car_body__options');
-            optionElements.forEach(details => {
-                const summary = details.querySelector('summary.light')?.textContent.trim();
-                if (summary) {
-                    const options = Array.from(details.querySelectorAll('div.car_body__option.exist span'))
-                        .map(span => span.textContent.trim())
-                        .filter(Boolean);
-                    result.car_body_options[summary] = options;
-                }
-            });
-
-        } catch (error) {
-            console.error('Error getting car details:', error);
-            throw error;
-        }
-
-        return result;
-        """, id)
+    def _get_car_details(self, id: str, fields: List[str] | None = None,
+                         limits: Dict[str, int] | None = None) -> Dict:
+        return self.driver.execute_script(CAR_DETAILS_JS, id, fields, limits or {})
 
     def _get_pages_nums(self) -> Dict[str, List[str]]:
-        return self.driver.execute_script("""
-            const result = {
-                pages_nums: [],
-                cur_page_num: null
-            };
-            
-            // Находим все элементы с номерами страниц
-            const pageElements = document.querySelectorAll(
-                'div.search_car__block__view_settings__pages__page_num:not(.dots)'
-            );
-            
-            // Парсим номера страниц
-            pageElements.forEach(element => {
-                const pageNum = element.textContent.trim();
-                result.pages_nums.push(pageNum);
-                
-                // Проверяем активна ли страница
-                if (element.classList.contains('active')) {
-                    result.cur_page_num = pageNum;
-                }
-            });
-            
-            return result;
-        """)
+        return self.driver.execute_script(PAGES_NUMS_JS)
 
     def _push_page_next(self) -> None:
-        self.driver.execute_script("""
-            const btn = document.querySelector(
-                'div.search_car__block__view_settings__pages_nav[data-direction="right"]'
-            );
-            if (btn) btn.click();
-            else throw new Error('Next page button not found');
-        """)
+        self.driver.execute_script(PUSH_PAGE_NEXT_JS)
 
     def _apply_sorting(self, sort_value: str) -> None:
-        self.driver.execute_script("""
-            const sortValue = arguments[0];
-            const sortblock = document.querySelector('div.search_car__block__view_settings__sort__options');
-            
-            const dropdown = sortblock.querySelector('div.select__field__variants.js__select__field__variants');
-            
-            if (!dropdown) {
-                return {success: false, error: 'Выпадающий список сортировки не найден'};
-            }
-            dropdown.click();
-                                   
-            // Ищем нужный вариант по data-value
-            const option = dropdown.querySelector(`div.select__field__variant[data-value="${sortValue}"]`);
-            
-            if (!option) {
-                const option = dropdown.querySelector(`div.select__field__variant_choosed[data-value="${sortValue}"]`);
-                if (!option) {
-                    return {success: false, error: 'Указанный вариант сортировки не найден'};
-                }
-            }
-            
-            // Кликаем по варианту
-            option.click();
-        """, sort_value)
+        self.driver.execute_script(APPLY_SORTING_JS, sort_value)
 
     def _get_price_calculation(self) -> Dict[str, str]:
-        return self.driver.execute_script("""
-            const result = {
-                currency_rates: {},
-                total_price: null,
-                breakdown: {}
-            };
-            
-            // Получаем блок с расчетом цены
-            const calculationBlock = document.querySelector('div.car_body__right_part__row__price__calculation');
-            if (!calculationBlock) return result;
-            
-            // Получаем дату курса валют
-            const currencyHeader = calculationBlock.querySelector('b');
-            if (currencyHeader && currencyHeader.textContent.includes('Курсы валют')) {
-                result.currency_date = currencyHeader.textContent.replace('Курсы валют на ', '').trim();
-            }
-            
-            // Получаем все div элементы и ищем курс евро
-            const divElements = calculationBlock.querySelectorAll('div');
-            divElements.forEach(div => {
-                const text = div.textContent.trim();
-                if (text.includes('€ =')) {
-                    result.currency_rates['EUR'] = text.replace('€ =', '').trim();
-                }
-            });
-            
-            // Получаем итоговую цену
-            const totalPriceElement = calculationBlock.querySelector('span.price_in_calculation');
-            if (totalPriceElement) {
-                result.total_price = totalPriceElement.textContent.trim();
-            }
-            
-            // Парсим разбивку цены
-            const breakdownItems = calculationBlock.querySelectorAll('ul ul li');
-            breakdownItems.forEach(item => {
-                const text = item.textContent.trim();
-                const name = text.split(':')[0].trim();
-                const valueElement = item.querySelector('b');
-                if (name && valueElement) {
-                    result.breakdown[name] = valueElement.textContent.trim();
-                }
-            });
-            
-            return result;
-        """)
+        return self.driver.execute_script(PRICE_CALCULATION_JS)
 
     def scrape_cars(self, page_num: str, filters: Dict[str, str], order_by: str | None) -> List[Dict]:
         try:
-            self._load_searchpage(self.url)
+            self._open_searchpage(self.url)
             self._apply_filters(filters)
             self._submit_search()
             self._wait_for_loading_searchpage()
@@ -539,6 +175,7 @@ class Scraper:
             while self._get_pages_nums()["cur_page_num"] != page_num:
                 self._push_page_next()
                 self._wait_for_loading_searchpage()
+            self._capture_snapshot("searchpage", [page_num, filters, order_by])
             return self._parse_car_list()
 
         except JavascriptException as e:
@@ -551,10 +188,41 @@ class Scraper:
             logger.exception("Unexpected error during scraping")
             raise
 
-    def scrape_filters(self) -> List[Dict]:
+    def scrape_cars_pages(self, filters: Dict[str, str], order_by: str | None, max_pages: int) -> Tuple[List[Dict], bool]:
+        try:
+            self._open_searchpage(self.url)
+            self._apply_filters(filters)
+            self._submit_search()
+            self._wait_for_loading_searchpage()
+            if order_by:
+                self._apply_sorting(order_by)
+                self._wait_for_loading_searchpage()
+
+            cars = []
+            for _ in range(max_pages):
+                cars.extend(self._parse_car_list())
+                pages = self._get_pages_nums()
+                if not pages["pages_nums"] or pages["cur_page_num"] == pages["pages_nums"][-1]:
+                    return cars, True
+                self._push_page_next()
+                self._wait_for_loading_searchpage()
+            return cars, False
+
+        except JavascriptException as e:
+            logger.error(f"JS error: {str(e)}")
+            raise
+        except TimeoutException:
+            logger.error("Timeout while waiting for page elements")
+            raise
+        except Exception as e:
+            logger.exception("Unexpected error during scraping")
+            raise
+
+    def scrape_filters(self, with_values: bool = False) -> List[Dict]:
         try:
-            self._load_searchpage(self.url)
-            return self._get_initial_filters()
+            self._open_searchpage(self.url)
+            self._capture_snapshot("searchpage", [])
+            return self._get_initial_filters(with_values)
             
         except JavascriptException as e:
             logger.error(f"JS error: {str(e)}")
@@ -568,7 +236,7 @@ class Scraper:
 
     def scrape_brand_models(self, brand: str) -> List[Dict]:
         try:
-            self._load_searchpage(self.url)
+            self._open_searchpage(self.url)
             return self._get_brand_models(brand)
             
         except JavascriptException as e:
@@ -583,7 +251,7 @@ class Scraper:
 
     def scrape_model_gens(self, brand:str, model: str) -> List[Dict]:
         try:
-            self._load_searchpage(self.url)
+            self._open_searchpage(self.url)
             return self._get_model_gens(brand, model)
             
         except JavascriptException as e:
@@ -596,10 +264,12 @@ class Scraper:
             logger.exception("Unexpected error during scraping")
             raise
 
-    def scrape_car_details(self, id: str) -> Dict:
+    def scrape_car_details(self, id: str, fields: List[str] | None = None,
+                           limits: Dict[str, int] | None = None) -> Dict:
         try:
             self._load_carpage(self.url)
-            return self._get_car_details(id)
+            self._capture_snapshot("carpage", [id])
+            return self._get_car_details(id, fields, limits)
         except JavascriptException as e:
             logger.error(f"JS error: {str(e)}")
             raise
@@ -613,6 +283,7 @@ class Scraper:
     def scrape_price_calculation(self) -> Dict[str, str]:
         try:
             self._load_carpage(self.url)
+            self._capture_snapshot("carpage", [])
             return self._get_price_calculation()
         except JavascriptException as e:
             logger.error(f"JS error: {str(e)}")
@@ -0,0 +1,550 @@
+# JS-скрипты извлечения данных, общие для Scraper и AsyncScraper
+
+LOAD_SNAPSHOT_JS = """
+    const doc = new DOMParser().parseFromString(arguments[0], 'text/html');
+    document.replaceChild(document.adoptNode(doc.documentElement), document.documentElement);
+"""
+
+NAVIGATION_STATUS_JS = """
+    const entry = performance.getEntriesByType('navigation')[0];
+    return entry && entry.responseStatus ? entry.responseStatus : 0;
+"""
+
+WAIT_SEARCHPAGE_JS = """
+    const callback = arguments[arguments.length - 1];
+    // Таймаут в миллисекундах передается первым аргументом
+    const timeout = arguments.length > 1 ? arguments[0] : 30000;
+    const loader = document.querySelector('div.big_preloader');
+
+    if (!loader || loader.style.opacity === '0') {
+        callback(true);
+        return;
+    }
+
+    const observer = new MutationObserver(function(mutations) {
+        if (loader.style.opacity === '0') {
+            observer.disconnect();
+            callback(true);
+        }
+    });
+
+    observer.observe(loader, {
+        attributes: true,
+        attributeFilter: ['style']
+    });
+
+    // Таймаут на случай если изменения не произойдут
+    setTimeout(() => {
+        observer.disconnect();
+        callback(false);
+    }, timeout);
+"""
+
+WAIT_CARPAGE_JS = """
+    const callback = arguments[arguments.length - 1];
+    // Таймаут в миллисекундах передается первым аргументом
+    const timeout = arguments.length > 1 ? arguments[0] : 30000;
+    const loader = document.querySelector('div.big_preloader');
+
+    // Если прелоадер уже скрыт или отсутствует
+    if (!loader || loader.classList.contains('hide')) {
+        callback(true);
+        return;
+    }
+
+    const observer = new MutationObserver(function(mutations) {
+        if (loader.classList.contains('hide')) {
+            observer.disconnect();
+            callback(true);
+        }
+    });
+
+    observer.observe(loader, {
+        attributes: true,
+        attributeFilter: ['class']
+    });
+
+    // Таймаут на случай если изменения не произойдут
+    setTimeout(() => {
+        observer.disconnect();
+        callback(false);
+    }, timeout);
+"""
+
+APPLY_FILTER_JS = """
+    const fieldName = arguments[0];
+    const label = arguments[1];
+    const delay = arguments[2] ?? 300;
+    const filter = Array.from(document.querySelectorAll('div.select__field'))
+        .find(el => el.dataset.field_name === fieldName);
+    if (!filter) return false;
+
+    filter.click();
+    const option = Array.from(filter.querySelectorAll('div.select__field__variant'))
+        .find(el => el.dataset.label === label);
+    if (!option) return false;
+
+    option.click();
+    await new Promise(resolve => setTimeout(resolve, delay));
+    return true;
+"""
+
+SEARCHPAGE_STATE_JS = """
+    // Страница поиска открыта, загружена и пригодна для повторного поиска
+    const expected = new URL(arguments[0], location.href);
+    if (location.origin !== expected.origin || location.pathname !== expected.pathname) return false;
+    if (document.readyState !== 'complete') return false;
+    // Выбранную сортировку сбросить элементами страницы нельзя
+    if (window.__searchpageSorted) return false;
+
+    const loader = document.querySelector('div.big_preloader');
+    if (loader && loader.style.opacity !== '0') return false;
+
+    return Boolean(
+        document.querySelector('div.select__field[data-field_name="brand"]')
+        && document.querySelector('div.search_car__block__settings__button[data-button_name="show_result"]')
+    );
+"""
+
+RESET_FILTERS_JS = """
+    // Снимает выбранные значения фильтров повторным кликом по ним,
+    // зависимые фильтры (поколение, модель) раньше марки
+    const fieldNames = arguments[0].slice().reverse();
+    const delay = arguments[1] ?? 300;
+    const chosen = () => fieldNames.flatMap(name => {
+        const filter = document.querySelector(`div.select__field[data-field_name="${name}"]`);
+        return filter ? Array.from(filter.querySelectorAll('div.select__field__variant_choosed')) : [];
+    });
+
+    let clicked = 0;
+    for (const option of chosen()) {
+        option.click();
+        clicked++;
+    }
+    // Закрываем выпадающие списки, оставленные открытыми
+    document.body.click();
+    if (clicked) await new Promise(resolve => setTimeout(resolve, delay));
+
+    return chosen().length === 0;
+"""
+
+SUBMIT_SEARCH_JS = """
+    const btn = document.querySelector(
+        'div.search_car__block__settings__button[data-button_name="show_result"]'
+    );
+    if (btn) btn.click();
+    else throw new Error('Search button not found');
+"""
+
+PARSE_CAR_LIST_JS = """
+    console.group('=== Парсинг автомобилей ===');
+    const cars = [];
+    const metaKeys = {
+        'Год:': 'year',
+        'Топливо:': 'fuel',
+        'Пробег:': 'mileage',
+        'Цвет:': 'color'
+    };
+
+    const carElements = document.querySelectorAll('div.car__wrapper');
+    console.log(`Найдено элементов автомобилей: ${carElements.length}`);
+
+    carElements.forEach((car, index) => {
+        console.group(`Автомобиль #${index}`);
+        const data = {};
+
+        try {
+            // 2.1. Базовые данные
+            data.id = car.getAttribute('data-car_id') || null;
+            console.log(`ID: ${data.id}`);
+
+            data.title = car.querySelector('h3.car__content__title')?.textContent.trim() || null;
+            console.log(`Название: ${data.title}`);
+
+            data.image = car.querySelector('div.car__image img')?.src || null;
+            console.log(`Изображение: ${data.image ? 'есть' : 'нет'}`);
+
+            // 2.2. Парсинг цены
+            const priceDigits = car.querySelector('span.car__price__value_digits');
+            const priceText = car.querySelector('span.car__price__value_text');
+            data.price = priceDigits?.textContent.trim() || priceText?.textContent.trim() || null;
+            console.log(`Цена: ${data.price}`);
+
+            // 2.3. Парсинг мета-данных
+            console.group('Мета-данные:');
+            const metaItems = car.querySelectorAll('div.car__content__meta__item');
+            console.log(`Найдено мета-элементов: ${metaItems.length}`);
+
+            metaItems.forEach(item => {
+                const label = item.querySelector('div.car__content__meta__item__label')?.textContent.trim();
+                const value = item.querySelector('div.car__content__meta__item__value')?.textContent.trim();
+
+                if (label && metaKeys[label]) {
+                    data[metaKeys[label]] = value;
+                    console.log(`${label}: ${value}`);
+                }
+            });
+            console.groupEnd();
+
+            // 2.4. Проверка полноты данных
+            if (!data.id) {
+                console.warn('Автомобиль пропущен - отсутствует ID');
+                console.groupEnd();
+                return;
+            }
+
+            cars.push(data);
+            console.log('Автомобиль успешно добавлен');
+        } catch (error) {
+            console.error(`Ошибка при парсинге: ${error}`);
+            console.log('Текущие данные:', JSON.stringify(data, null, 2));
+        }
+
+        console.groupEnd();
+    });
+
+    console.log(`Успешно распарсено автомобилей: ${cars.length}`);
+    console.groupEnd();
+    return cars;
+"""
+
+INITIAL_FILTERS_JS = """
+    const withValues = arguments[0];
+    const variants = filter => Array.from(filter.querySelectorAll('div.select__field__variant'))
+        .filter(el => el.dataset.label)
+        .map(el => withValues ? {label: el.dataset.label, value: el.dataset.value || null} : el.dataset.label);
+    const result = {
+        brands: [],
+        transmission: [],
+        fuel: [],
+        color: [],
+        mileage_from: [],
+        mileage_to: [],
+        year_release_from: [],
+        year_release_to: [],
+        price_from: [],
+        price_to: [],
+
+    };
+
+    // Получаем бренды
+    const brandFilter = document.querySelector('div.select__field[data-field_name="brand"]');
+    if (brandFilter) {
+        result.brands = variants(brandFilter);
+    }
+
+    // Получаем остальные фильтры
+    ['transmission',
+    'fuel',
+    'color',
+    'mileage_from',
+    'mileage_to',
+    'year_release_from', 
+    'year_release_to', 
+    'price_from', 
+    'price_to'].forEach(name => {
+        const filter = document.querySelector(`div.select__field[data-field_name="${name}"]`);
+        if (filter) {
+            result[name] = variants(filter);
+        }
+    });
+
+    return result;
+"""
+
+BRAND_MODELS_JS = """
+    const delay = arguments[1] ?? 300;
+    const brandFilter = document.querySelector('div.select__field[data-field_name="brand"]');
+    if (!brandFilter) return [];
+
+    const brandOption = Array.from(brandFilter.querySelectorAll('div.select__field__variant'))
+        .find(el => el.dataset.label === arguments[0]);
+    if (!brandOption) {
+        brandFilter.click();
+        return [];
+    }
+
+    brandOption.click();
+
+    const modelFilter = document.querySelector('div.select__field[data-field_name="model"]');
+    if (!modelFilter) {
+        brandOption.click();
+        return [];
+    }
+
+    modelFilter.click();
+    await new Promise(resolve => setTimeout(resolve, delay));
+
+    const models = Array.from(modelFilter.querySelectorAll('div.select__field__variant'))
+        .map(el => el.dataset.label)
+        .filter(label => label);
+
+    return models;
+"""
+
+MODEL_GENS_JS = """
+    const delay = arguments[2] ?? 300;
+    const brandFilter = document.querySelector('div.select__field[data-field_name="brand"]');
+    if (!brandFilter) return [];
+
+    const brandOption = Array.from(brandFilter.querySelectorAll('div.select__field__variant'))
+        .find(el => el.dataset.label === arguments[0]);
+    if (!brandOption) {
+        brandFilter.click();
+        return [];
+    }
+
+    brandOption.click();
+
+    const modelFilter = document.querySelector('div.select__field[data-field_name="model"]');
+    if (!modelFilter) {
+        brandOption.click();
+        return [];
+    }
+
+    modelFilter.click();
+    await new Promise(resolve => setTimeout(resolve, delay));
+
+    const modelOption = Array.from(modelFilter.querySelectorAll('div.select__field__variant'))
+        .find(el => el.dataset.label === arguments[1]);
+    if (!modelOption) {
+        modelFilter.click();
+        return [];
+    }
+
+    modelOption.click();
+
+    const genFilter = document.querySelector('div.select__field[data-field_name="gen"]');
+    if (!genFilter) {
+        modelOption.click();
+        return [];
+    }
+
+    genFilter.click();
+    await new Promise(resolve => setTimeout(resolve, delay));
+
+    const gens = Array.from(genFilter.querySelectorAll('div.select__field__variant'))
+        .map(el => el.dataset.label)
+        .filter(label => label);
+
+    return gens;
+"""
+
+CAR_DETAILS_JS = """
+    const carId = arguments[0];
+    // Список нужных разделов (null - все) и ограничения на число элементов
+    const fields = arguments[1] || null;
+    const limits = arguments[2] || {};
+    const want = name => !fields || fields.includes(name);
+    const photosLimit = limits.photos ?? Infinity;
+    const inspectionsLimit = limits.inspections ?? Infinity;
+
+    const result = {id: carId};
+    if (!fields) {
+        Object.assign(result, {
+            photos: [],
+            title: null,
+            price: null,
+            base_parameters: {},
+            tech_parameters: {},
+            car_check_parameters: {},
+            car_check_inspections: {},
+            car_body_options: {}
+        });
+    }
+
+    const parseInspections = () => {
+        const inspectionsData = [];
+        const inspectionSections = document.querySelectorAll('details.car_body__car_check__inspections');
+
+        for (const section of inspectionSections) {
+            const sectionTitle = section.querySelector('summary')?.textContent.trim() || 'Проверка';
+            for (const row of section.querySelectorAll('table tbody tr')) {
+                if (inspectionsData.length >= inspectionsLimit) {
+                    return inspectionsData;
+                }
+                const cells = row.querySelectorAll('td');
+                if (cells.length >= 2) {
+                    inspectionsData.push({
+                        'section': sectionTitle,
+                        'parameter': cells[0].textContent.trim(),
+                        'value': cells[1].textContent.trim()
+                    });
+                }
+            }
+        }
+
+        return inspectionsData;
+    };
+
+    const parseParameters = selector => {
+        const parameters = {};
+        document.querySelectorAll(selector).forEach(el => {
+            const name = el.getAttribute('data-parameter_name');
+            const value = el.querySelectorAll('span')[1]?.textContent.trim();
+            if (name && value) {
+                parameters[name] = value;
+            }
+        });
+        return parameters;
+    };
+
+    try {
+        if (want('title')) {
+            result.title = document.querySelector('div.car_body__right_part__car_title h2')?.textContent.trim() || null;
+        }
+        if (want('price')) {
+            result.price = document.querySelector('div.car_body__right_part__row__price__digits')?.textContent.trim() || null;
+        }
+        if (want('photos')) {
+            result.photos = [];
+            for (const img of document.querySelectorAll('div.car_body__left_part__car_gallery__image_wrapper img')) {
+                if (result.photos.length >= photosLimit) break;
+                const src = img.getAttribute('data-big_pict') || img.src;
+                if (src) result.photos.push(src);
+            }
+        }
+        if (want('base_parameters')) {
+            result.base_parameters = {};
+            document.querySelectorAll('div.car_body__right_part__base_parameter').forEach(el => {
+                const label = el.querySelector('div.car_body__right_part__base_parameter__label')?.textContent.trim();
+                const value = el.querySelector('div.car_body__right_part__base_parameter__value')?.textContent.trim();
+                if (label && value) {
+                    result.base_parameters[label] = value;
+                }
+            });
+        }
+        if (want('tech_parameters')) {
+            result.tech_parameters = parseParameters('div.car_body__tech_parameter');
+        }
+        if (want('car_check_parameters')) {
+            result.car_check_parameters = parseParameters('div.car_body__car_check_parameter');
+        }
+        if (want('inspections')) {
+            result.inspections = parseInspections();
+        }
+        if (want('car_body_options')) {
+            result.car_body_options = {};
+            document.querySelectorAll('details.car_body__options').forEach(details => {
+                const summary = details.querySelector('summary.light')?.textContent.trim();
+                if (summary) {
+                    const options = Array.from(details.querySelectorAll('div.car_body__option.exist span'))
+                        .map(span => span.textContent.trim())
+                        .filter(Boolean);
+                    result.car_body_options[summary] = options;
+                }
+            });
+        }
+
+    } catch (error) {
+        console.error('Error getting car details:', error);
+        throw error;
+    }
+
+    return result;
+"""
+
+PAGES_NUMS_JS = """
+    const result = {
+        pages_nums: [],
+        cur_page_num: null
+    };
+
+    // Находим все элементы с номерами страниц
+    const pageElements = document.querySelectorAll(
+        'div.search_car__block__view_settings__pages__page_num:not(.dots)'
+    );
+
+    // Парсим номера страниц
+    pageElements.forEach(element => {
+        const pageNum = element.textContent.trim();
+        result.pages_nums.push(pageNum);
+
+        // Проверяем активна ли страница
+        if (element.classList.contains('active')) {
+            result.cur_page_num = pageNum;
+        }
+    });
+
+    return result;
+"""
+
+PUSH_PAGE_NEXT_JS = """
+    const btn = document.querySelector(
+        'div.search_car__block__view_settings__pages_nav[data-direction="right"]'
+    );
+    if (btn) btn.click();
+    else throw new Error('Next page button not found');
+"""
+
+APPLY_SORTING_JS = """
+    const sortValue = arguments[0];
+    const sortblock = document.querySelector('div.search_car__block__view_settings__sort__options');
+
+    const dropdown = sortblock.querySelector('div.select__field__variants.js__select__field__variants');
+
+    if (!dropdown) {
+        return {success: false, error: 'Выпадающий список сортировки не найден'};
+    }
+    dropdown.click();
+
+    // Ищем нужный вариант по data-value
+    const option = dropdown.querySelector(`div.select__field__variant[data-value="${sortValue}"]`);
+
+    if (!option) {
+        const option = dropdown.querySelector(`div.select__field__variant_choosed[data-value="${sortValue}"]`);
+        if (!option) {
+            return {success: false, error: 'Указанный вариант сортировки не найден'};
+        }
+    }
+
+    // Кликаем по варианту
+    option.click();
+    window.__searchpageSorted = true;
+"""
+
+PRICE_CALCULATION_JS = """
+    const result = {
+        currency_rates: {},
+        total_price: null,
+        breakdown: {}
+    };
+
+    // Получаем блок с расчетом цены
+    const calculationBlock = document.querySelector('div.car_body__right_part__row__price__calculation');
+    if (!calculationBlock) return result;
+
+    // Получаем дату курса валют
+    const currencyHeader = calculationBlock.querySelector('b');
+    if (currencyHeader && currencyHeader.textContent.includes('Курсы валют')) {
+        result.currency_date = currencyHeader.textContent.replace('Курсы валют на ', '').trim();
+    }
+
+    // Получаем все div элементы и ищем курс евро
+    const divElements = calculationBlock.querySelectorAll('div');
+    divElements.forEach(div => {
+        const text = div.textContent.trim();
+        if (text.includes('€ =')) {
+            result.currency_rates['EUR'] = text.replace('€ =', '').trim();
+        }
+    });
+
+    // Получаем итоговую цену
+    const totalPriceElement = calculationBlock.querySelector('span.price_in_calculation');
+    if (totalPriceElement) {
+        result.total_price = totalPriceElement.textContent.trim();
+    }
+
+    // Парсим разбивку цены
+    const breakdownItems = calculationBlock.querySelectorAll('ul ul li');
+    breakdownItems.forEach(item => {
+        const text = item.textContent.trim();
+        const name = text.split(':')[0].trim();
+        const valueElement = item.querySelector('b');
+        if (name && valueElement) {
+            result.breakdown[name] = valueElement.textContent.trim();
+        }
+    });
+
+    return result;
+"""
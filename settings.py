@@ -0,0 +1,185 @@
+import logging
+import os
+from dataclasses import dataclass, field, fields, replace
+from threading import Lock
+from typing import Dict, Mapping
+
+logger = logging.getLogger(__name__)
+
+
+def setting(default, env: str, reloadable: bool = False, minimum: float | None = None):
+    """
+    Поле настроек с именем переменной окружения.
+
+    :param default: Значение по умолчанию.
+    :param env: Имя переменной окружения.
+    :type env: str
+    :param reloadable: Можно ли менять значение без перезапуска.
+    :type reloadable: bool
+    :param minimum: Наименьшее допустимое значение числового поля.
+    :type minimum: float
+    """
+    return field(default=default, metadata={"env": env, "reloadable": reloadable, "minimum": minimum})
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Параметры производительности: размер пула, время жизни кэша, таймауты
+    и паузы скрапинга. Загружаются из окружения (и ``.env``), поля с
+    ``reloadable`` можно менять на работающем экземпляре через
+    :class:`SettingsHolder`.
+    """
+
+    # Пул драйверов и executor
+    max_workers: int = setting(3, "MAX_WORKERS", reloadable=True, minimum=1)
+    # Время жизни записей кэша в секундах: по умолчанию, списки, страницы автомобилей
+    cache_default_timeout: int = setting(3600, "CACHE_DEFAULT_TIMEOUT", reloadable=True, minimum=1)
+    cache_cars_timeout: int = setting(600, "CACHE_CARS_TIMEOUT", reloadable=True, minimum=1)
+    cache_car_timeout: int = setting(1800, "CACHE_CAR_TIMEOUT", reloadable=True, minimum=1)
+    # Сколько секунд хранить истекшие записи, чтобы отдавать их при недоступности сайта
+    cache_stale_timeout: int = setting(3600, "CACHE_STALE_TIMEOUT", reloadable=True, minimum=0)
+    # Сколько воркеров оставлять свободными для живого трафика при фоновой работе
+    cache_warm_reserve: int = setting(1, "CACHE_WARM_RESERVE", reloadable=True, minimum=0)
+    # Сколько секунд запрос ждет результата скрапинга
+    request_timeout: float = setting(30.0, "REQUEST_TIMEOUT", reloadable=True, minimum=1)
+    # Сколько секунд ждать загрузки страницы сайта
+    page_timeout: float = setting(30.0, "PAGE_TIMEOUT", reloadable=True, minimum=1)
+    # Пауза после выбора значения фильтра на странице в миллисекундах
+    filter_delay_ms: int = setting(300, "FILTER_DELAY_MS", reloadable=True, minimum=0)
+    # Сколько секунд задача ждет свободного слота скрапинга
+    upstream_slot_timeout: float = setting(10.0, "UPSTREAM_SLOT_TIMEOUT", reloadable=True, minimum=0)
+    # Повторы при сбоях и вывод драйверов из пула
+    scrape_retries: int = setting(2, "SCRAPE_RETRIES", reloadable=True, minimum=0)
+    driver_max_failures: int = setting(2, "DRIVER_MAX_FAILURES", reloadable=True, minimum=1)
+    # Сайт-источник и процессы chromedriver меняются только перезапуском
+    searchpage_url: str | None = setting(None, "SEARCHPAGE_URL")
+    carpage_url: str | None = setting(None, "CARPAGE_URL")
+    chromedriver_path: str = setting("/usr/bin/chromedriver", "CHROMEDRIVER_PATH")
+    chromedriver_services: int = setting(1, "CHROMEDRIVER_SERVICES", minimum=1)
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] | None = None) -> "Settings":
+        """
+        Настройки из переменных окружения, отсутствующие берутся по умолчанию.
+
+        :param environ: Переменные окружения, по умолчанию ``os.environ``.
+        :type environ: dict
+        :raises ValueError: При некорректном значении.
+        :rtype: Settings
+        """
+        environ = os.environ if environ is None else environ
+        values = {
+            item.name: environ[item.metadata["env"]]
+            for item in fields(cls) if environ.get(item.metadata["env"])
+        }
+        return cls().updated(values, reload_only=False)
+
+    def updated(self, values: Mapping[str, object], reload_only: bool = True) -> "Settings":
+        """
+        Копия настроек с новыми значениями, приведенными к типам полей.
+
+        :param values: Имя поля -> значение (строки приводятся к типу поля).
+        :type values: dict
+        :param reload_only: Разрешать только поля, изменяемые без перезапуска.
+        :type reload_only: bool
+        :raises ValueError: При неизвестном поле, поле без горячей замены или некорректном значении.
+        :rtype: Settings
+        """
+        known = {item.name: item for item in fields(self)}
+        converted = {}
+        for name, value in values.items():
+            item = known.get(name)
+            if item is None:
+                raise ValueError(f"Unknown setting: {name}")
+            if reload_only and not item.metadata["reloadable"]:
+                raise ValueError(f"Setting requires restart: {name}")
+            converted[name] = self._convert(item, value)
+        return replace(self, **converted)
+
+    @staticmethod
+    def _convert(item, value):
+        kind = item.type if isinstance(item.type, str) else getattr(item.type, "__name__", str(item.type))
+        if kind.startswith("str"):
+            return None if value is None else str(value)
+        try:
+            if isinstance(value, bool) or value is None or (kind == "int" and isinstance(value, float)):
+                raise ValueError
+            number = int(value) if kind == "int" else float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {kind} for {item.name}: {value!r}")
+        if item.metadata["minimum"] is not None and number < item.metadata["minimum"]:
+            raise ValueError(f"{item.name} must be at least {item.metadata['minimum']}")
+        return number
+
+    def as_dict(self) -> Dict:
+        return {item.name: getattr(self, item.name) for item in fields(self)}
+
+    @classmethod
+    def reloadable(cls) -> list:
+        return [item.name for item in fields(cls) if item.metadata["reloadable"]]
+
+
+class SettingsHolder:
+    """
+    Текущие настройки работающего экземпляра. Изменение заменяет объект
+    настроек целиком, поэтому читающие потоки видят согласованный набор
+    значений, и вызывает подписчиков с измененными полями.
+
+    :param settings: Начальные настройки.
+    :type settings: Settings
+    """
+
+    def __init__(self, settings: Settings):
+        self.current = settings
+        self._listeners = []
+        self._lock = Lock()
+
+    def __getattr__(self, name: str):
+        return getattr(self.current, name)
+
+    def subscribe(self, listener) -> None:
+        """
+        Регистрирует функцию ``listener(changes)``, вызываемую после изменения
+        настроек со словарем ``{поле: (старое, новое)}``.
+        """
+        self._listeners.append(listener)
+
+    def update(self, values: Mapping[str, object]) -> Dict:
+        """
+        Применяет новые значения полей, изменяемых без перезапуска.
+
+        :param values: Имя поля -> значение.
+        :type values: dict
+        :return: Измененные поля: ``{поле: (старое, новое)}``.
+        :rtype: dict
+        :raises ValueError: При недопустимом поле или значении; настройки не меняются.
+        """
+        with self._lock:
+            previous = self.current
+            self.current = previous.updated(values)
+            changes = {
+                name: (getattr(previous, name), getattr(self.current, name))
+                for name in values if getattr(previous, name) != getattr(self.current, name)
+            }
+            for listener in self._listeners if changes else []:
+                try:
+                    listener(changes)
+                except Exception as e:
+                    logger.error(f"Failed to apply settings {changes}: {str(e)}")
+        if changes:
+            logger.info(f"Settings updated: {changes}")
+        return changes
+
+    def reload(self, environ: Mapping[str, str] | None = None) -> Dict:
+        """
+        Перечитывает окружение и применяет изменившиеся поля, изменяемые
+        без перезапуска. Изменения остальных полей игнорируются.
+
+        :rtype: dict
+        """
+        fresh = Settings.from_env(environ)
+        return self.update({
+            name: getattr(fresh, name) for name in Settings.reloadable()
+            if getattr(fresh, name) != getattr(self.current, name)
+        })
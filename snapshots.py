@@ -0,0 +1,286 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, local
+from time import time
+from typing import Callable, Dict, Iterator
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+# Извлечения, которые можно воспроизвести по снимку: имя -> (тип страницы, метод Scraper)
+REPLAY_EXTRACTIONS = {
+    "cars": ("searchpage", lambda scraper, snapshot: scraper._parse_car_list()),
+    "pages_nums": ("searchpage", lambda scraper, snapshot: scraper._get_pages_nums()),
+    "filters": ("searchpage", lambda scraper, snapshot: scraper._get_initial_filters()),
+    "car_details": ("carpage", lambda scraper, snapshot: scraper._get_car_details(
+        snapshot["args"][0] if snapshot["args"] else None
+    )),
+    "price_calculation": ("carpage", lambda scraper, snapshot: scraper._get_price_calculation()),
+}
+
+
+class SnapshotStore:
+    """
+    Локальное хранилище сжатых снимков DOM страниц сайта.
+
+    Снимок хранится в ``<root>/<ключ>/<timestamp>.json.gz``, где ключ
+    считается по URL и аргументам скрапинга. Для каждого ключа хранится
+    не более ``max_per_key`` последних снимков, снимки старше ``max_age``
+    удаляются.
+
+    :param root: Каталог хранилища.
+    :type root: str
+    :param max_age: Время хранения снимков в секундах.
+    :type max_age: int
+    :param max_per_key: Число хранимых снимков на один ключ.
+    :type max_per_key: int
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, root: str, max_age: int = 7 * 86400, max_per_key: int = 5):
+        self.root = root
+        self.max_age = max_age
+        self.max_per_key = max_per_key
+        self._lock = Lock()
+        self._saves = 0
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def _key(url: str, args: list) -> str:
+        raw = json.dumps([url, args], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def save(self, url: str, page: str, args: list, html: str) -> str:
+        """
+        Сохраняет снимок страницы.
+
+        :param url: URL страницы.
+        :type url: str
+        :param page: Тип страницы (``searchpage`` или ``carpage``).
+        :type page: str
+        :param args: Аргументы скрапинга (фильтры, ID и т.п.).
+        :type args: list
+        :param html: Содержимое ``driver.page_source``.
+        :type html: str
+        :return: Путь к файлу снимка.
+        :rtype: str
+        """
+        key_dir = os.path.join(self.root, self._key(url, args))
+        os.makedirs(key_dir, exist_ok=True)
+        captured_at = time()
+        path = os.path.join(key_dir, f"{int(captured_at * 1000)}-{uuid4().hex[:6]}.json.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump({
+                "url": url,
+                "page": page,
+                "args": args,
+                "captured_at": captured_at,
+                "html": html
+            }, f, ensure_ascii=False)
+
+        self._trim(key_dir)
+        with self._lock:
+            self._saves += 1
+            prune = self._saves % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+        return path
+
+    def _trim(self, key_dir: str) -> None:
+        files = sorted(os.listdir(key_dir))
+        for name in files[:-self.max_per_key]:
+            try:
+                os.remove(os.path.join(key_dir, name))
+            except OSError:
+                pass
+
+    def prune(self) -> None:
+        """
+        Удаляет устаревшие снимки и пустые каталоги.
+        """
+        deadline = time() - self.max_age
+        for key in os.listdir(self.root):
+            key_dir = os.path.join(self.root, key)
+            if not os.path.isdir(key_dir):
+                continue
+            for name in os.listdir(key_dir):
+                path = os.path.join(key_dir, name)
+                try:
+                    if os.path.getmtime(path) < deadline:
+                        os.remove(path)
+                except OSError:
+                    pass
+            if not os.listdir(key_dir):
+                shutil.rmtree(key_dir, ignore_errors=True)
+
+    def iter_snapshots(self, page: str | None = None, since: float | None = None,
+                       latest_only: bool = False) -> Iterator[Dict]:
+        """
+        Перебирает сохраненные снимки.
+
+        :param page: Фильтр по типу страницы.
+        :type page: str
+        :param since: Только снимки, сделанные после этого момента (unix time).
+        :type since: float
+        :param latest_only: Только последний снимок для каждого ключа.
+        :type latest_only: bool
+        :return: Итератор словарей снимков.
+        """
+        for key in sorted(os.listdir(self.root)):
+            key_dir = os.path.join(self.root, key)
+            if not os.path.isdir(key_dir):
+                continue
+            names = sorted(os.listdir(key_dir), reverse=True)
+            if latest_only:
+                names = names[:1]
+            for name in names:
+                try:
+                    with gzip.open(os.path.join(key_dir, name), "rt", encoding="utf-8") as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Broken snapshot {name}: {str(e)}")
+                    continue
+                if page and snapshot["page"] != page:
+                    continue
+                if since and snapshot["captured_at"] < since:
+                    continue
+                yield snapshot
+
+
+class SnapshotReplayer:
+    """
+    Прогоняет JS-извлечения ``Scraper`` по сохраненным снимкам без
+    обращения к сайту. Каждый поток получает собственный драйвер.
+
+    :param driver_factory: Функция создания драйвера.
+    :type driver_factory: callable
+    :param driver_quit: Функция завершения драйвера.
+    :type driver_quit: callable
+    :param workers: Число параллельных драйверов.
+    :type workers: int
+    """
+
+    def __init__(self, driver_factory: Callable, driver_quit: Callable, workers: int = 3):
+        self.driver_factory = driver_factory
+        self.driver_quit = driver_quit
+        self.workers = workers
+        self._local = local()
+        self._drivers = []
+        self._lock = Lock()
+
+    def _scraper(self):
+        from scraper import Scraper
+
+        if not hasattr(self._local, "scraper"):
+            driver = self.driver_factory()
+            with self._lock:
+                self._drivers.append(driver)
+            driver.get("about:blank")
+            self._local.scraper = Scraper(url="about:blank", driver=driver)
+        return self._local.scraper
+
+    def _replay_one(self, extraction: str, snapshot: Dict) -> Dict:
+        _, extract = REPLAY_EXTRACTIONS[extraction]
+        result = {
+            "url": snapshot["url"],
+            "args": snapshot["args"],
+            "captured_at": snapshot["captured_at"]
+        }
+        try:
+            scraper = self._scraper()
+            scraper.load_snapshot(snapshot["html"])
+            result["result"] = extract(scraper, snapshot)
+        except Exception as e:
+            logger.error(f"Replay error for {snapshot['url']}: {str(e)}")
+            result["error"] = str(e)
+        return result
+
+    def run(self, extraction: str, snapshots) -> Iterator[Dict]:
+        """
+        Воспроизводит извлечение по набору снимков. Снимки читаются по мере
+        обработки, в работе одновременно не больше ``2 * workers`` снимков,
+        поэтому память не зависит от размера набора.
+
+        :param extraction: Имя извлечения из ``REPLAY_EXTRACTIONS``.
+        :type extraction: str
+        :param snapshots: Итерируемый набор снимков.
+        :return: Итератор результатов извлечения в порядке снимков.
+        """
+        page, _ = REPLAY_EXTRACTIONS[extraction]
+        pending = deque()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                try:
+                    for snapshot in snapshots:
+                        if snapshot["page"] != page:
+                            continue
+                        pending.append(pool.submit(self._replay_one, extraction, snapshot))
+                        if len(pending) >= 2 * self.workers:
+                            yield pending.popleft().result()
+                    while pending:
+                        yield pending.popleft().result()
+                finally:
+                    # При досрочном завершении не начатые снимки не обрабатываются
+                    for future in pending:
+                        future.cancel()
+        finally:
+            with self._lock:
+                for driver in self._drivers:
+                    self.driver_quit(driver)
+                self._drivers.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Повторное извлечение данных из снимков страниц")
+    parser.add_argument("extraction", choices=sorted(REPLAY_EXTRACTIONS))
+    parser.add_argument("--dir", default=os.getenv("SNAPSHOT_DIR"), help="Каталог снимков")
+    parser.add_argument("--since", type=float, help="Только снимки после unix time")
+    parser.add_argument("--all", action="store_true", help="Все снимки, а не только последние")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--out", help="Файл JSONL для результатов (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    if not args.dir:
+        parser.error("--dir or SNAPSHOT_DIR is required")
+
+    # Драйверы создаются без приложения: офлайн-прогону не нужны кэш, executor и пул
+    from driver_service import BASE_CHROME_ARGUMENTS, DriverServicePool, chrome_options
+
+    services = DriverServicePool(os.getenv("CHROMEDRIVER_PATH", "/usr/bin/chromedriver"), size=1)
+    store = SnapshotStore(args.dir)
+    replayer = SnapshotReplayer(
+        lambda: services.create_driver(chrome_options(BASE_CHROME_ARGUMENTS)),
+        lambda driver: driver.quit(),
+        workers=args.workers
+    )
+    page, _ = REPLAY_EXTRACTIONS[args.extraction]
+    results = replayer.run(
+        args.extraction,
+        store.iter_snapshots(page=page, since=args.since, latest_only=not args.all)
+    )
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    try:
+        for result in results:
+            line = json.dumps(result, ensure_ascii=False)
+            if out:
+                out.write(line + "\n")
+            else:
+                print(line)
+    finally:
+        results.close()
+        services.stop()
+        if out:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
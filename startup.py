@@ -0,0 +1,326 @@
+import heapq
+import logging
+import os
+import signal
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from itertools import count
+from threading import Event, Lock, Thread
+from time import monotonic, perf_counter, sleep
+from typing import Callable, Dict, List, Tuple
+
+from driver_memory import descendants, read_processes
+
+logger = logging.getLogger(__name__)
+
+
+# Приоритеты задач executor: меньшее значение выполняется раньше
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class DrainingExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor с приоритетами задач, который при завершении
+    работы дожидается принятых задач не дольше заданного времени.
+
+    Задачи сверх числа потоков ждут в собственной очереди по приоритету
+    (при равном приоритете - по порядку поступления), а не в общей
+    очереди ThreadPoolExecutor, поэтому короткие срочные задачи не стоят
+    за длинными и фоновыми.
+
+    :param max_workers: Число потоков.
+    :type max_workers: int
+    """
+
+    def __init__(self, max_workers: int, *args, **kwargs):
+        super().__init__(max_workers, *args, **kwargs)
+        self.max_workers = max_workers
+        self._queue = []
+        self._order = count()
+        self._running = 0
+        self._closed = False
+        self._pending = set()
+        self._pending_lock = Lock()
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self.submit_priority(PRIORITY_NORMAL, fn, *args, **kwargs)
+
+    def submit_priority(self, priority: int, fn, /, *args, **kwargs) -> Future:
+        """
+        Ставит задачу в очередь с приоритетом.
+
+        :param priority: PRIORITY_HIGH, PRIORITY_NORMAL или PRIORITY_LOW.
+        :type priority: int
+        :raises RuntimeError: После начала завершения работы.
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        with self._pending_lock:
+            if self._closed:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            heapq.heappush(self._queue, (priority, next(self._order), future, fn, args, kwargs))
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        self._dispatch()
+        return future
+
+    def _discard(self, future: Future) -> None:
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._pending_lock:
+                if self._running >= self.max_workers or not self._queue:
+                    return
+                _, _, future, fn, args, kwargs = heapq.heappop(self._queue)
+                # Отмененные в очереди задачи пропускаются
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._running += 1
+            super().submit(self._run, future, fn, args, kwargs)
+
+    def _run(self, future: Future, fn, args, kwargs) -> None:
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._pending_lock:
+                self._running -= 1
+            self._dispatch()
+
+    def resize(self, max_workers: int) -> None:
+        """
+        Меняет число одновременно выполняемых задач. При увеличении
+        ожидающие задачи сразу запускаются, при уменьшении выполняемые
+        задачи дорабатывают, а новые ждут, пока их станет меньше.
+
+        :param max_workers: Число потоков.
+        :type max_workers: int
+        """
+        with self._pending_lock:
+            self.max_workers = max_workers
+            # Потоки ThreadPoolExecutor создаются по мере надобности до этого предела
+            self._max_workers = max(self._max_workers, max_workers)
+        self._dispatch()
+
+    def pending(self) -> int:
+        """
+        Число принятых и еще не завершенных задач.
+
+        :rtype: int
+        """
+        with self._pending_lock:
+            return len(self._pending)
+
+    def queued(self) -> Dict[int, int]:
+        """
+        Число задач в очереди по приоритетам.
+
+        :rtype: dict
+        """
+        with self._pending_lock:
+            result = {}
+            for priority, _, future, _, _, _ in self._queue:
+                if not future.cancelled():
+                    result[priority] = result.get(priority, 0) + 1
+            return result
+
+    def drain(self, timeout: float) -> int:
+        """
+        Перестает принимать задачи и ждет завершения принятых.
+
+        :param timeout: Сколько секунд ждать.
+        :type timeout: float
+        :return: Число задач, не завершившихся за это время.
+        :rtype: int
+        """
+        with self._pending_lock:
+            self._closed = True
+            pending = set(self._pending)
+        _, not_done = wait(pending, timeout=timeout)
+        # Задачи, не начавшиеся за время ожидания, уже не выполняются
+        for future in not_done:
+            future.cancel()
+        self.shutdown(wait=False)
+        return sum(1 for future in not_done if not future.cancelled())
+
+
+def child_processes() -> List[int]:
+    """
+    Идентификаторы всех процессов-потомков текущего процесса (chromedriver
+    и запущенные им Chrome). Читает /proc, на других системах список пуст.
+
+    :rtype: list
+    """
+    return descendants(read_processes(), os.getpid())
+
+
+def _alive(pid: int) -> bool:
+    try:
+        # Завершившиеся дочерние процессы нужно забрать, иначе они остаются зомби
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def terminate_processes(pids: List[int], timeout: float) -> int:
+    """
+    Ждет завершения процессов, оставшиеся завершает SIGTERM, затем SIGKILL.
+
+    :param pids: Идентификаторы процессов.
+    :type pids: list
+    :param timeout: Сколько секунд ждать самостоятельного завершения.
+    :type timeout: float
+    :return: Число процессов, завершенных принудительно.
+    :rtype: int
+    """
+    killed = 0
+    for sig, wait_seconds in ((None, timeout), (signal.SIGTERM, 2.0), (signal.SIGKILL, 1.0)):
+        if sig is not None:
+            for pid in pids:
+                try:
+                    os.kill(pid, sig)
+                    killed += sig == signal.SIGTERM
+                except (ProcessLookupError, PermissionError):
+                    pass
+        deadline = monotonic() + wait_seconds
+        while pids and monotonic() < deadline:
+            pids = [pid for pid in pids if _alive(pid)]
+            if pids:
+                sleep(0.1)
+        pids = [pid for pid in pids if _alive(pid)]
+        if not pids:
+            break
+    if pids:
+        logger.error(f"Processes still running after SIGKILL: {pids}")
+    return killed
+
+
+class Startup:
+    """
+    Запуск экземпляра приложения: фоновый прогрев и готовность к трафику.
+
+    Шаги прогрева (создание драйверов, заполнение кэша фильтров)
+    выполняются по порядку в фоновом потоке, чтобы экземпляр сразу
+    отвечал на проверки живости. Неудавшиеся шаги повторяются через
+    ``retry_interval`` секунд. Экземпляр готов, когда выполнены все
+    проверки ``checks``. После этого экземпляр остается готовым:
+    истечение кэша или замена драйверов не повод снимать с него трафик.
+    Время импорта, каждого шага и время до готовности сохраняются для
+    метрик.
+
+    :param steps: Шаги прогрева: пары (имя, функция).
+    :type steps: list
+    :param checks: Проверки готовности: имя -> функция, возвращающая bool.
+    :type checks: dict
+    :param started: Значение ``perf_counter()`` в начале импорта приложения.
+    :type started: float
+    :param retry_interval: Пауза перед повтором неудавшихся шагов.
+    :type retry_interval: int
+    """
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], None]]], checks: Dict[str, Callable[[], bool]],
+                 started: float, retry_interval: int = 10):
+        self.steps = list(steps)
+        self.checks = dict(checks)
+        self.started = started
+        self.retry_interval = retry_interval
+        self.import_seconds = None
+        self.ready_seconds = None
+        self._phases = {}
+        self._failures = {}
+        self._thread = None
+        self._stop = Event()
+        self._lock = Lock()
+
+    def begin(self) -> bool:
+        """
+        Запускает фоновый прогрев.
+
+        :return: True при первом вызове, False если прогрев уже запущен.
+        :rtype: bool
+        """
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.import_seconds = perf_counter() - self.started
+            self._thread = Thread(target=self._run, name="startup", daemon=True)
+            self._thread.start()
+        logger.info(f"Application imported in {self.import_seconds:.2f}s, warming up")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        pending = list(self.steps)
+        while pending and not self._stop.is_set():
+            failed = []
+            for name, step in pending:
+                started = perf_counter()
+                try:
+                    step()
+                except Exception as e:
+                    self._failures[name] = self._failures.get(name, 0) + 1
+                    logger.warning(f"Startup step {name} failed: {str(e)}")
+                    failed.append((name, step))
+                    continue
+                self._phases[name] = perf_counter() - started
+                logger.info(f"Startup step {name} finished in {self._phases[name]:.2f}s")
+            pending = failed
+            if pending:
+                self._stop.wait(self.retry_interval)
+        self.is_ready()
+
+    def check(self) -> Dict[str, bool]:
+        """
+        Результаты проверок готовности.
+
+        :rtype: dict
+        """
+        result = {}
+        for name, check in self.checks.items():
+            try:
+                result[name] = bool(check())
+            except Exception as e:
+                logger.warning(f"Readiness check {name} failed: {str(e)}")
+                result[name] = False
+        return result
+
+    def is_ready(self) -> bool:
+        """
+        Экземпляр запущен и все проверки готовности выполнены.
+
+        :rtype: bool
+        """
+        if self.ready_seconds is not None:
+            return True
+        ready = self._thread is not None and all(self.check().values())
+        if ready:
+            with self._lock:
+                if self.ready_seconds is None:
+                    self.ready_seconds = perf_counter() - self.started
+                    logger.info(f"Application ready in {self.ready_seconds:.2f}s")
+        return ready
+
+    def stats(self) -> Dict:
+        return {
+            "uptime": round(perf_counter() - self.started, 2),
+            "import_seconds": round(self.import_seconds, 3) if self.import_seconds is not None else None,
+            "ready_seconds": round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+            "phases": {name: round(seconds, 3) for name, seconds in self._phases.items()},
+            "failures": dict(self._failures)
+        }
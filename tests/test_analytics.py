@@ -0,0 +1,15 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from analytics import ListingAnalytics  # noqa: E402
+from listing_store import ListingStore  # noqa: E402
+
+
+def test_filters_match_index_normalization():
+    store = ListingStore()
+    analytics = ListingAnalytics(store)
+    store.upsert([{"id": "1", "price": "1 000 000 ₽"}], {"brand": "Ёmobile", "model": "Седан  X"})
+    stats = analytics.stats("model", {"brand": " ёmobile ", "model": "седан x"})
+    assert stats["total"] == 1
+    assert stats["groups"][0]["model"] == "седан x"
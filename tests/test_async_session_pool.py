@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+exceptions = pytest.importorskip("selenium.common.exceptions")
+
+import async_scraper  # noqa: E402
+from async_scraper import AsyncSessionPool, AsyncWebDriver  # noqa: E402
+
+
+class FakeDriver(AsyncWebDriver):
+    def __init__(self, session_id, quits):
+        super().__init__(None, session_id)
+        self.quits = quits
+
+    async def quit(self):
+        self.quits.append(self.session_id)
+
+
+def make_pool(monkeypatch, fail_on=()):
+    created, quits = [], []
+
+    async def create(http, capabilities):
+        created.append(len(created))
+        if created[-1] in fail_on:
+            raise exceptions.WebDriverException("session not created")
+        return FakeDriver(str(created[-1]), quits)
+
+    async def noop(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(async_scraper.AsyncWebDriver, "create", staticmethod(create))
+    monkeypatch.setattr(async_scraper.ChromeDriverProcess, "start", noop)
+    monkeypatch.setattr(async_scraper.ChromeDriverProcess, "stop", noop)
+    return AsyncSessionPool({}, size=3), quits
+
+
+def test_start_closes_created_sessions_on_failure(monkeypatch):
+    pool, quits = make_pool(monkeypatch, fail_on=(1,))
+    with pytest.raises(exceptions.WebDriverException):
+        asyncio.run(pool.start())
+    assert sorted(quits) == ["0", "2"]
+
+
+def test_dead_session_is_replaced(monkeypatch):
+    pool, quits = make_pool(monkeypatch)
+
+    async def scenario():
+        await pool.start()
+        with pytest.raises(exceptions.InvalidSessionIdException):
+            async with pool.scraper("https://example.com") as scraper:
+                dead = scraper.driver
+                raise exceptions.InvalidSessionIdException("gone")
+        with pytest.raises(exceptions.NoSuchElementException):
+            async with pool.scraper("https://example.com") as scraper:
+                raise exceptions.NoSuchElementException("missing")
+        idle = [pool._idle.get_nowait() for _ in range(pool._idle.qsize())]
+        return dead, idle
+
+    dead, idle = asyncio.run(scenario())
+    assert quits == [dead.session_id]
+    assert dead not in idle and len(idle) == 3
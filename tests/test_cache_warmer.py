@@ -0,0 +1,61 @@
+from threading import Thread
+
+from cache_warmer import CacheWarmer
+
+
+def make_warmer(**kwargs):
+    return CacheWarmer(refresh=lambda path: None, has_capacity=lambda: True, **kwargs)
+
+
+def test_hot_paths_configured_first_then_popular():
+    warmer = make_warmer(paths=["/api/v1/filters?"], top_n=2)
+    for path, hits in (("/a", 1), ("/b", 3), ("/c", 2)):
+        for _ in range(hits):
+            warmer.record_hit(path)
+    assert warmer.hot_paths() == ["/api/v1/filters?", "/b", "/c"]
+
+
+def test_stats_returns_and_releases_lock():
+    warmer = make_warmer(paths=["/a"])
+    warmer.record_hit("/a")
+    warmer.record_store("/a", 100)
+
+    result = {}
+    thread = Thread(target=lambda: result.update(warmer.stats()), daemon=True)
+    thread.start()
+    thread.join(timeout=2)
+    assert not thread.is_alive(), "stats() deadlocked"
+
+    assert result["/a"]["hits"] == 1
+    assert 98 <= result["/a"]["expires_in"] <= 100
+    # Блокировка освобождена: последующие обращения не зависают
+    assert warmer._lock.acquire(timeout=1)
+    warmer._lock.release()
+
+
+def test_stats_without_store_has_no_expiry():
+    warmer = make_warmer()
+    warmer.record_hit("/b")
+    assert warmer.stats() == {"/b": {"hits": 1, "expires_in": None}}
+
+
+def test_stats_polled_during_traffic():
+    # /api/v1/metrics вызывает stats() одновременно с record_hit/record_store кэша
+    warmer = make_warmer(top_n=5)
+
+    def traffic():
+        for i in range(2000):
+            warmer.record_hit(f"/p{i % 7}")
+            warmer.record_store(f"/p{i % 7}", 60)
+
+    def metrics():
+        for _ in range(200):
+            warmer.stats()
+
+    threads = [Thread(target=traffic, daemon=True), Thread(target=metrics, daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert len(warmer.stats()) == 5
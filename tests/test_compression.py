@@ -0,0 +1,36 @@
+import gzip
+
+import pytest
+
+from compression import MIN_SIZE, compress_all, negotiate
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("*", "br"),
+    ("identity", None),
+    ("gzip;q=bad, br", "br"),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header, ["br", "gzip"]) == expected
+
+
+def test_negotiate_respects_available_encodings():
+    assert negotiate("gzip, br", ["gzip"]) == "gzip"
+
+
+def test_compress_all_skips_small_bodies():
+    assert compress_all(b"x" * (MIN_SIZE - 1)) == {}
+    body = b"x" * MIN_SIZE * 4
+    assert gzip.decompress(compress_all(body)["gzip"]) == body
+
+
+def test_compress_all_only_requested_encodings():
+    body = b"x" * MIN_SIZE * 4
+    assert list(compress_all(body, ["gzip"])) == ["gzip"]
+    assert compress_all(body, []) == {}
@@ -0,0 +1,89 @@
+from threading import Event, Lock
+from time import sleep
+
+import pytest
+
+from startup import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, DrainingExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = DrainingExecutor(max_workers=1)
+    yield executor
+    executor.drain(timeout=1)
+
+
+def test_queued_tasks_run_by_priority(executor):
+    release, order = Event(), []
+    blocker = executor.submit(release.wait)
+    futures = [
+        executor.submit_priority(PRIORITY_LOW, order.append, "low"),
+        executor.submit_priority(PRIORITY_NORMAL, order.append, "normal-1"),
+        executor.submit_priority(PRIORITY_HIGH, order.append, "high"),
+        executor.submit_priority(PRIORITY_NORMAL, order.append, "normal-2"),
+    ]
+    assert executor.queued() == {PRIORITY_LOW: 1, PRIORITY_NORMAL: 2, PRIORITY_HIGH: 1}
+    release.set()
+    for future in [blocker] + futures:
+        future.result(timeout=2)
+    assert order == ["high", "normal-1", "normal-2", "low"]
+
+
+def test_cancelled_queued_task_is_skipped(executor):
+    release, order = Event(), []
+    blocker = executor.submit(release.wait)
+    cancelled = executor.submit(order.append, "cancelled")
+    kept = executor.submit(order.append, "kept")
+    assert cancelled.cancel()
+    assert executor.queued() == {PRIORITY_NORMAL: 1}
+    release.set()
+    blocker.result(timeout=2)
+    kept.result(timeout=2)
+    assert order == ["kept"]
+
+
+def test_exception_is_set_on_future(executor):
+    future = executor.submit(lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        future.result(timeout=2)
+    # Воркер освобождается после ошибки
+    assert executor.submit(lambda: 42).result(timeout=2) == 42
+
+
+def test_resize_changes_concurrency(executor):
+    lock, running, peak = Lock(), [0], [0]
+    release = Event()
+
+    def task():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait()
+        with lock:
+            running[0] -= 1
+
+    futures = [executor.submit(task) for _ in range(3)]
+    sleep(0.05)
+    assert peak[0] == 1
+    executor.resize(3)
+    sleep(0.05)
+    assert peak[0] == 3
+    release.set()
+    for future in futures:
+        future.result(timeout=2)
+
+
+def test_drain_waits_then_cancels_queued():
+    executor = DrainingExecutor(max_workers=1)
+    release = Event()
+    running = executor.submit(release.wait, 0.3)
+    queued = executor.submit(lambda: None)
+    assert executor.pending() == 2
+
+    # Выполняющаяся задача не успевает завершиться, ожидающая снимается с очереди
+    assert executor.drain(timeout=0.05) == 1
+    assert queued.cancelled()
+    with pytest.raises(RuntimeError):
+        executor.submit(lambda: None)
+    release.set()
+    running.result(timeout=2)
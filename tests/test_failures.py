@@ -0,0 +1,33 @@
+import pytest
+
+exceptions = pytest.importorskip("selenium.common.exceptions")
+
+from failures import (  # noqa: E402
+    DEAD_SESSION, SELECTOR_MISS, TRANSIENT, UNKNOWN, UPSTREAM_ERROR,
+    RetryBudget, UpstreamServerError, classify_failure,
+)
+
+
+@pytest.mark.parametrize("error, expected", [
+    (UpstreamServerError("https://example.com", 502), UPSTREAM_ERROR),
+    (exceptions.NoSuchElementException("missing"), SELECTOR_MISS),
+    (exceptions.InvalidSessionIdException("gone"), DEAD_SESSION),
+    (exceptions.WebDriverException("chrome not reachable"), DEAD_SESSION),
+    (exceptions.TimeoutException("slow"), TRANSIENT),
+    (exceptions.WebDriverException("net::ERR_CONNECTION_RESET"), TRANSIENT),
+    (ConnectionError(), DEAD_SESSION),
+    (ValueError("bug"), UNKNOWN),
+])
+def test_classify_failure(error, expected):
+    assert classify_failure(error) == expected
+
+
+def test_retry_budget_limits_retries():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, capacity=2)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    assert budget.stats()["retries"] == 3
+    assert budget.stats()["rejected"] == 1
@@ -0,0 +1,31 @@
+from listing_store import ListingStore
+
+LABELS = {"бензиновый": "Бензин", "серебро": "Серебристый"}
+
+
+def test_query_filters_on_site_labels():
+    store = ListingStore()
+    store.upsert(
+        [{"id": "1", "fuel": "бензиновый", "color": "серебро"},
+         {"id": "2", "fuel": "Дизель", "color": "Чёрный"}],
+        labels=lambda field, value: LABELS.get(value, value)
+    )
+    assert [car["id"] for car in store.query(equals={"fuel": "Бензин"})[1]] == ["1"]
+    assert [car["id"] for car in store.query(equals={"color": "Серебристый"})[1]] == ["1"]
+    # Регистр, пробелы и "ё" не влияют на сравнение
+    assert [car["id"] for car in store.query(equals={"color": " черный"})[1]] == ["2"]
+
+
+def test_search_filters_override_card_text():
+    store = ListingStore()
+    store.upsert([{"id": "1", "fuel": "бенз.", "color": "белый"}], {"fuel": "Бензин"})
+    assert store.query(equals={"fuel": "Бензин"})[0] == 1
+    assert store.query(equals={"fuel": "бенз."})[0] == 0
+
+
+def test_coverage_is_marked_explicitly():
+    store = ListingStore()
+    filters = {"brand": "Toyota", "model": None}
+    assert not store.is_covered(filters, 60)
+    store.mark_covered(filters)
+    assert store.is_covered({"brand": "Toyota"}, 60)
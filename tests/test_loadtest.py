@@ -0,0 +1,29 @@
+import json
+from time import sleep
+
+from loadtest import LoadRunner, TrafficRecorder, load_log
+
+
+class SlowClient:
+    def request(self, method, path):
+        sleep(0.1)
+        return 200, {"bytes": 1}
+
+    def metrics(self):
+        return None
+
+
+def test_latency_includes_wait_for_a_free_worker():
+    entries = [{"offset": 0, "method": "GET", "path": f"/api/v1/cars/{id}"} for id in range(3)]
+    report = LoadRunner(SlowClient(), concurrency=1, stats_interval=60).run(entries)
+    # Третий запрос ждал, пока освободится единственный поток
+    assert report["endpoints"]["/api/v1/cars/<id>"]["max_ms"] >= 290
+
+
+def test_recorder_skips_requests_with_body(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    recorder = TrafficRecorder(str(path))
+    recorder.record("GET", "/api/v1/cars?brand=Toyota", 200, 0.1)
+    recorder.record("POST", "/api/v1/cars/price:batch", 200, 0.1)
+    assert [json.loads(line)["method"] for line in path.read_text().splitlines()] == ["GET"]
+    assert [entry["path"] for entry in load_log(str(path))] == ["/api/v1/cars?brand=Toyota"]
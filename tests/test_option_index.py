@@ -0,0 +1,67 @@
+import pytest
+
+from option_index import OptionIndex, extract_terms, make_term
+
+DETAILS = {
+    "title": "Toyota Camry 2020",
+    "price": "1 200 000 ₽",
+    "tech_parameters": {"Тип топлива": "Бензин"},
+    "car_check_parameters": {"ПТС": "Оригинал"},
+    "inspections": [{"section": "Кузов", "parameter": "Лобовое стекло", "value": "Царапины"}],
+    "car_body_options": {"Комфорт": ["Подогрев сидений"], "Безопасность": ["Парктроник"]},
+}
+
+
+def test_make_term_normalizes():
+    assert make_term("option", "  Подогрев   СИДЕНИЙ ") == "option:подогрев сидений"
+    assert make_term("spec", "Тип топлива: Бензин") == "spec:тип топлива=бензин"
+    with pytest.raises(ValueError):
+        make_term("spec", "Тип топлива")
+    with pytest.raises(ValueError):
+        make_term("color", "red")
+
+
+def test_extract_terms_only_present_sections():
+    terms = extract_terms({"tech_parameters": {"Тип топлива": "Бензин"}})
+    assert terms == {"spec": {"spec:тип топлива=бензин"}}
+    inspections = extract_terms(DETAILS)["inspection"]
+    assert inspections == {"inspection:лобовое стекло=царапины", "inspection:кузов/лобовое стекло=царапины"}
+
+
+def test_search_all_any_and_order():
+    index = OptionIndex()
+    index.add("1", DETAILS)
+    index.add("2", {"car_body_options": {"Комфорт": ["Подогрев сидений"]}, "tech_parameters": {"Тип топлива": "Дизель"}})
+
+    total, cars = index.search([("option", ["Подогрев сидений"])])
+    assert total == 2
+    assert [car["id"] for car in cars] == ["2", "1"]
+
+    total, cars = index.search([("option", ["Подогрев сидений"]), ("spec", ["Тип топлива:Бензин"])])
+    assert (total, cars[0]["title"]) == (1, "Toyota Camry 2020")
+
+    total, _ = index.search([("option", ["Парктроник"]), ("spec", ["Тип топлива:Дизель"])], match_all=False)
+    assert total == 2
+    total, cars = index.search([("option", ["Люк", "Подогрев сидений"])], offset=1, limit=1)
+    assert (total, [car["id"] for car in cars]) == (2, ["1"])
+
+    # Повторная индексация не меняет порядок
+    index.add("1", DETAILS)
+    assert [car["id"] for car in index.search([("option", ["Подогрев сидений"])])[1]] == ["2", "1"]
+
+
+def test_partial_update_keeps_other_sections():
+    index = OptionIndex()
+    index.add("1", DETAILS)
+    index.add("1", {"car_body_options": {"Комфорт": ["Люк"]}})
+    assert index.search([("option", ["Подогрев сидений"])])[0] == 0
+    assert index.search([("option", ["Люк"]), ("check", ["ПТС:Оригинал"])])[0] == 1
+    assert index.info()["cars"] == 1
+
+
+def test_reload_from_database(tmp_path):
+    path = str(tmp_path / "options.db")
+    OptionIndex(path).add("1", DETAILS)
+    index = OptionIndex(path)
+    total, cars = index.search([("inspection", ["Кузов/Лобовое стекло:Царапины"])])
+    assert (total, cars[0]["id"]) == (1, "1")
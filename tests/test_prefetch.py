@@ -0,0 +1,103 @@
+from prefetch import DetailPrefetcher
+
+
+class Harness:
+    """
+    Зависимости DetailPrefetcher: задачи копятся и выполняются вручную.
+    """
+
+    def __init__(self, cached=(), capacity=True, fetched=True):
+        self.cached = set(cached)
+        self.capacity = capacity
+        self.fetched = fetched
+        self.queue = []
+        self.fetches = []
+
+    def prefetcher(self, **kwargs):
+        return DetailPrefetcher(
+            fetch=self.fetch,
+            submit=lambda fn, id: self.queue.append((fn, id)),
+            is_cached=lambda id: id in self.cached,
+            cache_key=lambda id: f"car_{id}",
+            has_capacity=lambda: self.capacity,
+            **kwargs
+        )
+
+    def fetch(self, id):
+        self.fetches.append(id)
+        return self.fetched
+
+    def run_all(self):
+        queue, self.queue = self.queue, []
+        for fn, id in queue:
+            fn(id)
+
+
+def test_schedules_top_k_uncached():
+    harness = Harness(cached={"2"})
+    prefetcher = harness.prefetcher(top_k=3, max_pending=5)
+    assert prefetcher.schedule(["1", "2", None, "3", "4"]) == 2
+    harness.run_all()
+    assert harness.fetches == ["1", "3"]
+    stats = prefetcher.stats()
+    assert (stats["scheduled"], stats["prefetched"], stats["skipped_cached"], stats["pending"]) == (2, 2, 1, 0)
+
+
+def test_pending_budget_stops_schedule():
+    harness = Harness()
+    prefetcher = harness.prefetcher(top_k=5, max_pending=2)
+    assert prefetcher.schedule(["1", "2", "3"]) == 2
+    assert prefetcher.stats()["skipped_budget"] == 1
+    # Повторная выдача не ставит уже ожидающие автомобили
+    assert prefetcher.schedule(["1", "2"]) == 0
+    harness.run_all()
+    assert prefetcher.schedule(["3"]) == 1
+
+
+def test_rate_limit():
+    harness = Harness()
+    prefetcher = harness.prefetcher(top_k=5, max_pending=10, rate=2)
+    assert prefetcher.schedule(["1", "2", "3"]) == 2
+    assert prefetcher.stats()["skipped_rate"] == 1
+
+
+def test_capacity_checked_on_schedule_and_run():
+    harness = Harness(capacity=False)
+    prefetcher = harness.prefetcher()
+    assert prefetcher.schedule(["1"]) == 0
+    assert prefetcher.stats()["skipped_capacity"] == 1
+
+    harness.capacity = True
+    assert prefetcher.schedule(["1"]) == 1
+    # Пока задача ждала в очереди, свободные воркеры закончились
+    harness.capacity = False
+    harness.run_all()
+    assert harness.fetches == []
+    assert prefetcher.stats()["skipped_capacity"] == 2
+    assert prefetcher.stats()["pending"] == 0
+
+
+def test_hits_and_unused_entries():
+    harness = Harness()
+    prefetcher = harness.prefetcher(top_k=2, ttl=60)
+    prefetcher.schedule(["1", "2"])
+    harness.run_all()
+    prefetcher.record_hit("car_1")
+    prefetcher.record_hit("car_1")
+    stats = prefetcher.stats()
+    assert (stats["hits"], stats["tracked"], stats["hit_rate"]) == (1, 1, 1.0)
+
+    prefetcher.ttl = -1
+    prefetcher.schedule(["3"])
+    harness.run_all()
+    prefetcher.record_hit("car_3")
+    assert prefetcher.stats()["unused"] == 1
+
+
+def test_failed_fetch_is_counted():
+    harness = Harness(fetched=False)
+    prefetcher = harness.prefetcher()
+    prefetcher.schedule(["1"])
+    harness.run_all()
+    assert prefetcher.stats()["failed"] == 1
+    assert prefetcher.stats()["tracked"] == 0
@@ -0,0 +1,56 @@
+from listing_store import ListingStore
+from price_calculator import COMPUTED, PriceCalculator, engine_inputs
+
+
+def calculation(price, duty, util=5200):
+    return {
+        "currency_date": "01.06.2024",
+        "currency_rates": {"EUR": "98.5"},
+        "total_price": f"{price + duty + util:,} ₽".replace(",", " "),
+        "breakdown": {"Пошлина": f"{duty:,} ₽".replace(",", " "), "Утильсбор": f"{util:,} ₽".replace(",", " ")}
+    }
+
+
+def inputs(price, volume=2.5, power=181, year=2020):
+    return {"price": price, "year": year, "engine_volume": volume, "engine_power": power}
+
+
+def test_engine_inputs_from_details():
+    details = {
+        "base_parameters": {"Год выпуска": "2020", "Двигатель": "2.5 л / 181 л.с."},
+        "tech_parameters": {"Тип топлива": "Бензин"}
+    }
+    assert engine_inputs(details) == {"engine_volume": 2.5, "engine_power": 181}
+    assert engine_inputs({"tech_parameters": {"Мощность двигателя": "150 л.с."}}) == {
+        "engine_volume": None, "engine_power": 150
+    }
+
+
+def test_schedule_applies_only_to_same_engine():
+    calculator = PriceCalculator(min_samples=3)
+    for id, price in enumerate((1_000_000, 1_200_000, 1_500_000)):
+        calculator.learn(str(id), inputs(price), calculation(price, 400_000))
+
+    result, source = calculator.lookup("new", inputs(1_100_000))
+    assert source == COMPUTED
+    assert result["total_price"] == "1 505 200 ₽"
+
+    # Другой двигатель: сетка не подобрана, расчет скрапится
+    assert calculator.lookup("other", inputs(1_100_000, volume=3.5, power=249)) == (None, None)
+    # Двигатель неизвестен
+    assert calculator.lookup("unknown", inputs(1_100_000, volume=None)) == (None, None)
+
+
+def test_samples_without_engine_are_not_learned():
+    calculator = PriceCalculator(min_samples=1)
+    calculator.learn("1", inputs(1_000_000, power=None), calculation(1_000_000, 400_000))
+    assert calculator.lookup("2", inputs(1_000_000)) == (None, None)
+
+
+def test_price_inputs_include_engine():
+    store = ListingStore()
+    store.upsert([{"id": "1", "price": "1 000 000 ₽", "year": "2020"}])
+    assert store.price_inputs(["1"])["1"]["engine_volume"] is None
+    store.set_engine("1", 2.5, 181)
+    store.set_engine("1", None, 182)
+    assert store.price_inputs(["1"]) == {"1": inputs(1_000_000, volume=2.5, power=182)}
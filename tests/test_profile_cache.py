@@ -0,0 +1,67 @@
+import os
+import shutil
+
+import profile_cache
+from profile_cache import CACHE_SUBDIRS, ProfileCache
+
+
+def fill_cache(profile_dir, content=b"cached"):
+    for subdir in CACHE_SUBDIRS:
+        os.makedirs(os.path.join(profile_dir, subdir), exist_ok=True)
+        with open(os.path.join(profile_dir, subdir, "entry"), "wb") as f:
+            f.write(content)
+
+
+def test_first_released_profile_seeds_template(tmp_path):
+    cache = ProfileCache(str(tmp_path / "template"))
+    first = cache.acquire()
+    assert os.listdir(first) == []
+    fill_cache(first)
+    cache.release(first)
+    assert not os.path.exists(first)
+
+    second = cache.acquire()
+    with open(os.path.join(second, CACHE_SUBDIRS[0], "entry"), "rb") as f:
+        assert f.read() == b"cached"
+    # Готовый шаблон не перезаписывается следующими драйверами
+    fill_cache(second, b"other")
+    cache.release(second)
+    third = cache.acquire()
+    with open(os.path.join(third, CACHE_SUBDIRS[0], "entry"), "rb") as f:
+        assert f.read() == b"cached"
+    cache.release(third)
+
+
+def test_copy_runs_outside_lock(tmp_path, monkeypatch):
+    cache = ProfileCache(str(tmp_path / "template"))
+    seed = cache.acquire()
+    fill_cache(seed)
+    cache.release(seed)
+
+    copytree = shutil.copytree
+    locked = []
+
+    def checked_copytree(*args, **kwargs):
+        locked.append(cache._lock.locked())
+        return copytree(*args, **kwargs)
+
+    monkeypatch.setattr(profile_cache.shutil, "copytree", checked_copytree)
+    profile_dir = cache.acquire()
+    assert locked and not any(locked)
+    assert cache._readers == 0
+    cache.release(profile_dir)
+
+
+def test_expired_template_dropped_without_readers(tmp_path):
+    cache = ProfileCache(str(tmp_path / "template"), max_age=-1)
+    seed = cache.acquire()
+    fill_cache(seed)
+    cache.release(seed)
+    assert os.path.isdir(cache.template_dir)
+
+    cache._readers = 1
+    cache._invalidate_if_expired()
+    assert os.path.isdir(cache.template_dir)
+    cache._readers = 0
+    cache._invalidate_if_expired()
+    assert not os.path.exists(cache.template_dir)
@@ -0,0 +1,57 @@
+import pytest
+
+from settings import Settings, SettingsHolder
+
+
+def test_from_env_converts_types():
+    settings = Settings.from_env({"MAX_WORKERS": "5", "REQUEST_TIMEOUT": "12.5", "SEARCHPAGE_URL": "https://example.com"})
+    assert settings.max_workers == 5
+    assert settings.request_timeout == 12.5
+    assert settings.searchpage_url == "https://example.com"
+    assert settings.cache_cars_timeout == 600
+
+
+@pytest.mark.parametrize("values, message", [
+    ({"max_workers": 0}, "at least"),
+    ({"max_workers": "x"}, "Invalid int"),
+    ({"max_workers": 2.5}, "Invalid int"),
+    ({"max_workers": True}, "Invalid int"),
+    ({"unknown": 1}, "Unknown setting"),
+    ({"searchpage_url": "https://example.com"}, "requires restart"),
+])
+def test_updated_rejects_invalid_values(values, message):
+    with pytest.raises(ValueError, match=message):
+        Settings().updated(values)
+
+
+def test_holder_notifies_only_changes():
+    holder = SettingsHolder(Settings())
+    received = []
+    holder.subscribe(received.append)
+
+    assert holder.update({"max_workers": 3}) == {}
+    assert received == []
+    assert holder.update({"max_workers": "4", "request_timeout": 30}) == {"max_workers": (3, 4)}
+    assert received == [{"max_workers": (3, 4)}]
+    assert holder.max_workers == 4
+
+
+def test_failed_update_keeps_settings():
+    holder = SettingsHolder(Settings())
+    with pytest.raises(ValueError):
+        holder.update({"max_workers": 5, "page_timeout": "bad"})
+    assert holder.max_workers == 3
+
+
+def test_listener_error_does_not_break_update():
+    holder = SettingsHolder(Settings())
+    holder.subscribe(lambda changes: 1 / 0)
+    assert holder.update({"filter_delay_ms": 100}) == {"filter_delay_ms": (300, 100)}
+    assert holder.filter_delay_ms == 100
+
+
+def test_reload_applies_only_reloadable_fields():
+    holder = SettingsHolder(Settings())
+    changes = holder.reload({"CACHE_CARS_TIMEOUT": "120", "CARPAGE_URL": "https://example.com/car/"})
+    assert changes == {"cache_cars_timeout": (600, 120)}
+    assert holder.carpage_url is None
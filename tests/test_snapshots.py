@@ -0,0 +1,37 @@
+from snapshots import SnapshotReplayer, SnapshotStore
+
+
+def make_snapshots(count, consumed, page="searchpage"):
+    for index in range(count):
+        consumed.append(index)
+        yield {"page": page, "url": f"/cars?page={index}", "args": [], "captured_at": index, "html": "<html/>"}
+
+
+def replayer(monkeypatch, workers=2):
+    quit_drivers = []
+    replayer = SnapshotReplayer(lambda: object(), quit_drivers.append, workers=workers)
+    monkeypatch.setattr(replayer, "_replay_one", lambda extraction, snapshot: {"url": snapshot["url"]})
+    return replayer
+
+
+def test_run_reads_snapshots_lazily(monkeypatch):
+    consumed = []
+    results = replayer(monkeypatch, workers=2).run("cars", make_snapshots(100, consumed))
+    assert next(results) == {"url": "/cars?page=0"}
+    # В работе не больше 2 * workers снимков
+    assert len(consumed) <= 4
+    assert [result["url"] for result in results] == [f"/cars?page={index}" for index in range(1, 100)]
+
+
+def test_run_skips_other_pages(monkeypatch):
+    consumed = []
+    snapshots = list(make_snapshots(2, consumed, page="carpage")) + list(make_snapshots(1, consumed))
+    assert list(replayer(monkeypatch).run("cars", snapshots)) == [{"url": "/cars?page=0"}]
+
+
+def test_store_roundtrip_filters_by_page(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.save("https://example.com/cars", "searchpage", [1], "<html>cars</html>")
+    store.save("https://example.com/car/1", "carpage", [], "<html>car</html>")
+    snapshots = list(store.iter_snapshots(page="carpage"))
+    assert [snapshot["html"] for snapshot in snapshots] == ["<html>car</html>"]
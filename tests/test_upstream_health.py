@@ -0,0 +1,89 @@
+from threading import Thread
+from time import sleep
+
+import pytest
+
+from upstream_health import CLOSED, HALF_OPEN, OPEN, UpstreamHealth, UpstreamUnavailable
+
+
+def open_circuit(health):
+    for _ in range(health.min_calls):
+        health.record(1.0, ok=False)
+    assert health.state == OPEN
+
+
+def test_opens_after_failure_rate():
+    health = UpstreamHealth(max_limit=2, min_calls=3, cooldown=60)
+    open_circuit(health)
+    with pytest.raises(UpstreamUnavailable) as error:
+        with health.slot(timeout=0):
+            pass
+    assert error.value.retry_after >= 1
+
+
+def test_limit_follows_aimd():
+    health = UpstreamHealth(max_limit=4, min_calls=100)
+    health.record(20.0, ok=True)
+    assert health.limit == 2.0
+    health.record(1.0, ok=True)
+    assert health.limit == 2.5
+    health.set_max_limit(2)
+    assert health.limit == 2.0
+
+
+def test_probe_closes_circuit():
+    health = UpstreamHealth(max_limit=2, min_calls=3, cooldown=0)
+    open_circuit(health)
+    with health.slot(timeout=0):
+        assert health.state == HALF_OPEN
+        with pytest.raises(UpstreamUnavailable, match="probe in progress"):
+            with health.slot(timeout=0):
+                pass
+        health.record(1.0, ok=True)
+    assert health.state == CLOSED
+
+
+def test_probe_released_when_slot_wait_times_out():
+    health = UpstreamHealth(max_limit=1, min_calls=3, cooldown=0)
+    busy = health.slot(timeout=0)
+    busy.__enter__()
+    open_circuit(health)
+
+    # Слот занят: ожидание пробной загрузки истекает
+    with pytest.raises(UpstreamUnavailable, match="No free upstream slot"):
+        with health.slot(timeout=0.05):
+            pass
+    assert not health._probing
+    busy.__exit__(None, None, None)
+
+    # После освобождения слота пробная загрузка выполняется и замыкает предохранитель
+    with health.slot(timeout=0):
+        health.record(1.0, ok=True)
+    assert health.state == CLOSED
+
+
+def test_waiting_probe_rechecks_state():
+    health = UpstreamHealth(max_limit=1, min_calls=3, cooldown=0)
+    busy = health.slot(timeout=0)
+    busy.__enter__()
+    open_circuit(health)
+    health.state = HALF_OPEN
+    health.cooldown = 60
+    errors = []
+
+    def waiter():
+        try:
+            with health.slot(timeout=2):
+                pass
+        except UpstreamUnavailable as e:
+            errors.append(str(e))
+
+    thread = Thread(target=waiter)
+    thread.start()
+    sleep(0.05)
+    # Пока задача ждала слота, другая загрузка снова разомкнула предохранитель
+    health.record(1.0, ok=False)
+    busy.__exit__(None, None, None)
+    thread.join(timeout=2)
+    assert errors == ["Upstream circuit is open"]
+    assert not health._probing
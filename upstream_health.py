@@ -0,0 +1,183 @@
+import logging
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition
+from time import time
+from typing import Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Запрос к сайту не выполняется: сайт восстанавливается после сбоев
+    или все разрешенные слоты заняты.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamHealth:
+    """
+    Состояние сайта-источника по результатам загрузки страниц.
+
+    Число одновременных скрапингов регулируется по схеме AIMD: каждая
+    быстрая успешная загрузка увеличивает лимит на ``1 / limit``, ошибка
+    или медленная загрузка уменьшает его вдвое. Если доля ошибок в окне
+    последних загрузок достигает ``failure_rate``, размыкается
+    предохранитель: запросы отклоняются сразу в течение ``cooldown``
+    секунд, затем одна пробная загрузка решает, замкнуть его или снова
+    разомкнуть.
+
+    :param max_limit: Верхняя граница числа одновременных скрапингов.
+    :type max_limit: int
+    :param min_limit: Нижняя граница числа одновременных скрапингов.
+    :type min_limit: int
+    :param window: Число последних загрузок для оценки доли ошибок.
+    :type window: int
+    :param failure_rate: Доля ошибок, при которой размыкается предохранитель.
+    :type failure_rate: float
+    :param min_calls: Минимум загрузок в окне для размыкания.
+    :type min_calls: int
+    :param slow_seconds: Загрузка дольше этого времени считается признаком перегрузки.
+    :type slow_seconds: float
+    :param cooldown: Время в секундах до пробной загрузки.
+    :type cooldown: int
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, window: int = 20,
+                 failure_rate: float = 0.5, min_calls: int = 5,
+                 slow_seconds: float = 10.0, cooldown: int = 30):
+        self.max_limit = max(max_limit, 1)
+        self.min_limit = max(min(min_limit, self.max_limit), 1)
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_seconds = slow_seconds
+        self.cooldown = cooldown
+        self.limit = float(self.max_limit)
+        self.state = CLOSED
+        self._results = deque(maxlen=window)
+        self._active = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._cond = Condition()
+
+    def _retry_after(self) -> int:
+        return max(int(self._opened_at + self.cooldown - time()), 1)
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time()
+        self.limit = float(self.min_limit)
+        logger.warning(f"Upstream circuit opened for {self.cooldown}s")
+
+    @contextmanager
+    def slot(self, timeout: float) -> Iterator[None]:
+        """
+        Занимает слот скрапинга на время блока ``with``.
+
+        :param timeout: Сколько секунд ждать свободного слота.
+        :type timeout: float
+        :raises UpstreamUnavailable: Если предохранитель разомкнут или слот не освободился.
+        """
+        probe = False
+        with self._cond:
+            deadline = time() + timeout
+            while True:
+                if self.state == OPEN and time() - self._opened_at >= self.cooldown:
+                    self.state = HALF_OPEN
+                if self.state == OPEN:
+                    raise UpstreamUnavailable("Upstream circuit is open", self._retry_after())
+                if self.state == HALF_OPEN and self._probing:
+                    raise UpstreamUnavailable("Upstream probe in progress", 1)
+                if self._active < int(self.limit):
+                    break
+                remaining = deadline - time()
+                if remaining <= 0:
+                    raise UpstreamUnavailable("No free upstream slot", 1)
+                # Пока задача ждет слота, состояние предохранителя может измениться
+                self._cond.wait(remaining)
+            # Пробная загрузка занимается только вместе со слотом, иначе
+            # при таймауте ожидания предохранитель остался бы в HALF_OPEN навсегда
+            if self.state == HALF_OPEN:
+                self._probing = probe = True
+            self._active += 1
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                if probe:
+                    self._probing = False
+                self._cond.notify_all()
+
+    def record(self, seconds: float, ok: bool) -> None:
+        """
+        Учитывает результат загрузки страницы сайта.
+
+        :param seconds: Время загрузки.
+        :type seconds: float
+        :param ok: Загрузка завершилась успешно.
+        :type ok: bool
+        """
+        with self._cond:
+            self._results.append((ok, seconds))
+            if ok and seconds <= self.slow_seconds:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:
+                self.limit = max(self.min_limit, self.limit / 2)
+
+            if self.state == HALF_OPEN:
+                if ok:
+                    self.state = CLOSED
+                    self._results.clear()
+                    logger.info("Upstream circuit closed")
+                else:
+                    self._open()
+            elif self.state == CLOSED and len(self._results) >= self.min_calls:
+                failures = sum(1 for result, _ in self._results if not result)
+                if failures / len(self._results) >= self.failure_rate:
+                    self._open()
+            self._cond.notify_all()
+
+    def set_max_limit(self, max_limit: int) -> None:
+        """
+        Меняет верхнюю границу числа одновременных скрапингов. При
+        увеличении лимит растет дальше по мере успешных загрузок.
+
+        :param max_limit: Верхняя граница.
+        :type max_limit: int
+        """
+        with self._cond:
+            self.max_limit = max(max_limit, 1)
+            self.min_limit = min(self.min_limit, self.max_limit)
+            self.limit = min(self.limit, float(self.max_limit))
+            self._cond.notify_all()
+
+    def is_open(self) -> bool:
+        with self._cond:
+            return self.state == OPEN and time() - self._opened_at < self.cooldown
+
+    def stats(self) -> Dict:
+        with self._cond:
+            latencies = sorted(seconds for _, seconds in self._results)
+            failures = sum(1 for ok, _ in self._results if not ok)
+            result = {
+                "state": self.state,
+                "limit": round(self.limit, 2),
+                "active": self._active,
+                "calls": len(self._results),
+                "failure_rate": round(failures / len(self._results), 2) if self._results else 0.0,
+                "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2) if latencies else None
+            }
+            if self.state == OPEN:
+                result["retry_after"] = self._retry_after()
+            return result
@@ -0,0 +1,19 @@
+"""
+WSGI точка входа API.
+
+Экземпляр запускается при загрузке воркера: прогрев драйверов и кэша
+фильтров начинается сразу, а не при первом запросе, поэтому запросы
+не проверяют, запущен ли он. ``/readyz`` отвечает 200 после прогрева.
+
+Запуск::
+
+    gunicorn wsgi:application --bind 0.0.0.0:5000 --worker-class gthread --threads 8
+
+С ``--preload`` модуль импортируется в мастер-процессе до fork, и
+потоки прогрева не переживут fork, поэтому эта опция не используется.
+"""
+import app as api
+
+api.start()
+
+application = api.app